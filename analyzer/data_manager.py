@@ -1,11 +1,15 @@
+import hashlib
 import sqlite3
 import pandas as pd
 import logging
 import os
-import xlsxwriter
-import streamlit as st
+import re
+import shutil
 import time
-from datetime import datetime
+from typing import Dict, Optional
+from analyzer.dimensions import NAME_TABLES
+from analyzer.summary_accumulator import TIMELINE_RESOLUTIONS
+from analyzer.timestamp_parser import TimestampParser
 
 # Configure logging
 logging.basicConfig(
@@ -15,11 +19,181 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# The catalog holds the jobs table; each job's logs, metadata and summaries are kept in
+# their own database file under JOBS_DIR
+CATALOG_DB = os.path.join('data', 'logs.db')
+JOBS_DIR = os.path.join('data', 'jobs')
+
+# Tables of the single shared database used before per-job files, moved out by init_db
+SHARED_JOB_KEY_TABLES = ('logs', 'job_dictionaries', 'class_level_counts', 'service_level_counts',
+                         'timeline_counts', 'class_service_counts')
+SHARED_JOB_ID_TABLES = ('job_metadata', 'file_checkpoints', 'job_manifest')
+SHARED_DIMENSION_TABLES = NAME_TABLES + ('source_files',)
+
+# Schema version of job databases, kept in PRAGMA user_version (see _upgrade_job_db)
+JOB_SCHEMA_VERSION = 2
+
+# Secondary indexes of the logs table as (name, columns). ts is UTC epoch milliseconds, so
+# they order and range-filter logs by time; a bulk load defers them (see defer_log_indexes)
+LOG_INDEXES = (
+    ('idx_logs_job_class_ts', 'job_key, class_id, ts'),
+    ('idx_logs_job_class_level_ts', 'job_key, class_id, level_id, ts'),
+    ('idx_logs_job_service_ts', 'job_key, service_id, ts'),
+    ('idx_logs_job_service_level_ts', 'job_key, service_id, level_id, ts'),
+)
+
+def job_db_path(job_id: str) -> str:
+    """Return the path of a job's database file.
+
+    Job ids contain spaces and colons, so the name keeps their filesystem-safe characters
+    and adds a hash of the full id to keep distinct ids apart.
+    """
+    safe_name = re.sub(r'[^A-Za-z0-9._-]+', '_', job_id)[:80]
+    digest = hashlib.sha1(job_id.encode('utf-8')).hexdigest()[:10]
+    return os.path.join(JOBS_DIR, f'{safe_name}_{digest}.db')
+
+def job_segments_dir(job_id: str) -> str:
+    """Return the directory holding a job's Parquet log segments (log_storage: parquet)."""
+    return job_db_path(job_id)[:-len('.db')] + '_segments'
+
+def connect_catalog(**kwargs) -> sqlite3.Connection:
+    """Open the catalog database holding the jobs table."""
+    return sqlite3.connect(CATALOG_DB, **kwargs)
+
+def connect_job_db(job_id: str, **kwargs) -> sqlite3.Connection:
+    """Open an existing job database; raises sqlite3.OperationalError if the job has none."""
+    path = job_db_path(job_id)
+    if not os.path.exists(path):
+        raise sqlite3.OperationalError(f"No database for job {job_id}")
+    return sqlite3.connect(path, **kwargs)
+
+def attach_job_db(conn: sqlite3.Connection, job_id: str, alias: str):
+    """Attach a job database to conn as alias, for queries across jobs.
+
+    SQLite allows 10 attached databases per connection by default; detach with
+    DETACH DATABASE once done.
+    """
+    conn.execute('ATTACH DATABASE ? AS ' + alias, (job_db_path(job_id),))
+
+def delete_job_db(job_id: str):
+    """Delete a job's database file along with its WAL and shared-memory files and log segments."""
+    path = job_db_path(job_id)
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+    shutil.rmtree(job_segments_dir(job_id), ignore_errors=True)
+    logger.info(f"Deleted database file {path} for job_id: {job_id}")
+
+def init_job_db(job_id: str):
+    """Create a job's database file and its tables if they do not exist yet."""
+    try:
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        conn = sqlite3.connect(job_db_path(job_id), timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('PRAGMA journal_mode = WAL')
+        _create_job_tables(cursor)
+        conn.commit()
+        _upgrade_job_db(conn)
+        _create_job_indexes(cursor)
+        _create_search_index(cursor)
+        conn.commit()
+        conn.close()
+    except sqlite3.OperationalError as e:
+        logger.error(f"Database initialization error for job_id {job_id}: {str(e)}")
+        raise
+
+def _fill_ts(conn: sqlite3.Connection, schema: str = 'main'):
+    """Set logs.ts from the timestamp string on rows that have none, in conn's transaction."""
+    conn.create_function('epoch_ms', 1, TimestampParser().epoch_ms, deterministic=True)
+    updated = conn.execute(f'UPDATE {schema}.logs SET ts = epoch_ms(timestamp) WHERE ts IS NULL').rowcount
+    if updated:
+        logger.info(f"Filled ts for {updated} log rows")
+
+def _fill_timeline_rollups(conn: sqlite3.Connection, schema: str = 'main'):
+    """Fill timeline_rollups for jobs ingested before it existed, in conn's transaction.
+
+    Minute counts come from logs.ts and are rolled up to the coarser resolutions. Rows
+    above a job's committed_log_id marker are not counted yet (they are deleted and
+    ingested again when the job resumes), so they are left out.
+
+    Jobs whose logs are not in the logs table (log_storage: parquet) are left without
+    rollups: their only other source, timeline_counts, is bucketed by the hour written in
+    each log, in its own UTC offset, and would shift the UTC buckets by that offset.
+    """
+    resolutions = list(TIMELINE_RESOLUTIONS.values())
+    conn.execute(f'''
+        INSERT OR IGNORE INTO {schema}.timeline_rollups (job_key, resolution_ms, bucket_ms, level_id, count)
+        SELECT logs.job_key, ?1, ts - ts % ?1, level_id, COUNT(*) FROM {schema}.logs AS logs
+        LEFT JOIN (
+            SELECT k.job_key, CAST(m.value AS INTEGER) AS committed_log_id FROM {schema}.job_metadata m
+            JOIN {schema}.job_keys k ON k.job_id = m.job_id
+            WHERE m.type = 'committed_log_id'
+        ) c ON c.job_key = logs.job_key
+        WHERE ts > 0 AND (c.committed_log_id IS NULL OR logs.id <= c.committed_log_id)
+        GROUP BY logs.job_key, ts - ts % ?1, level_id
+    ''', (resolutions[0],))
+    for finer, coarser in zip(resolutions, resolutions[1:]):
+        conn.execute(f'''
+            INSERT OR IGNORE INTO {schema}.timeline_rollups (job_key, resolution_ms, bucket_ms, level_id, count)
+            SELECT job_key, ?2, bucket_ms - bucket_ms % ?2, level_id, SUM(count) FROM {schema}.timeline_rollups
+            WHERE resolution_ms = ?1
+            GROUP BY job_key, bucket_ms - bucket_ms % ?2, level_id
+        ''', (finer, coarser))
+
+def _upgrade_job_db(conn: sqlite3.Connection):
+    """Bring a job database written by an older version up to JOB_SCHEMA_VERSION.
+
+    Version 1 adds logs.ts, filled from the timestamp strings, and replaces the timestamp
+    indexes with ts ones. Version 2 fills timeline_rollups.
+
+    The upgrade runs under an immediate lock, so the app and the backend starting
+    together upgrade a file only once.
+    """
+    if conn.execute('PRAGMA user_version').fetchone()[0] >= JOB_SCHEMA_VERSION:
+        return
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version < 1:
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(logs)').fetchall()]
+            if 'ts' not in columns:
+                conn.execute('ALTER TABLE logs ADD COLUMN ts INTEGER')
+            _fill_ts(conn)
+            for index in ('idx_logs_job_class_timestamp', 'idx_logs_job_class_level_timestamp',
+                          'idx_logs_job_service_timestamp', 'idx_logs_job_service_level_timestamp'):
+                conn.execute(f'DROP INDEX IF EXISTS {index}')
+        if version < 2:
+            _fill_timeline_rollups(conn)
+        conn.execute(f'PRAGMA user_version = {JOB_SCHEMA_VERSION}')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def _create_search_index(cursor: sqlite3.Cursor):
+    """Create the trigram full-text index over log messages, if this SQLite build supports it.
+
+    The index is contentless (rowid = logs.id): messages may be stored compressed, so
+    their decoded text is indexed without keeping a second copy of it.
+    """
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(
+                log_message, content='', tokenize='trigram'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        # FTS5 or its trigram tokenizer (SQLite 3.34+) is missing; searches scan messages instead
+        logger.warning(f"Full-text search index not available: {str(e)}")
+
 def init_db():
-    """Initialize SQLite database with jobs, logs, metadata, and summary tables."""
+    """Initialize the SQLite catalog database, moving jobs out of an older shared database."""
     try:
         os.makedirs('data', exist_ok=True)
-        conn = sqlite3.connect('data/logs.db', timeout=30)
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        conn = connect_catalog(timeout=30)
         cursor = conn.cursor()
         
         # Optimize SQLite settings
@@ -41,86 +215,23 @@ def init_db():
             )
         ''')
         
-        # Logs table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                job_id TEXT,
-                timestamp TEXT,
-                level TEXT,
-                class TEXT,
-                service TEXT,
-                log_message TEXT,
-                folder TEXT,
-                file_name TEXT,
-                line_idx INTEGER,
-                FOREIGN KEY (job_id) REFERENCES jobs (job_id)
-            )
-        ''')
-        
-        # Job metadata table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS job_metadata (
-                job_id TEXT,
-                type TEXT,
-                value TEXT,
-                UNIQUE(job_id, type, value)
-            )
-        ''')
-        
-        # Summary tables
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS class_level_counts (
-                job_id TEXT,
-                class TEXT,
-                level TEXT,
-                count INTEGER,
-                PRIMARY KEY (job_id, class, level)
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS service_level_counts (
-                job_id TEXT,
-                service TEXT,
-                level TEXT,
-                count INTEGER,
-                PRIMARY KEY (job_id, service, level)
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS timeline_counts (
-                job_id TEXT,
-                hour TEXT,
-                level TEXT,
-                count INTEGER,
-                PRIMARY KEY (job_id, hour, level)
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS class_service_counts (
-                job_id TEXT,
-                class TEXT,
-                service TEXT,
-                count INTEGER,
-                PRIMARY KEY (job_id, class, service)
-            )
-        ''')
+        # Databases from before per-job files keep every job's logs in the catalog
+        shared = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'logs'"
+        ).fetchone()
+        if shared:
+            # Tables from before dictionary encoding are renamed and copied over first
+            legacy_tables = _rename_legacy_tables(cursor)
+            _create_job_tables(cursor)
+            if legacy_tables:
+                _migrate_legacy_rows(cursor, legacy_tables)
+            conn.commit()
+            _split_shared_database(conn)
         
-        # Indexes
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_job_id ON logs (job_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_class ON logs (class)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_service ON logs (service)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_level ON logs (level)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_job_id_class_level ON logs (job_id, class, level)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_job_id_service_level ON logs (job_id, service, level)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs (timestamp)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_job_id_class_timestamp_level ON logs (job_id, class, timestamp, level)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_job_id_service_timestamp_level ON logs (job_id, service, timestamp, level)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_job_metadata_job_id_type ON job_metadata (job_id, type)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_class_level_counts_job_id ON class_level_counts (job_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_service_level_counts_job_id ON service_level_counts (job_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_timeline_counts_job_id ON timeline_counts (job_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_class_service_counts_job_id ON class_service_counts (job_id)')
+        # Bring job databases written by older versions up to date
+        for (job_id,) in cursor.execute('SELECT job_id FROM jobs').fetchall():
+            if os.path.exists(job_db_path(job_id)):
+                init_job_db(job_id)
         
         conn.commit()
         conn.close()
@@ -132,200 +243,431 @@ def init_db():
         logger.error(f"Error initializing database: {str(e)}")
         raise
 
-@st.cache_data
-def get_job_metadata(job_id: str):
-    """Fetch unique classes and services for a job from job_metadata table, cached."""
-    try:
-        conn = sqlite3.connect('data/logs.db', timeout=30)
-        classes = pd.read_sql_query(
-            "SELECT value FROM job_metadata WHERE job_id = ? AND type = 'class'",
-            conn,
-            params=[job_id]
-        )['value'].dropna().unique().tolist()
-        services = pd.read_sql_query(
-            "SELECT value FROM job_metadata WHERE job_id = ? AND type = 'service'",
-            conn,
-            params=[job_id]
-        )['value'].dropna().unique().tolist()
-        conn.close()
-        logger.info(f"Fetched metadata for job_id: {job_id}, classes: {len(classes)}, services: {len(services)}")
-        return classes, services
-    except sqlite3.OperationalError as e:
-        logger.error(f"Database error fetching metadata for job_id {job_id}: {str(e)}")
-        st.session_state.notifications.append({
-            'type': 'error',
-            'message': f"Database error fetching metadata: {str(e)}",
-            'timestamp': time.time()
-        })
-        return [], []
-    except Exception as e:
-        logger.error(f"Error fetching metadata for job_id {job_id}: {str(e)}")
-        st.session_state.notifications.append({
-            'type': 'error',
-            'message': f"Error fetching metadata: {str(e)}",
-            'timestamp': time.time()
-        })
-        return [], []
-
-@st.cache_data
-def _fetch_analysis_data(job_id: str, query_type: str) -> pd.DataFrame:
-    """Fetch analysis data for a specific query type from summary tables."""
-    try:
-        conn = sqlite3.connect('data/logs.db', timeout=30)
-        
-        if query_type == 'class':
-            df = pd.read_sql_query("""
-                SELECT class, level, count
-                FROM class_level_counts
-                WHERE job_id = ?
-            """, conn, params=[job_id])
-        
-        elif query_type == 'service':
-            df = pd.read_sql_query("""
-                SELECT service, level, count
-                FROM service_level_counts
-                WHERE job_id = ?
-            """, conn, params=[job_id])
-        
-        elif query_type == 'timeline':
-            df = pd.read_sql_query("""
-                SELECT hour, level, count
-                FROM timeline_counts
-                WHERE job_id = ?
-                ORDER BY hour
-            """, conn, params=[job_id])
-            # Convert hour to datetime for consistent plotting
-            if not df.empty:
-                df['hour'] = pd.to_datetime(df['hour'], format='%Y-%m-%d %H:00:00', errors='coerce')
-                df = df.dropna(subset=['hour'])  # Drop rows with invalid datetime
-        
-        elif query_type == 'class_service':
-            df = pd.read_sql_query("""
-                SELECT class, service, count
-                FROM class_service_counts
-                WHERE job_id = ?
-            """, conn, params=[job_id])
-        
-        else:
-            raise ValueError(f"Invalid query_type: {query_type}")
-        
-        conn.close()
-        
-        if df.empty:
-            if query_type == 'class':
-                df = pd.DataFrame(columns=['class', 'level', 'count'])
-            elif query_type == 'service':
-                df = pd.DataFrame(columns=['service', 'level', 'count'])
-            elif query_type == 'timeline':
-                df = pd.DataFrame(columns=['hour', 'level', 'count'])
-            elif query_type == 'class_service':
-                df = pd.DataFrame(columns=['class', 'service', 'count'])
-        
-        logger.info(f"Retrieved {query_type} data for job_id: {job_id}, rows: {len(df)}")
-        return df
+def _create_job_tables(cursor: sqlite3.Cursor):
+    """Create the dimension, logs, metadata and summary tables stored in a job database."""
+    # Dimension tables: logs and summaries store these integer ids instead of strings
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS job_keys (
+            job_key INTEGER PRIMARY KEY,
+            job_id TEXT UNIQUE
+        )
+    ''')
+    for table in NAME_TABLES:
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY,
+                name TEXT UNIQUE
+            )
+        ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS source_files (
+            id INTEGER PRIMARY KEY,
+            folder TEXT,
+            file_name TEXT,
+            UNIQUE(folder, file_name)
+        )
+    ''')
     
-    except sqlite3.OperationalError as e:
-        logger.error(f"Database error retrieving {query_type} data for job_id {job_id}: {str(e)}")
-        return pd.DataFrame()
-    except Exception as e:
-        logger.error(f"Error retrieving {query_type} data for job_id {job_id}: {str(e)}")
-        return pd.DataFrame()
+    # Logs table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_key INTEGER REFERENCES job_keys (job_key),
+            timestamp TEXT,
+            ts INTEGER,
+            level_id INTEGER REFERENCES levels (id),
+            class_id INTEGER REFERENCES classes (id),
+            service_id INTEGER REFERENCES services (id),
+            log_message TEXT,
+            file_id INTEGER REFERENCES source_files (id),
+            line_idx INTEGER
+        )
+    ''')
+    
+    # zstd dictionaries for jobs stored with message_compression: zstd (NULL = no dictionary)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS job_dictionaries (
+            job_key INTEGER PRIMARY KEY,
+            dictionary BLOB
+        )
+    ''')
+    
+    # Job metadata table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS job_metadata (
+            job_id TEXT,
+            type TEXT,
+            value TEXT,
+            UNIQUE(job_id, type, value)
+        )
+    ''')
+    
+    # Resume positions of partly ingested files
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS file_checkpoints (
+            job_id TEXT,
+            file_path TEXT,
+            line_idx INTEGER,
+            byte_offset INTEGER,
+            PRIMARY KEY (job_id, file_path)
+        )
+    ''')
+    
+    # S3 objects listed for a job, in ingest order
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS job_manifest (
+            job_id TEXT,
+            position INTEGER,
+            file_path TEXT,
+            size INTEGER,
+            etag TEXT,
+            PRIMARY KEY (job_id, position)
+        )
+    ''')
+    
+    # Summary tables
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS class_level_counts (
+            job_key INTEGER,
+            class_id INTEGER,
+            level_id INTEGER,
+            count INTEGER,
+            PRIMARY KEY (job_key, class_id, level_id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS service_level_counts (
+            job_key INTEGER,
+            service_id INTEGER,
+            level_id INTEGER,
+            count INTEGER,
+            PRIMARY KEY (job_key, service_id, level_id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS timeline_counts (
+            job_key INTEGER,
+            hour TEXT,
+            level_id INTEGER,
+            count INTEGER,
+            PRIMARY KEY (job_key, hour, level_id)
+        )
+    ''')
+    # Log counts by level per minute, hour and day bucket (UTC epoch ms, see TIMELINE_RESOLUTIONS)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS timeline_rollups (
+            job_key INTEGER,
+            resolution_ms INTEGER,
+            bucket_ms INTEGER,
+            level_id INTEGER,
+            count INTEGER,
+            PRIMARY KEY (job_key, resolution_ms, bucket_ms, level_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS class_service_counts (
+            job_key INTEGER,
+            class_id INTEGER,
+            service_id INTEGER,
+            count INTEGER,
+            PRIMARY KEY (job_key, class_id, service_id)
+        )
+    ''')
 
-def get_analysis_data(job_id: str, query_type: str) -> pd.DataFrame:
-    """Retrieve analysis data for a job."""
-    return _fetch_analysis_data(job_id, query_type)
+def _create_job_indexes(cursor: sqlite3.Cursor):
+    """Create the indexes of a job database, leaving out the logs ones while a bulk load defers them."""
+    # Indexes (the summary tables are covered by their primary keys)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_job_metadata_job_id_type ON job_metadata (job_id, type)')
+    cursor.execute("SELECT 1 FROM job_metadata WHERE type = 'log_indexes' LIMIT 1")
+    if cursor.fetchone() is None:
+        create_log_indexes(cursor.connection)
 
-def export_to_excel(job_id: str) -> str:
-    """Export analysis data to Excel file."""
-    try:
-        level_counts_by_class = get_analysis_data(job_id=job_id, query_type='class')
-        level_counts_by_service = get_analysis_data(job_id=job_id, query_type='service')
-        timeline_data = get_analysis_data(job_id=job_id, query_type='timeline')
-        
-        # Pivot class data
-        if not level_counts_by_class.empty:
-            class_pivot = level_counts_by_class.pivot(index='class', columns='level', values='count').fillna(0)
-            class_pivot = class_pivot.reset_index()
-        else:
-            class_pivot = pd.DataFrame(columns=['class'])
-        
-        # Pivot service data
-        if not level_counts_by_service.empty:
-            service_pivot = level_counts_by_service.pivot(index='service', columns='level', values='count').fillna(0)
-            service_pivot = service_pivot.reset_index()
-        else:
-            service_pivot = pd.DataFrame(columns=['service'])
-        
-        # Calculate total counts for class and service
-        class_totals = level_counts_by_class.groupby('class')['count'].sum().reset_index()
-        service_totals = level_counts_by_service.groupby('service')['count'].sum().reset_index()
-        
-        # Create folder with job_id and timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_dir = os.path.join('data', 'exports', f'{job_id}_{timestamp}')
-        os.makedirs(output_dir, exist_ok=True)
-        output_file = os.path.join(output_dir, 'analysis_results.xlsx')
-        
-        with xlsxwriter.Workbook(output_file) as workbook:
-            header_format = workbook.add_format({
-                'bold': True,
-                'bg_color': '#12133f',
-                'font_color': '#FFFFFF',
-                'border': 1
-            })
-            cell_format = workbook.add_format({'border': 1})
-            
-            # Class Level Counts
-            worksheet1 = workbook.add_worksheet('Class Level Counts')
-            headers1 = ['Class'] + list(class_pivot.columns[1:])
-            for col, header in enumerate(headers1):
-                worksheet1.write(0, col, header, header_format)
-            for row, data in enumerate(class_pivot.to_dict('records'), 1):
-                worksheet1.write(row, 0, data['class'], cell_format)
-                for col, level in enumerate(class_pivot.columns[1:], 1):
-                    worksheet1.write(row, col, data.get(level, 0), cell_format)
-            
-            # Service Level Counts
-            worksheet2 = workbook.add_worksheet('Service Level Counts')
-            headers2 = ['Service'] + list(service_pivot.columns[1:])
-            for col, header in enumerate(headers2):
-                worksheet2.write(0, col, header, header_format)
-            for row, data in enumerate(service_pivot.to_dict('records'), 1):
-                worksheet2.write(row, 0, data['service'], cell_format)
-                for col, level in enumerate(service_pivot.columns[1:], 1):
-                    worksheet2.write(row, col, data.get(level, 0), cell_format)
-            
-            # Timeline Data
-            worksheet3 = workbook.add_worksheet('Timeline Data')
-            headers3 = ['Hour', 'Level', 'Count']
-            for col, header in enumerate(headers3):
-                worksheet3.write(0, col, header, header_format)
-            for row, data in enumerate(timeline_data.to_dict('records'), 1):
-                worksheet3.write(row, 0, data['hour'], cell_format)
-                worksheet3.write(row, 1, data['level'], cell_format)
-                worksheet3.write(row, 2, data['count'], cell_format)
-            
-            # Class Totals
-            worksheet4 = workbook.add_worksheet('Class Totals')
-            headers4 = ['Class', 'Count']
-            for col, header in enumerate(headers4):
-                worksheet4.write(0, col, header, header_format)
-            for row, data in enumerate(class_totals.to_dict('records'), 1):
-                worksheet4.write(row, 0, data['class'], cell_format)
-                worksheet4.write(row, 1, data['count'], cell_format)
-            
-            # Service Totals
-            worksheet5 = workbook.add_worksheet('Service Totals')
-            headers5 = ['Service', 'Count']
-            for col, header in enumerate(headers5):
-                worksheet5.write(0, col, header, header_format)
-            for row, data in enumerate(service_totals.to_dict('records'), 1):
-                worksheet5.write(row, 0, data['service'], cell_format)
-                worksheet5.write(row, 1, data['count'], cell_format)
-        
-        logger.info(f"Exported analysis data to {output_file} for job_id: {job_id}")
-        return output_file
+def create_log_indexes(conn: sqlite3.Connection):
+    """Create the logs indexes that are missing (see LOG_INDEXES)."""
+    for name, columns in LOG_INDEXES:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON logs ({columns})')
+
+def defer_log_indexes(conn: sqlite3.Connection, job_id: str):
+    """Drop a job's logs indexes before bulk-loading rows into it, marking them as building.
+
+    Rows then go into a table with no secondary indexes to maintain, and build_log_indexes
+    creates the indexes in one pass once the job completes. While the log_indexes marker
+    is set, init_job_db does not recreate them, so a paused or restarted job keeps
+    loading without them.
+    """
+    conn.execute('''
+        INSERT OR IGNORE INTO job_metadata (job_id, type, value) VALUES (?, ?, ?)
+    ''', (job_id, 'log_indexes', 'building'))
+    for name, _ in LOG_INDEXES:
+        conn.execute(f'DROP INDEX IF EXISTS {name}')
+    conn.commit()
+
+def log_indexes_building(conn: sqlite3.Connection, job_id: str) -> bool:
+    """Return whether a job's logs and search indexes are still to be built after a bulk load."""
+    cursor = conn.execute('''
+        SELECT 1 FROM job_metadata WHERE job_id = ? AND type = 'log_indexes'
+    ''', (job_id,))
+    return cursor.fetchone() is not None
+
+def build_log_indexes(conn: sqlite3.Connection, job_id: str, build_search_index=None):
+    """Create a job's deferred logs indexes, then its search index, and clear the log_indexes marker.
+
+    build_search_index, if given, is called with conn once the logs indexes exist. The
+    marker is only cleared after both are built, so an interrupted build is run again
+    when the backend restarts.
+    """
+    start_time = time.time()
+    create_log_indexes(conn)
+    conn.commit()
+    logger.info(f"Built logs indexes for job_id: {job_id} ({time.time() - start_time:.2f}s)")
+    if build_search_index is not None:
+        build_search_index(conn)
+    conn.execute('''
+        DELETE FROM job_metadata WHERE job_id = ? AND type = 'log_indexes'
+    ''', (job_id,))
+    conn.commit()
+
+def _rename_legacy_tables(cursor: sqlite3.Cursor) -> list:
+    """Rename logs and summary tables that still store TEXT identifiers to <name>_legacy."""
+    legacy_columns = {
+        'logs': 'class',
+        'class_level_counts': 'job_id',
+        'service_level_counts': 'job_id',
+        'timeline_counts': 'job_id',
+        'class_service_counts': 'job_id'
+    }
+    renamed = []
+    for table, column in legacy_columns.items():
+        columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})').fetchall()]
+        if column in columns:
+            cursor.execute(f'ALTER TABLE {table} RENAME TO {table}_legacy')
+            renamed.append(table)
+    return renamed
+
+def _migrate_legacy_rows(cursor: sqlite3.Cursor, legacy_tables: list):
+    """Copy rows from renamed legacy tables into the dictionary-encoded tables and drop them.
+
+    Log ids are kept, so ingest checkpoints (committed_log_id) stay valid.
+    """
+    logger.info(f"Migrating legacy tables to dictionary-encoded schema: {legacy_tables}")
+    sources = {
+        'job_keys': ['SELECT job_id AS value FROM jobs'],
+        'classes': [],
+        'services': [],
+        'levels': []
+    }
+    if 'logs' in legacy_tables:
+        sources['job_keys'].append('SELECT job_id AS value FROM logs_legacy')
+        sources['classes'].append('SELECT class AS value FROM logs_legacy')
+        sources['services'].append('SELECT service AS value FROM logs_legacy')
+        sources['levels'].append('SELECT level AS value FROM logs_legacy')
+    dimension_columns = {'class': 'classes', 'service': 'services', 'level': 'levels'}
+    for table, columns in (
+        ('class_level_counts', ('class', 'level')),
+        ('service_level_counts', ('service', 'level')),
+        ('timeline_counts', ('level',)),
+        ('class_service_counts', ('class', 'service'))
+    ):
+        if table in legacy_tables:
+            sources['job_keys'].append(f'SELECT job_id AS value FROM {table}_legacy')
+            for column in columns:
+                sources[dimension_columns[column]].append(f'SELECT {column} AS value FROM {table}_legacy')
+    for dimension, selects in sources.items():
+        if selects:
+            column = 'job_id' if dimension == 'job_keys' else 'name'
+            cursor.execute(f'''
+                INSERT OR IGNORE INTO {dimension} ({column})
+                SELECT value FROM ({' UNION '.join(selects)}) WHERE value IS NOT NULL
+            ''')
     
-    except Exception as e:
-        logger.error(f"Error exporting to Excel for job_id {job_id}: {str(e)}")
-        raise
\ No newline at end of file
+    if 'logs' in legacy_tables:
+        cursor.execute('''
+            INSERT OR IGNORE INTO source_files (folder, file_name)
+            SELECT DISTINCT folder, file_name FROM logs_legacy
+        ''')
+        cursor.execute('''
+            INSERT INTO logs (id, job_key, timestamp, level_id, class_id, service_id, log_message, file_id, line_idx)
+            SELECT l.id, j.job_key, l.timestamp, lv.id, c.id, s.id, l.log_message, f.id, l.line_idx
+            FROM logs_legacy l
+            LEFT JOIN job_keys j ON j.job_id = l.job_id
+            LEFT JOIN levels lv ON lv.name = l.level
+            LEFT JOIN classes c ON c.name = l.class
+            LEFT JOIN services s ON s.name = l.service
+            LEFT JOIN source_files f ON f.folder IS l.folder AND f.file_name IS l.file_name
+        ''')
+    if 'class_level_counts' in legacy_tables:
+        cursor.execute('''
+            INSERT INTO class_level_counts (job_key, class_id, level_id, count)
+            SELECT j.job_key, c.id, lv.id, t.count
+            FROM class_level_counts_legacy t
+            JOIN job_keys j ON j.job_id = t.job_id
+            JOIN classes c ON c.name = t.class
+            JOIN levels lv ON lv.name = t.level
+        ''')
+    if 'service_level_counts' in legacy_tables:
+        cursor.execute('''
+            INSERT INTO service_level_counts (job_key, service_id, level_id, count)
+            SELECT j.job_key, s.id, lv.id, t.count
+            FROM service_level_counts_legacy t
+            JOIN job_keys j ON j.job_id = t.job_id
+            JOIN services s ON s.name = t.service
+            JOIN levels lv ON lv.name = t.level
+        ''')
+    if 'timeline_counts' in legacy_tables:
+        cursor.execute('''
+            INSERT INTO timeline_counts (job_key, hour, level_id, count)
+            SELECT j.job_key, t.hour, lv.id, t.count
+            FROM timeline_counts_legacy t
+            JOIN job_keys j ON j.job_id = t.job_id
+            JOIN levels lv ON lv.name = t.level
+        ''')
+    if 'class_service_counts' in legacy_tables:
+        cursor.execute('''
+            INSERT INTO class_service_counts (job_key, class_id, service_id, count)
+            SELECT j.job_key, c.id, s.id, t.count
+            FROM class_service_counts_legacy t
+            JOIN job_keys j ON j.job_id = t.job_id
+            JOIN classes c ON c.name = t.class
+            JOIN services s ON s.name = t.service
+        ''')
+    for table in legacy_tables:
+        cursor.execute(f'DROP TABLE {table}_legacy')
+    logger.info("Legacy tables migrated to the dictionary-encoded schema")
+
+def _split_shared_database(conn: sqlite3.Connection):
+    """Move each job's rows from the shared catalog tables into the job's own database.
+
+    Row ids are kept, so ingest checkpoints (committed_log_id) stay valid. Each job is
+    copied in its own transaction with INSERT OR IGNORE, so an interrupted split simply
+    runs again on the next start. The shared tables are dropped once every job is moved.
+    """
+    cursor = conn.cursor()
+    job_ids = [row[0] for row in cursor.execute('SELECT job_id FROM jobs').fetchall()]
+    logger.info(f"Moving {len(job_ids)} jobs from the shared database into per-job databases")
+    
+    def copy_rows(table: str, where: str = '', params: tuple = ()):
+        columns = ', '.join(row[1] for row in cursor.execute(f'PRAGMA main.table_info({table})').fetchall())
+        cursor.execute(f'''
+            INSERT OR IGNORE INTO job.{table} ({columns})
+            SELECT {columns} FROM main.{table} {where}
+        ''', params)
+    
+    for job_id in job_ids:
+        init_job_db(job_id)
+        attach_job_db(conn, job_id, 'job')
+        try:
+            for table in SHARED_DIMENSION_TABLES:
+                copy_rows(table)
+            row = cursor.execute('SELECT job_key FROM main.job_keys WHERE job_id = ?', (job_id,)).fetchone()
+            if row:
+                for table in ('job_keys',) + SHARED_JOB_KEY_TABLES:
+                    copy_rows(table, 'WHERE job_key = ?', (row[0],))
+            for table in SHARED_JOB_ID_TABLES:
+                copy_rows(table, 'WHERE job_id = ?', (job_id,))
+            # The job file was created at the current version, so fill what its upgrade would have
+            _fill_ts(conn, 'job')
+            _fill_timeline_rollups(conn, 'job')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.execute('DETACH DATABASE job')
+        logger.info(f"Moved job_id: {job_id} to {job_db_path(job_id)}")
+    
+    for table in ('job_keys',) + SHARED_DIMENSION_TABLES + SHARED_JOB_KEY_TABLES + SHARED_JOB_ID_TABLES:
+        cursor.execute(f'DROP TABLE IF EXISTS main.{table}')
+    conn.commit()
+    logger.info(f"Shared tables removed; run VACUUM on {CATALOG_DB} to reclaim the freed space")
+
+# Summary queries by query_type: result columns and SQL selecting them for a job_id
+ANALYSIS_QUERIES = {
+    'class': (['class', 'level', 'count'], """
+        SELECT c.name AS class, lv.name AS level, t.count
+        FROM class_level_counts t
+        JOIN classes c ON c.id = t.class_id
+        JOIN levels lv ON lv.id = t.level_id
+        WHERE t.job_key = (SELECT job_key FROM job_keys WHERE job_id = ?)
+    """),
+    'service': (['service', 'level', 'count'], """
+        SELECT s.name AS service, lv.name AS level, t.count
+        FROM service_level_counts t
+        JOIN services s ON s.id = t.service_id
+        JOIN levels lv ON lv.id = t.level_id
+        WHERE t.job_key = (SELECT job_key FROM job_keys WHERE job_id = ?)
+    """),
+    'timeline': (['hour', 'level', 'count'], """
+        SELECT t.hour, lv.name AS level, t.count
+        FROM timeline_counts t
+        JOIN levels lv ON lv.id = t.level_id
+        WHERE t.job_key = (SELECT job_key FROM job_keys WHERE job_id = ?)
+        ORDER BY t.hour
+    """),
+    'class_service': (['class', 'service', 'count'], """
+        SELECT c.name AS class, s.name AS service, t.count
+        FROM class_service_counts t
+        JOIN classes c ON c.id = t.class_id
+        JOIN services s ON s.id = t.service_id
+        WHERE t.job_key = (SELECT job_key FROM job_keys WHERE job_id = ?)
+    """)
+}
+
+def query_analysis_rows(conn: sqlite3.Connection, job_id: str, query_type: str) -> tuple:
+    """Return the columns and rows of a job's summary for query_type (see ANALYSIS_QUERIES)."""
+    if query_type not in ANALYSIS_QUERIES:
+        raise ValueError(f"Invalid query_type: {query_type}")
+    columns, query = ANALYSIS_QUERIES[query_type]
+    return columns, conn.execute(query, (job_id,)).fetchall()
+
+def analysis_frame(query_type: str, columns: list, rows: list) -> pd.DataFrame:
+    """Build the DataFrame of a summary from query_analysis_rows' result."""
+    df = pd.DataFrame(rows, columns=columns)
+    if query_type == 'timeline' and not df.empty:
+        # Convert hour to datetime for consistent plotting
+        df['hour'] = pd.to_datetime(df['hour'], format='%Y-%m-%d %H:00:00', errors='coerce')
+        df = df.dropna(subset=['hour'])  # Drop rows with invalid datetime
+    return df
+
+def query_timeline(conn: sqlite3.Connection, job_id: str, start_ms: Optional[int] = None,
+                   end_ms: Optional[int] = None, max_points: int = 1500) -> Dict:
+    """Return a job's log counts by level over a time window from timeline_rollups.
+
+    The window defaults to the whole job. Counts come from the finest resolution that
+    keeps the window within max_points buckets (or the finest stored at or above it), so
+    every query reads at most max_points rows per level. Returns the resolution's name and
+    size, the window and the (bucket_ms, level, count) rows in time order.
+    """
+    job_key = '(SELECT job_key FROM job_keys WHERE job_id = ?)'
+    if start_ms is None or end_ms is None:
+        finest = conn.execute(f'SELECT MIN(resolution_ms) FROM timeline_rollups WHERE job_key = {job_key}',
+                              (job_id,)).fetchone()[0]
+        first, last = conn.execute(f'''
+            SELECT MIN(bucket_ms), MAX(bucket_ms) FROM timeline_rollups WHERE job_key = {job_key} AND resolution_ms = ?
+        ''', (job_id, finest)).fetchone()
+        if first is None:
+            return {'resolution': None, 'resolution_ms': None, 'start_ms': None, 'end_ms': None,
+                    'columns': ['bucket_ms', 'level', 'count'], 'rows': []}
+        start_ms = first if start_ms is None else start_ms
+        end_ms = last + finest if end_ms is None else end_ms
+    span = max(end_ms - start_ms, 1)
+    wanted = next((size for size in TIMELINE_RESOLUTIONS.values() if span / size <= max_points),
+                  max(TIMELINE_RESOLUTIONS.values()))
+    resolution_ms = conn.execute(f'''
+        SELECT MIN(resolution_ms) FROM timeline_rollups WHERE job_key = {job_key} AND resolution_ms >= ?
+    ''', (job_id, wanted)).fetchone()[0] or wanted
+    rows = conn.execute(f'''
+        SELECT t.bucket_ms, lv.name AS level, t.count
+        FROM timeline_rollups t
+        JOIN levels lv ON lv.id = t.level_id
+        WHERE t.job_key = {job_key} AND t.resolution_ms = ? AND t.bucket_ms >= ? AND t.bucket_ms < ?
+        ORDER BY t.bucket_ms
+    ''', (job_id, resolution_ms, start_ms - start_ms % resolution_ms, end_ms)).fetchall()
+    resolution = next(name for name, size in TIMELINE_RESOLUTIONS.items() if size == resolution_ms)
+    return {'resolution': resolution, 'resolution_ms': resolution_ms, 'start_ms': start_ms, 'end_ms': end_ms,
+            'columns': ['bucket_ms', 'level', 'count'], 'rows': rows}
+
+def timeline_frame(columns: list, rows: list) -> pd.DataFrame:
+    """Build the DataFrame of query_timeline's rows, with bucket_ms as a UTC time column."""
+    df = pd.DataFrame(rows, columns=columns)
+    df['time'] = pd.to_datetime(df['bucket_ms'], unit='ms')
+    return df[['time', 'level', 'count']]
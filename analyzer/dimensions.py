@@ -0,0 +1,74 @@
+import logging
+import sqlite3
+from typing import Dict, Iterable, List, Tuple
+
+# Configure logging
+logging.basicConfig(
+    filename='log_analyzer.log',
+    level=logging.DEBUG,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Dimension tables holding one row per distinct name
+NAME_TABLES = ('classes', 'services', 'levels')
+
+class Dimensions:
+    """Maps class, service and level names, source files and job ids to integer ids.
+
+    logs and the summary tables store these integer ids instead of repeating the strings.
+    Ids are created on first use with INSERT OR IGNORE in the caller's transaction and
+    cached for the lifetime of the instance, so a batch only touches the dimension tables
+    for names it has not seen before.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        """Initialize Dimensions with empty caches for conn."""
+        self.conn = conn
+        self._ids: Dict[str, Dict[str, int]] = {table: {} for table in NAME_TABLES}
+        self._file_ids: Dict[Tuple[str, str], int] = {}
+        self._job_keys: Dict[str, int] = {}
+
+    def id(self, table: str, name: str) -> int:
+        """Return the id of name in a dimension table, creating it if needed."""
+        ids = self._ids[table]
+        value_id = ids.get(name)
+        if value_id is None:
+            self.conn.execute(f'INSERT OR IGNORE INTO {table} (name) VALUES (?)', (name,))
+            value_id = ids[name] = self.conn.execute(
+                f'SELECT id FROM {table} WHERE name = ?', (name,)
+            ).fetchone()[0]
+        return value_id
+
+    def ids(self, table: str, names: Iterable[str]) -> List[int]:
+        """Return the ids of a column of names, creating the ones not seen before."""
+        ids = self._ids[table]
+        try:
+            return [ids[name] for name in names]
+        except KeyError:
+            for name in set(names) - ids.keys():
+                self.id(table, name)
+            return [ids[name] for name in names]
+
+    def file_id(self, folder: str, file_name: str) -> int:
+        """Return the id of a source file, creating it if needed."""
+        key = (folder, file_name)
+        file_id = self._file_ids.get(key)
+        if file_id is None:
+            self.conn.execute(
+                'INSERT OR IGNORE INTO source_files (folder, file_name) VALUES (?, ?)', key
+            )
+            file_id = self._file_ids[key] = self.conn.execute(
+                'SELECT id FROM source_files WHERE folder = ? AND file_name = ?', key
+            ).fetchone()[0]
+        return file_id
+
+    def job_key(self, job_id: str) -> int:
+        """Return the integer key of a job, creating it if needed."""
+        job_key = self._job_keys.get(job_id)
+        if job_key is None:
+            self.conn.execute('INSERT OR IGNORE INTO job_keys (job_id) VALUES (?)', (job_id,))
+            job_key = self._job_keys[job_id] = self.conn.execute(
+                'SELECT job_key FROM job_keys WHERE job_id = ?', (job_id,)
+            ).fetchone()[0]
+        return job_key
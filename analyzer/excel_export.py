@@ -0,0 +1,175 @@
+import glob
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from itertools import groupby
+from typing import Callable, List, Optional
+
+import xlsxwriter
+
+from analyzer.data_manager import ANALYSIS_QUERIES, job_db_path
+
+# Configure logging
+logging.basicConfig(
+    filename='log_analyzer.log',
+    level=logging.DEBUG,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+EXPORTS_DIR = os.path.join('data', 'exports')
+
+# Rows per worksheet in .xlsx files, header included
+EXCEL_MAX_ROWS = 1048576
+
+def excel_exports_dir(job_id: str) -> str:
+    """Return the directory holding a job's cached Excel exports."""
+    return os.path.join(EXPORTS_DIR, os.path.basename(job_db_path(job_id))[:-len('.db')])
+
+def excel_export_path(job_id: str, version: str) -> str:
+    """Return the path of a job's Excel export for a version of its data."""
+    return os.path.join(excel_exports_dir(job_id), f'analysis_results_{version}.xlsx')
+
+def delete_excel_exports(job_id: str):
+    """Delete every cached Excel export of a job."""
+    shutil.rmtree(excel_exports_dir(job_id), ignore_errors=True)
+
+class SheetWriter:
+    """Writes rows in order to a worksheet, continuing on new sheets past Excel's row limit.
+
+    Each row is written whole with write_row, as the workbook's constant_memory mode
+    requires. When a sheet reaches max_rows, the rows continue on '<name> (2)',
+    '<name> (3)', ... and each of them repeats the header.
+    """
+
+    def __init__(self, workbook: xlsxwriter.Workbook, name: str, headers: List[str],
+                 header_format, cell_format, max_rows: int = EXCEL_MAX_ROWS):
+        """Initialize SheetWriter and add its first sheet."""
+        self.workbook = workbook
+        self.name = name
+        self.headers = headers
+        self.header_format = header_format
+        self.cell_format = cell_format
+        self.max_rows = max_rows
+        self.sheets = 0
+        self._add_sheet()
+
+    def _add_sheet(self):
+        """Start the next sheet with the header row."""
+        self.sheets += 1
+        sheet_name = self.name if self.sheets == 1 else f'{self.name} ({self.sheets})'
+        self.worksheet = self.workbook.add_worksheet(sheet_name)
+        self.worksheet.write_row(0, 0, self.headers, self.header_format)
+        self.row = 1
+
+    def write(self, values: list):
+        """Write one row."""
+        if self.row >= self.max_rows:
+            self._add_sheet()
+        self.worksheet.write_row(self.row, 0, values, self.cell_format)
+        self.row += 1
+
+def _summary_query(query_type: str) -> str:
+    """Return the summary query of query_type (see ANALYSIS_QUERIES) as a subquery."""
+    return f'({ANALYSIS_QUERIES[query_type][1]})'
+
+def export_summary_workbook(conn: sqlite3.Connection, job_id: str, output_file: str,
+                            on_progress: Optional[Callable[[int, int], None]] = None,
+                            progress_rows: int = 10000, max_rows: int = EXCEL_MAX_ROWS) -> int:
+    """Write a job's summaries to an Excel workbook and return the number of rows written.
+
+    The sheets are the class and service level count pivots, the timeline and the class
+    and service totals. Pivots and totals are computed in SQL and every sheet is streamed
+    from its cursor into a constant_memory workbook, so memory use does not grow with the
+    job. The workbook is written next to output_file and moved into place once complete.
+    on_progress is called with the rows written and the total every progress_rows rows.
+    """
+    start_time = time.time()
+    class_query, service_query, timeline_query = (
+        _summary_query('class'), _summary_query('service'), _summary_query('timeline')
+    )
+    total_rows = sum(conn.execute(query, (job_id,)).fetchone()[0] for query in (
+        f'SELECT COUNT(DISTINCT class) * 2 FROM {class_query}',
+        f'SELECT COUNT(DISTINCT service) * 2 FROM {service_query}',
+        f'SELECT COUNT(*) FROM {timeline_query}'
+    ))
+    rows_written = 0
+
+    def written():
+        nonlocal rows_written
+        rows_written += 1
+        if on_progress and rows_written % progress_rows == 0:
+            on_progress(rows_written, total_rows)
+
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    temp_file = f'{output_file}.{os.getpid()}.tmp'
+    try:
+        with xlsxwriter.Workbook(temp_file, {'constant_memory': True}) as workbook:
+            header_format = workbook.add_format({
+                'bold': True,
+                'bg_color': '#12133f',
+                'font_color': '#FFFFFF',
+                'border': 1
+            })
+            cell_format = workbook.add_format({'border': 1})
+
+            # Class and service level counts, one column per level
+            for dimension, query, sheet_name in (('class', class_query, 'Class Level Counts'),
+                                                 ('service', service_query, 'Service Level Counts')):
+                levels = [row[0] for row in conn.execute(
+                    f'SELECT DISTINCT level FROM {query} ORDER BY level', (job_id,)
+                )]
+                sheet = SheetWriter(workbook, sheet_name, [dimension.capitalize()] + levels,
+                                    header_format, cell_format, max_rows)
+                rows = conn.execute(f'SELECT {dimension}, level, count FROM {query} ORDER BY {dimension}', (job_id,))
+                for name, group in groupby(rows, key=lambda row: row[0]):
+                    counts = {row[1]: row[2] for row in group}
+                    sheet.write([name] + [counts.get(level, 0) for level in levels])
+                    written()
+
+            sheet = SheetWriter(workbook, 'Timeline Data', ['Hour', 'Level', 'Count'],
+                                header_format, cell_format, max_rows)
+            for row in conn.execute(f'SELECT hour, level, count FROM {timeline_query}', (job_id,)):
+                sheet.write(row)
+                written()
+
+            for dimension, query, sheet_name in (('class', class_query, 'Class Totals'),
+                                                 ('service', service_query, 'Service Totals')):
+                sheet = SheetWriter(workbook, sheet_name, [dimension.capitalize(), 'Count'],
+                                    header_format, cell_format, max_rows)
+                for row in conn.execute(
+                    f'SELECT {dimension}, SUM(count) FROM {query} GROUP BY {dimension} ORDER BY {dimension}', (job_id,)
+                ):
+                    sheet.write(row)
+                    written()
+        os.replace(temp_file, output_file)
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+    if on_progress:
+        on_progress(rows_written, total_rows)
+    logger.info(f"Exported {rows_written} summary rows to {output_file} for job_id: {job_id} "
+                f"({time.time() - start_time:.2f}s)")
+    return rows_written
+
+def excel_version_time(version: str) -> str:
+    """Return the data time a version starts with ('<YYYYMMDDHHMMSS>-<hash>'); '' for versions without one."""
+    stamp, separator, _ = version.partition('-')
+    return stamp if separator else ''
+
+def prune_excel_exports(job_id: str, version: str):
+    """Delete a job's Excel exports of data versions older than version.
+
+    Exports finish in any order, so a version's export that completes after a newer
+    one's must not delete the newer file. Exports of the same data time are kept.
+    """
+    keep_time = excel_version_time(version)
+    prefix, suffix = 'analysis_results_', '.xlsx'
+    for path in glob.glob(os.path.join(excel_exports_dir(job_id), f'{prefix}*{suffix}')):
+        if excel_version_time(os.path.basename(path)[len(prefix):-len(suffix)]) < keep_time:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,422 @@
+import asyncio
+import gzip
+import logging
+import multiprocessing
+import os
+import queue
+import sqlite3
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from analyzer.log_processor import LogBatch, LogProcessor
+from analyzer.log_store import LogStore
+from analyzer.summary_accumulator import SummaryAccumulator
+
+# Configure logging
+logging.basicConfig(
+    filename='log_analyzer.log',
+    level=logging.DEBUG,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Compressed bytes per chunk when an opened stream is fed to a parse worker
+FEED_CHUNK_SIZE = 1024 * 1024
+# How often a blocked queue get or put checks whether the pipeline has stopped
+POLL_SECONDS = 0.2
+
+class PipelineStopped(Exception):
+    """Raised in a parse worker or pipeline thread once the pipeline has stopped."""
+
+def _put(target, item, stop):
+    """Put item on a bounded queue, raising PipelineStopped once stop is set."""
+    while True:
+        if stop.is_set():
+            raise PipelineStopped()
+        try:
+            target.put(item, timeout=POLL_SECONDS)
+            return
+        except queue.Full:
+            pass
+
+def _get(source, stop):
+    """Get the next item from a queue, raising PipelineStopped once stop is set."""
+    while True:
+        if stop.is_set():
+            raise PipelineStopped()
+        try:
+            return source.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            pass
+
+class FedStream:
+    """Read-only stream over the compressed chunks fed to a parse worker's task queue.
+
+    The feeder ends a file with b''; None means the feeder failed before the end.
+    """
+
+    def __init__(self, tasks, stop):
+        self._tasks = tasks
+        self._stop = stop
+        self._chunk = b''
+        self._offset = 0
+        self._eof = False
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            return b''.join(iter(lambda: self.read(FEED_CHUNK_SIZE), b''))
+        if self._offset >= len(self._chunk):
+            if self._eof:
+                return b''
+            chunk = _get(self._tasks, self._stop)
+            if chunk is None:
+                raise OSError("Compressed stream ended before the end of the file")
+            self._chunk, self._offset = chunk, 0
+            if not chunk:
+                self._eof = True
+                return b''
+        data = self._chunk[self._offset:self._offset + size]
+        self._offset += len(data)
+        return data
+
+    def drain(self):
+        """Read past anything left of the file, such as data after the last gzip member."""
+        while self.read(FEED_CHUNK_SIZE):
+            pass
+
+    def close(self):
+        pass
+
+def parse_files_in_worker(valid_levels: Tuple[str, ...], tasks, results, stop):
+    """Decompress and parse whole files in a parse worker (process or thread) until stop is set.
+
+    Each task is (file_path, source_path, line_idx, byte_offset). The worker opens
+    source_path itself, or reads the file's compressed bytes from the task queue when it
+    is None. The file is decompressed from byte_offset and each block is put on results as
+    ('batch', batch, stats, next_line_idx, byte_offset, block_lines, block_bytes), followed
+    by ('end', line_idx). A failure puts ('error', traceback) and ends the worker.
+    """
+    processor = LogProcessor(valid_levels)
+    try:
+        while True:
+            file_path, source_path, line_idx, byte_offset = _get(tasks, stop)
+            source = open(source_path, 'rb') if source_path is not None else FedStream(tasks, stop)
+            try:
+                stream = gzip.GzipFile(fileobj=source, mode='rb')
+                if byte_offset:
+                    # gzip cannot seek, so this decompresses and discards up to the checkpoint
+                    stream.seek(byte_offset)
+                for block in LogProcessor.iter_blocks(stream):
+                    next_line_idx = line_idx + block.count(b'\n') + (0 if block.endswith(b'\n') else 1)
+                    byte_offset += len(block)
+                    batch, stats = processor.parse_block(block, line_idx)
+                    _put(results, ('batch', batch, stats, next_line_idx, byte_offset,
+                                   next_line_idx - line_idx, len(block)), stop)
+                    line_idx = next_line_idx
+                if source_path is None:
+                    source.drain()
+            finally:
+                source.close()
+            _put(results, ('end', line_idx), stop)
+    except PipelineStopped:
+        if hasattr(results, 'cancel_join_thread'):
+            # Batches the writer will never read must not keep a worker process from exiting
+            results.cancel_join_thread()
+    except Exception:
+        try:
+            _put(results, ('error', traceback.format_exc()), stop)
+        except PipelineStopped:
+            pass
+
+class ParseWorker:
+    """A parse worker with its own bounded task and result queues.
+
+    The worker is a process, or a thread when the pipeline runs a single worker. Its files
+    are fed through one feeder thread, so a file's task and compressed chunks are never
+    interleaved with the next file's.
+    """
+
+    def __init__(self, valid_levels: Tuple[str, ...], use_process: bool, queue_depth: int):
+        if use_process:
+            context = multiprocessing.get_context()
+            self.tasks, self.results, self.stop = context.Queue(queue_depth), context.Queue(queue_depth), context.Event()
+            self._worker = context.Process(target=parse_files_in_worker, daemon=True,
+                                           args=(valid_levels, self.tasks, self.results, self.stop))
+        else:
+            self.tasks, self.results, self.stop = queue.Queue(queue_depth), queue.Queue(queue_depth), threading.Event()
+            self._worker = threading.Thread(target=parse_files_in_worker, daemon=True, name="ingest-parse",
+                                            args=(valid_levels, self.tasks, self.results, self.stop))
+        self.use_process = use_process
+        self.feeder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-feed")
+        self._worker.start()
+
+    def is_alive(self) -> bool:
+        return self._worker.is_alive()
+
+    def close(self):
+        """Stop the worker; a process still running after a second is terminated."""
+        self.stop.set()
+        # Feeds not started yet give up at once and close their sources
+        self.feeder.shutdown(wait=False)
+        if self.use_process:
+            self._worker.join(timeout=1)
+            if self._worker.is_alive():
+                self._worker.terminate()
+            # Chunks the stopped worker never read must not hold up interpreter exit
+            self.tasks.cancel_join_thread()
+
+def _close_source(future: asyncio.Future):
+    """Done callback that closes a source opened for a file that will not be ingested."""
+    if not future.cancelled() and future.exception() is None and hasattr(future.result(), 'close'):
+        future.result().close()
+
+class IngestPipeline:
+    """Runs a job's ingest as fetch → parse → aggregate/write stages.
+
+    Stages are asyncio tasks joined by bounded queues, so a slow stage applies backpressure
+    to the ones before it. Every blocking step runs off the event loop: up to
+    prefetch_files sources are opened (or downloaded) concurrently in I/O threads, and
+    files are handed out in turn to `workers` parse worker processes (a single thread when
+    workers is 1). Each worker decompresses and parses whole files and sends back only
+    parsed batches with their line and byte checkpoints. A local file is opened by the
+    worker itself; an opened stream is fed to it in compressed chunks. Log store writes
+    plus summary aggregation run in one writer thread that owns the connection while the
+    pipeline runs and takes files in order. The event loop only moves items between
+    queues, so the API stays responsive during ingest.
+
+    Each written batch checkpoints its file's line and decompressed byte offset on the
+    accumulator, and a file with a stored checkpoint is resumed from that offset. A pause
+    stops the pipeline after the batch being written.
+    """
+
+    def __init__(self, job_id: str, conn: sqlite3.Connection, accumulator: SummaryAccumulator,
+                 log_store: LogStore,
+                 open_source: Callable[[str], Union[str, BinaryIO, None]],
+                 on_file_done: Callable[[str], None],
+                 is_paused: Callable[[], bool],
+                 valid_levels: Iterable[str],
+                 workers: int = 1, queue_depth: int = 8, prefetch_files: int = 2,
+                 checkpoints: Optional[Dict[str, Tuple[int, int]]] = None,
+                 on_batch_written: Optional[Callable[[int, int], None]] = None):
+        """Initialize the pipeline.
+
+        Args:
+            conn: Connection opened with check_same_thread=False; used only by the writer thread.
+            log_store: Where parsed rows are written; it is committed by the accumulator.
+            open_source: Returns the path of a local gzip file for a parse worker to open, or
+                opens a file path as a gzip-compressed binary stream (None if missing).
+            on_file_done: Called in the writer thread after the last batch of a file is written.
+            is_paused: Checked before each new file is fetched and after each written batch.
+            workers: Parse worker processes; 1 parses in a background thread instead.
+            queue_depth: Parsed batches each worker may have waiting for the writer.
+            prefetch_files: Files opened concurrently ahead of the ones being parsed.
+            checkpoints: {file_path: (line_idx, byte_offset)} to resume partly ingested files from.
+            on_batch_written: Called on the event loop with the lines and decompressed bytes of
+                each written batch, for progress reporting.
+        """
+        self.job_id = job_id
+        self.conn = conn
+        self.accumulator = accumulator
+        self.open_source = open_source
+        self.on_file_done = on_file_done
+        self.is_paused = is_paused
+        self.valid_levels = tuple(valid_levels)
+        self.workers = max(1, workers)
+        self.queue_depth = max(1, queue_depth)
+        self.prefetch_files = max(1, prefetch_files)
+        self.checkpoints = dict(checkpoints or {})
+        self.log_store = log_store
+        self.on_batch_written = on_batch_written
+        self.paused = False
+
+    async def run(self, file_paths: List[str]) -> bool:
+        """Ingest file_paths in order. Returns True if the job was paused before all were ingested."""
+        self._loop = asyncio.get_running_loop()
+        self._fetched = asyncio.Queue(maxsize=self.prefetch_files)
+        # Files handed to workers ahead of the one being written
+        self._files = asyncio.Queue(maxsize=self.workers)
+        self._stopped = threading.Event()
+        self._io = ThreadPoolExecutor(max_workers=self.prefetch_files, thread_name_prefix="ingest-io")
+        self._reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-results")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-writer")
+        self._workers = [ParseWorker(self.valid_levels, self.workers > 1, self.queue_depth)
+                         for _ in range(self.workers)]
+
+        tasks = [
+            asyncio.create_task(self._fetch_stage(file_paths)),
+            asyncio.create_task(self._dispatch_stage()),
+            asyncio.create_task(self._write_stage())
+        ]
+        write_task = tasks[-1]
+        try:
+            # The write stage finishes last, or first when the job is paused mid-file
+            pending = set(tasks)
+            while write_task in pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._stopped.set()
+            self._discard_fetched()
+            for worker in self._workers:
+                worker.stop.set()
+            for worker in self._workers:
+                worker.close()
+            self._io.shutdown(wait=False, cancel_futures=True)
+            self._reader.shutdown(wait=False)
+            # The caller reuses the connection, so wait for an in-progress write to finish
+            await self._loop.run_in_executor(None, self._writer.shutdown)
+        return self.paused
+
+    async def _fetch_stage(self, file_paths: List[str]):
+        """Start opening each file's compressed stream ahead of the parse workers.
+
+        Opens run concurrently; the bounded queue of pending opens limits how far ahead
+        of the dispatch stage they get.
+        """
+        for idx, file_path in enumerate(file_paths):
+            if self.is_paused():
+                self.paused = True
+                logger.info(f"Job {self.job_id} paused with {len(file_paths) - idx} files remaining")
+                break
+            logger.info(f"Processing file {file_path} for job {self.job_id}")
+            future = self._loop.run_in_executor(self._io, self.open_source, file_path)
+            try:
+                await self._fetched.put((file_path, future))
+            except asyncio.CancelledError:
+                future.add_done_callback(_close_source)
+                raise
+        await self._fetched.put(None)
+
+    def _discard_fetched(self):
+        """Close sources that were opened ahead but never handed to a worker."""
+        while not self._fetched.empty():
+            item = self._fetched.get_nowait()
+            if item is not None:
+                item[1].add_done_callback(_close_source)
+
+    async def _dispatch_stage(self):
+        """Hand opened files to the parse workers in turn, queueing them for the writer in file order."""
+        dispatched = 0
+        while True:
+            item = await self._fetched.get()
+            if item is None:
+                break
+            file_path, future = item
+            try:
+                source = await future
+            except asyncio.CancelledError:
+                future.add_done_callback(_close_source)
+                raise
+            line_idx, byte_offset = self.checkpoints.get(file_path, (0, 0))
+            if source is None:
+                await self._files.put((file_path, None, None, line_idx))
+                continue
+            if byte_offset:
+                logger.info(f"Resuming {file_path} at line {line_idx} for job {self.job_id}")
+            worker = self._workers[dispatched % len(self._workers)]
+            dispatched += 1
+            feed = self._loop.run_in_executor(worker.feeder, self._feed, worker, file_path, source,
+                                              line_idx, byte_offset)
+            await self._files.put((file_path, worker, feed, line_idx))
+        await self._files.put(None)
+
+    def _feed(self, worker: ParseWorker, file_path: str, source: Union[str, BinaryIO],
+              line_idx: int, byte_offset: int):
+        """Queue a file on a worker, followed by its compressed chunks when source is a stream."""
+        if isinstance(source, str):
+            try:
+                _put(worker.tasks, (file_path, source, line_idx, byte_offset), self._stopped)
+            except PipelineStopped:
+                pass
+            return
+        try:
+            _put(worker.tasks, (file_path, None, line_idx, byte_offset), self._stopped)
+            while True:
+                chunk = source.read(FEED_CHUNK_SIZE)
+                _put(worker.tasks, chunk, self._stopped)
+                if not chunk:
+                    break
+        except PipelineStopped:
+            pass
+        except Exception:
+            # The worker would otherwise wait for the rest of the file
+            try:
+                _put(worker.tasks, None, self._stopped)
+            except PipelineStopped:
+                pass
+            raise
+        finally:
+            source.close()
+
+    def _next_result(self, worker: ParseWorker):
+        """Wait for a worker's next result; raises if the worker died or the pipeline stopped."""
+        while True:
+            try:
+                return worker.results.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                if self._stopped.is_set():
+                    raise PipelineStopped()
+                if not worker.is_alive():
+                    raise RuntimeError(f"Parse worker of job {self.job_id} exited unexpectedly")
+
+    async def _write_stage(self):
+        """Aggregate and write parsed batches, completing files in order."""
+        while True:
+            item = await self._files.get()
+            if item is None:
+                break
+            file_path, worker, feed, lines = item
+            file_stats = {'missing_class': 0, 'invalid_timestamp': 0}
+            while worker is not None:
+                result = await self._loop.run_in_executor(self._reader, self._next_result, worker)
+                if result[0] == 'end':
+                    lines = result[1]
+                    break
+                if result[0] == 'error':
+                    # A failed feed (such as a broken download) is what stopped the worker, so raise it first
+                    await feed
+                    raise RuntimeError(f"Parsing {file_path} failed for job {self.job_id}:\n{result[1]}")
+                _, batch, stats, next_line_idx, byte_offset, block_lines, block_bytes = result
+                file_stats['missing_class'] += stats['missing_class']
+                file_stats['invalid_timestamp'] += stats['invalid_timestamp']
+                if stats['invalid_json']:
+                    logger.warning(f"Skipped {stats['invalid_json']} invalid JSON lines in {file_path} "
+                                   f"before line {batch.line_idx[-1] if batch else 0}")
+                await self._loop.run_in_executor(
+                    self._writer, self._write_batch, file_path, batch, next_line_idx, byte_offset
+                )
+                if self.on_batch_written:
+                    self.on_batch_written(block_lines, block_bytes)
+                if self.is_paused():
+                    self.paused = True
+                    logger.info(f"Job {self.job_id} paused in {file_path} at line {next_line_idx}")
+                    return
+            if feed is not None:
+                await feed
+            await self._loop.run_in_executor(self._writer, self.on_file_done, file_path)
+            logger.info(f"Processed log file: {file_path} for job_id: {self.job_id}, lines: {lines}, "
+                       f"missing or invalid class formats: {file_stats['missing_class']}, "
+                       f"invalid timestamps: {file_stats['invalid_timestamp']}")
+
+    def _write_batch(self, file_path: str, batch: LogBatch, next_line_idx: int, byte_offset: int):
+        """Write a parsed batch to the log store, count it and checkpoint its file.
+
+        The counts and checkpoint are committed with the accumulator's next flush, together
+        with the log store's record of the rows they cover.
+        """
+        if batch:
+            dimensions = self.accumulator.dimensions
+            file_id = dimensions.file_id(os.path.dirname(file_path), os.path.basename(file_path))
+            self.log_store.write_batch(self.conn, dimensions, file_id, batch)
+            self.accumulator.add(batch)
+        self.accumulator.checkpoint(file_path, next_line_idx, byte_offset)
+        if self.accumulator.should_flush():
+            self.accumulator.flush(self.conn)
+        else:
+            self.conn.commit()
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+class JobProgress:
+    """Live ingest counters of one job, pushed to the backend's progress stream subscribers.
+
+    The ingest pipeline records the lines and decompressed bytes of every written batch,
+    and the backend calls notify when a file finishes or the job's status changes. Each
+    change bumps version and wakes the subscribers waiting in wait_for_change, which may
+    be called from any thread. Line and byte rates cover the last window_seconds, so they
+    fall off while ingest stalls; the ETA extrapolates the time per file of the current run.
+    """
+
+    __slots__ = ('window_seconds', 'lines', 'bytes', 'version', 'started_at', 'files_at_start',
+                 '_samples', '_lock', '_loop', '_changed')
+
+    def __init__(self, window_seconds: float = 10.0):
+        """Initialize JobProgress; must be created on the event loop that subscribers wait on."""
+        self.window_seconds = window_seconds
+        self.lines = 0
+        self.bytes = 0
+        self.version = 0
+        self.started_at = time.time()
+        self.files_at_start = 0
+        self._samples = deque()
+        self._lock = threading.Lock()
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+
+    def start(self, files_processed: int):
+        """Reset the counters for a new run of the job that starts with files_processed files done."""
+        with self._lock:
+            self.lines = 0
+            self.bytes = 0
+            self.started_at = time.time()
+            self.files_at_start = files_processed
+            self._samples.clear()
+        self.notify()
+
+    def record_batch(self, lines: int, byte_count: int):
+        """Count a written batch of lines holding byte_count decompressed bytes."""
+        now = time.time()
+        with self._lock:
+            self.lines += lines
+            self.bytes += byte_count
+            self._samples.append((now, self.lines, self.bytes))
+            while self._samples and self._samples[0][0] < now - self.window_seconds:
+                self._samples.popleft()
+        self.notify()
+
+    def notify(self):
+        """Wake subscribers after a change (safe to call from any thread)."""
+        with self._lock:
+            self.version += 1
+        self._loop.call_soon_threadsafe(self._changed.set)
+
+    async def wait_for_change(self, version: int, timeout: float) -> int:
+        """Wait until version moves past the given one or timeout seconds pass; return the current version."""
+        if self.version == version:
+            self._changed.clear()
+            if self.version == version:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        return self.version
+
+    def snapshot(self, files_processed: int, total_files: int) -> Dict[str, Optional[float]]:
+        """Return the counters, rates over the window and the ETA in seconds (None until a file finishes)."""
+        now = time.time()
+        with self._lock:
+            lines, byte_count = self.lines, self.bytes
+            # Rates are measured from the oldest sample still inside the window, or from the start
+            base_time, base_lines, base_bytes = self.started_at, 0, 0
+            for sample in self._samples:
+                if sample[0] >= now - self.window_seconds:
+                    break
+                base_time, base_lines, base_bytes = sample
+            if now - base_time > self.window_seconds and self._samples:
+                base_time, base_lines, base_bytes = self._samples[0]
+        elapsed = max(now - base_time, 1e-6)
+        files_done = files_processed - self.files_at_start
+        eta_seconds = None
+        if files_done > 0 and total_files >= files_processed:
+            eta_seconds = (now - self.started_at) / files_done * (total_files - files_processed)
+        return {
+            'lines_processed': lines,
+            'bytes_processed': byte_count,
+            'lines_per_sec': (lines - base_lines) / elapsed,
+            'bytes_per_sec': (byte_count - base_bytes) / elapsed,
+            'eta_seconds': eta_seconds
+        }
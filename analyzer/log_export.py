@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+import logging
+import time
+import zlib
+from typing import Iterable, Iterator, List
+
+# Configure logging
+logging.basicConfig(
+    filename='log_analyzer.log',
+    level=logging.DEBUG,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Formats gzip_export writes
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+# zlib window bits selecting a gzip header and trailer
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+def _ndjson_chunk(rows: List[tuple], dimension: str, name: str) -> str:
+    """Write rows as JSON lines with the Log Viewer's fields."""
+    return ''.join(
+        json.dumps({"timestamp": row[0], "log_message": row[1], "level": row[2], dimension: name}) + '\n'
+        for row in rows
+    )
+
+def _csv_chunk(rows: List[tuple], dimension: str, name: str, header: bool) -> str:
+    """Write rows as CSV lines, preceded by the header line if header is set."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(['timestamp', 'log_message', 'level', dimension])
+    writer.writerows((row[0], row[1], row[2], name) for row in rows)
+    return buffer.getvalue()
+
+def gzip_export(chunks: Iterable[List[tuple]], export_format: str, dimension: str, name: str,
+                level: int = 6) -> Iterator[bytes]:
+    """Encode chunks of (timestamp, message, level) rows as gzip-compressed NDJSON or CSV.
+
+    Each chunk is written and compressed as soon as it arrives, and the compressed bytes
+    are yielded as the compressor produces them, so memory use does not grow with the
+    number of rows.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    start_time = time.time()
+    row_count = 0
+    for rows in chunks:
+        if export_format == 'ndjson':
+            text = _ndjson_chunk(rows, dimension, name)
+        else:
+            text = _csv_chunk(rows, dimension, name, header=row_count == 0)
+        row_count += len(rows)
+        data = compressor.compress(text.encode('utf-8'))
+        if data:
+            yield data
+    if export_format == 'csv' and row_count == 0:
+        yield compressor.compress(_csv_chunk([], dimension, name, header=True).encode('utf-8'))
+    yield compressor.flush()
+    logger.info(f"Exported {row_count} rows for {dimension} {name} as {export_format} "
+                f"({time.time() - start_time:.2f}s)")
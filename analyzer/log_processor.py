@@ -1,6 +1,19 @@
 import json
 import logging
-from datetime import datetime
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    # Lazy parser: only the fields we look up are materialised as Python objects
+    import simdjson
+except ImportError:
+    simdjson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from analyzer.timestamp_parser import UNKNOWN_TS, TimestampParser
 
 # Configure logging
 logging.basicConfig(
@@ -10,46 +23,226 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Size of the raw (decompressed) blocks handed to parse_block
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+def _plain(value):
+    """Return a decoded JSON value as plain Python, copying simdjson objects and arrays out of the parser."""
+    if hasattr(value, 'as_dict'):
+        return value.as_dict()
+    if hasattr(value, 'as_list'):
+        return value.as_list()
+    return value
+
+def _text(value, default: Optional[str]) -> Optional[str]:
+    """Return a decoded JSON field as a str: default for null, JSON text for objects and arrays."""
+    if isinstance(value, str):
+        return value
+    if value is None:
+        return default
+    value = _plain(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+def _lookup(entry, path: Tuple[str, ...]):
+    """Follow a key path into a decoded JSON object, returning None if any key is missing."""
+    value = entry
+    for key in path:
+        if value is None or not hasattr(value, 'get'):
+            return None
+        value = value.get(key)
+    return value
+
+class LogBatch:
+    """Parallel column lists for one parsed block of log lines.
+
+    One batch feeds both the logs INSERT and the summary aggregation, so every parsed line
+    is stored once as a slot in each column rather than as a row tuple plus a dict.
+    """
+
+    __slots__ = ('logtime', 'level', 'class_name', 'service', 'log', 'hour', 'ts', 'line_idx', 'extras')
+
+    def __init__(self, extra_fields: Iterable[str] = ()):
+        """Initialize empty columns, plus one list per extra field."""
+        self.logtime = []
+        self.level = []
+        self.class_name = []
+        self.service = []
+        self.log = []
+        self.hour = []
+        self.ts = []
+        self.line_idx = []
+        self.extras = {name: [] for name in extra_fields}
+
+    def __len__(self) -> int:
+        return len(self.log)
+
+    def columns(self) -> Dict[str, list]:
+        """Return the columns keyed by their log field names (service is empty when not split)."""
+        columns = {
+            'logtime': self.logtime,
+            'level': self.level,
+            'class': self.class_name,
+            'service': self.service,
+            'log': self.log,
+            'hour': self.hour,
+            'ts': self.ts,
+            'line_idx': self.line_idx
+        }
+        columns.update(self.extras)
+        return columns
+
 class LogProcessor:
+    """Parses raw JSON log blocks into columnar arrays.
+
+    Blocks are newline-delimited bytes as read from a decompressed log file and are parsed
+    into a LogBatch. The decoder is picked once per instance: simdjson when installed (so
+    unread fields such as the `kubernetes` object are never built), then orjson, then the
+    stdlib json module. Each logtime is parsed once into an `hour` bucket column (None when
+    unrecognised) and a `ts` column of UTC epoch milliseconds (UNKNOWN_TS when unrecognised).
+    """
+
+    def __init__(self, valid_levels: Optional[Iterable[str]] = None, split_class: bool = True,
+                 extra_fields: Optional[Dict[str, Tuple[str, ...]]] = None,
+                 keep_missing: bool = False):
+        """Initialize LogProcessor.
+
+        Args:
+            valid_levels: Levels kept as-is; anything else becomes UNKNOWN. None keeps all levels.
+            split_class: Split `class` into service and class name on the first dot.
+            extra_fields: Additional output columns mapped to a key path, e.g.
+                {'pod': ('kubernetes', 'pod_name')}.
+            keep_missing: Leave a missing (or null) logtime, level and log as None instead of
+                '', UNKNOWN and ''.
+        """
+        self.valid_levels = set(valid_levels) if valid_levels else None
+        self.split_class = split_class
+        self.extra_fields = dict(extra_fields or {})
+        self.keep_missing = keep_missing
+        self.timestamps = TimestampParser()
+        if simdjson is not None:
+            self.decoder = 'simdjson'
+            self._loads = simdjson.Parser().parse
+        elif orjson is not None:
+            self.decoder = 'orjson'
+            self._loads = orjson.loads
+        else:
+            self.decoder = 'json'
+            self._loads = json.loads
+
+    @staticmethod
+    def iter_blocks(stream: BinaryIO, block_size: int = DEFAULT_BLOCK_SIZE) -> Iterator[bytes]:
+        """Read a binary stream in blocks that always end on a line boundary."""
+        remainder = b''
+        while True:
+            chunk = stream.read(block_size)
+            if not chunk:
+                break
+            chunk = remainder + chunk
+            cut = chunk.rfind(b'\n')
+            if cut == -1:
+                remainder = chunk
+                continue
+            remainder = chunk[cut + 1:]
+            yield chunk[:cut + 1]
+        if remainder:
+            yield remainder
+
+    def parse_block(self, block: bytes, first_line_idx: int = 0) -> Tuple[LogBatch, Dict[str, int]]:
+        """Parse a block of JSON log lines into a LogBatch.
+
+        Returns (batch, stats), where stats counts the lines in the block plus invalid JSON
+        lines, missing class formats and invalid timestamps.
+        """
+        batch = LogBatch(self.extra_fields)
+        stats = {'lines': 0, 'invalid_json': 0, 'missing_class': 0, 'invalid_timestamp': 0}
+        lines = block.split(b'\n')
+        if lines and not lines[-1]:
+            lines.pop()
+        stats['lines'] = len(lines)
+
+        loads = self._loads
+        parse_timestamp = self.timestamps.parse
+        valid_levels = self.valid_levels
+        missing_text, missing_level = (None, None) if self.keep_missing else ('', 'UNKNOWN')
+        split_class = self.split_class
+        extra_fields = self.extra_fields.items()
+        logtimes = batch.logtime
+        levels = batch.level
+        classes = batch.class_name
+        services = batch.service
+        messages = batch.log
+        hours = batch.hour
+        ts_values = batch.ts
+        line_idxs = batch.line_idx
+        extra_columns = batch.extras
+
+        for line_idx, line in enumerate(lines, first_line_idx):
+            try:
+                # simdjson refuses to reuse its buffer while the previous document is still referenced
+                entry = None
+                entry = loads(line)
+                # Fields are copied out as plain str values, so nothing keeps the document alive
+                timestamp = _text(entry.get('logtime'), missing_text)
+                level = _text(entry.get('level'), missing_level)
+                class_field = entry.get('class', None)
+                class_field = None if class_field is None else _text(class_field, '')
+                log_message = _text(entry.get('log'), missing_text)
+                extras = [(name, _plain(_lookup(entry, path))) for name, path in extra_fields]
+                entry = None
+
+                if valid_levels is not None and level not in valid_levels:
+                    level = 'UNKNOWN'
+
+                if split_class:
+                    # Extract class and service
+                    if class_field and '.' in class_field:
+                        service, class_field = class_field.split('.', 1)
+                    else:
+                        class_field = 'Unknown'
+                        service = 'Unknown'
+                        stats['missing_class'] += 1
+
+                hour, ts = parse_timestamp(timestamp) if timestamp else (None, None)
+            except (ValueError, AttributeError, TypeError, RuntimeError):
+                entry = None
+                stats['invalid_json'] += 1
+                logger.debug(f"Invalid JSON log line at line {line_idx}")
+                continue
+
+            if split_class:
+                services.append(service)
+            if timestamp and hour is None:
+                stats['invalid_timestamp'] += 1
+
+            logtimes.append(timestamp)
+            levels.append(level)
+            classes.append(class_field)
+            messages.append(log_message)
+            hours.append(hour)
+            ts_values.append(UNKNOWN_TS if ts is None else ts)
+            line_idxs.append(line_idx)
+            for name, value in extras:
+                extra_columns[name].append(value)
+
+        return batch, stats
+
     def parse_log_line(self, log_line: str) -> dict:
         """Parse a JSON log line into a structured dictionary."""
         try:
-            log_entry = json.loads(log_line.strip())
-            timestamp = log_entry.get('logtime', '')
-            level = log_entry.get('level', 'UNKNOWN')
-            class_field = log_entry.get('class', None)
-            log_message = log_entry.get('log', '')
-            
-            # Extract class and service
-            if class_field and '.' in class_field:
-                service, class_name = class_field.split('.', 1)
-            else:
-                class_name = 'Unknown'
-                service = 'Unknown'
-            
-            # Validate timestamp
-            if timestamp:
-                try:
-                    try:
-                        datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S,%f')
-                    except ValueError:
-                        try:
-                            datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
-                        except ValueError:
-                            datetime.strptime(timestamp, '%d/%b/%Y:%H:%M:%S %z')
-                except ValueError:
-                    timestamp = ''
-            
+            batch, _ = self.parse_block(log_line.strip().encode('utf-8'))
+            if not batch:
+                logger.warning(f"Invalid JSON log line: {log_line}")
+                return None
+
             return {
-                'logtime': timestamp,
-                'level': level,
-                'class': class_name,
-                'service': service,
-                'log': log_message
+                'logtime': batch.logtime[0] if batch.hour[0] else '',
+                'level': batch.level[0],
+                'class': batch.class_name[0],
+                'service': batch.service[0] if self.split_class else None,
+                'log': batch.log[0]
             }
-        except json.JSONDecodeError:
-            logger.warning(f"Invalid JSON log line: {log_line}")
-            return None
         except Exception as e:
             logger.error(f"Error parsing log line: {str(e)}")
-            return None
\ No newline at end of file
+            return None
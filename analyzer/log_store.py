@@ -0,0 +1,712 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from itertools import repeat
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from analyzer.dimensions import Dimensions
+from analyzer.log_processor import LogBatch
+from analyzer.message_codec import MESSAGE_TEXT_SQL, MessageCompressor, register_message_functions
+from analyzer.regex_search import compile_pattern, parallel_regex_scan, required_literals
+from analyzer.summary_accumulator import delete_uncounted_logs
+
+# Configure logging
+logging.basicConfig(
+    filename='log_analyzer.log',
+    level=logging.DEBUG,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Log Viewer dimensions: dimension table, logs column and per-level summary table for each
+DIMENSION_COLUMNS = {
+    'class': ('classes', 'class_id', 'class_level_counts'),
+    'service': ('services', 'service_id', 'service_level_counts')
+}
+
+# Shortest search term the trigram index can look up; shorter terms scan messages
+FTS_MIN_TERM_LENGTH = 3
+
+# Min and max ts of Parquet segment files, shared by the stores opened for each request:
+# (job_id, path) -> (mtime_ns, min ts, max ts), oldest entries evicted past the limit
+SEGMENT_TS_RANGES_MAX = 100000
+_segment_ts_ranges = {}
+_segment_ts_ranges_lock = threading.Lock()
+
+def fts_phrase(text: str) -> str:
+    """Quote text as an FTS5 phrase, which a trigram index matches as a substring."""
+    return '"' + text.replace('"', '""') + '"'
+
+def like_substring(text: str) -> str:
+    """Return a LIKE pattern (with ESCAPE '\\') matching text as a literal substring, like an FTS phrase."""
+    return '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def parquet_available() -> bool:
+    """Check whether the optional pyarrow package is installed."""
+    return pa is not None
+
+def summary_count(conn: sqlite3.Connection, job_id: str, dimension: str, name: str, level: str) -> int:
+    """Return the number of a job's logs for a class or service and level from its summary table."""
+    table, column, counts_table = DIMENSION_COLUMNS[dimension]
+    query = f"""
+        SELECT COALESCE(SUM(t.count), 0) FROM {counts_table} t
+        WHERE t.job_key = (SELECT job_key FROM job_keys WHERE job_id = ?)
+        AND t.{column} = (SELECT id FROM {table} WHERE name = ?)
+    """
+    params = [job_id, name]
+    if level != "ALL":
+        query += " AND t.level_id = (SELECT id FROM levels WHERE name = ?)"
+        params.append(level)
+    return conn.execute(query, params).fetchone()[0]
+
+class LogPage:
+    """One page of Log Viewer rows.
+
+    rows are (timestamp, message, level) tuples in time order. next_cursor, passed as
+    after to the next query_logs call, continues the listing after the last row; it is
+    None on the last page. total is the number of rows matching the filters, or None
+    when it was not counted (see LogStore.count_logs).
+    """
+
+    __slots__ = ('rows', 'next_cursor', 'total')
+
+    def __init__(self, rows: List[tuple], next_cursor: Optional[tuple], total: Optional[int]):
+        """Initialize LogPage."""
+        self.rows = rows
+        self.next_cursor = next_cursor
+        self.total = total
+
+class LogStore(ABC):
+    """Where a job's log rows are kept, behind the ingest pipeline and the Log Viewer.
+
+    Ingest hands each parsed batch to write_batch. commit is called by the summary
+    accumulator inside its flush transaction, so the rows a store reports as committed are
+    exactly the ones the summary counts and file checkpoints cover; discard_uncommitted
+    drops anything written after that before a job resumes. Reads go through query_logs.
+    """
+
+    name = ''
+
+    def __init__(self, job_id: str):
+        """Initialize the store for job_id."""
+        self.job_id = job_id
+
+    @abstractmethod
+    def discard_uncommitted(self, conn: sqlite3.Connection):
+        """Remove rows written after the job's last commit, before resuming it."""
+
+    @abstractmethod
+    def write_batch(self, conn: sqlite3.Connection, dimensions: Dimensions, file_id: int, batch: LogBatch):
+        """Store a parsed batch of a source file."""
+
+    @abstractmethod
+    def commit(self, conn: sqlite3.Connection):
+        """Make written rows durable and record how far they reach, in conn's open transaction."""
+
+    def build_search_index(self, conn: sqlite3.Connection):
+        """Index messages for search once the job has finished ingesting; a no-op for stores without one."""
+
+    def check_search(self, search_query: Optional[str], use_regex: bool):
+        """Raise ValueError for a search this store cannot run (beyond an invalid Python regex)."""
+
+    @abstractmethod
+    def query_logs(self, conn: sqlite3.Connection, dimension: str, name: str, level: str,
+                   limit: int, after: Optional[tuple] = None, search_query: Optional[str] = None,
+                   use_regex: bool = False, start_ms: Optional[int] = None,
+                   end_ms: Optional[int] = None) -> LogPage:
+        """Return up to limit rows following the after cursor, in time (ts) order.
+
+        Pages are read with keyset pagination: every page seeks to its cursor through the
+        ts indexes, so a deep page costs the same as the first one. Totals without a
+        search or time range come from the summary tables; otherwise total is None and
+        count_logs counts the matches when asked.
+
+        Args:
+            conn: The job database, with register_message_functions applied.
+            dimension: 'class' or 'service'.
+            name: Class or service name to filter on.
+            level: Level name, or "ALL".
+            after: next_cursor of the previous page, or None for the first page.
+            search_query: Substring (or regular expression with use_regex) the message must contain.
+            start_ms: Only rows at or after this UTC epoch millisecond.
+            end_ms: Only rows before this UTC epoch millisecond.
+        """
+
+    @abstractmethod
+    def count_logs(self, conn: sqlite3.Connection, dimension: str, name: str, level: str,
+                   search_query: Optional[str] = None, use_regex: bool = False,
+                   start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> int:
+        """Return the number of rows query_logs would list for these filters."""
+
+    def iter_logs(self, conn: sqlite3.Connection, dimension: str, name: str, level: str,
+                  search_query: Optional[str] = None, use_regex: bool = False,
+                  start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+                  chunk_rows: int = 10000) -> Iterator[List[tuple]]:
+        """Yield every row query_logs would list for these filters, in chunks of up to chunk_rows.
+
+        Rows are (timestamp, message, level) tuples in time order, as in LogPage. Only one
+        chunk is held at a time, so exports of any size read in constant memory. This
+        walks query_logs page by page; stores that can stream a single query override it.
+        """
+        after = None
+        while True:
+            page = self.query_logs(conn, dimension, name, level, chunk_rows, after=after,
+                                   search_query=search_query, use_regex=use_regex,
+                                   start_ms=start_ms, end_ms=end_ms)
+            if page.rows:
+                yield page.rows
+            if page.next_cursor is None:
+                return
+            after = page.next_cursor
+
+class SQLiteLogStore(LogStore):
+    """Keeps log rows in the job database's logs table.
+
+    Rows are committed with each batch; the job's committed_log_id marker records the last
+    one covered by the summary counts (see delete_uncounted_logs).
+
+    Once a job completes, its messages are added to the logs_fts trigram index and the
+    fts_indexed_log_id marker records the last row indexed. Substring searches look rows
+    up to that id in the index and only scan messages of rows after it, so a job that is
+    still running (or was ingested before the index existed) is searched correctly too.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, job_id: str, compressor: Optional[MessageCompressor] = None,
+                 scan_workers: int = 1, scan_chunk_rows: int = 100000):
+        """Initialize SQLiteLogStore.
+
+        Args:
+            compressor: Compresses messages before they are stored.
+            scan_workers: Processes scanning a regex search that has no literal text to
+                prefilter on (1 runs it in SQLite through REGEXP).
+            scan_chunk_rows: Log ids per range handed to a scan process.
+        """
+        super().__init__(job_id)
+        self.compressor = compressor
+        self.scan_workers = scan_workers
+        self.scan_chunk_rows = scan_chunk_rows
+        self.last_log_id: Optional[int] = None
+
+    def discard_uncommitted(self, conn: sqlite3.Connection):
+        """Delete logs rows above the committed_log_id marker."""
+        self.last_log_id = delete_uncounted_logs(conn, self.job_id)
+
+    def write_batch(self, conn: sqlite3.Connection, dimensions: Dimensions, file_id: int, batch: LogBatch):
+        """Insert a batch into logs; the caller commits it."""
+        messages = self.compressor.compress(batch.log) if self.compressor else batch.log
+        conn.executemany('''
+            INSERT INTO logs (job_key, timestamp, ts, level_id, class_id, service_id, log_message, file_id, line_idx)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', zip(repeat(dimensions.job_key(self.job_id)), batch.logtime, batch.ts,
+                 dimensions.ids('levels', batch.level), dimensions.ids('classes', batch.class_name),
+                 dimensions.ids('services', batch.service), messages, repeat(file_id), batch.line_idx))
+        self.last_log_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+
+    def commit(self, conn: sqlite3.Connection):
+        """Replace the job's committed_log_id marker with the last inserted row."""
+        if self.last_log_id is not None:
+            conn.execute('''
+                DELETE FROM job_metadata WHERE job_id = ? AND type = 'committed_log_id'
+            ''', (self.job_id,))
+            conn.execute('''
+                INSERT INTO job_metadata (job_id, type, value) VALUES (?, ?, ?)
+            ''', (self.job_id, 'committed_log_id', str(self.last_log_id)))
+
+    def _indexed_log_id(self, conn: sqlite3.Connection) -> int:
+        """Return the last logs id covered by logs_fts (0 if none are)."""
+        row = conn.execute('''
+            SELECT value FROM job_metadata WHERE job_id = ? AND type = 'fts_indexed_log_id'
+        ''', (self.job_id,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def build_search_index(self, conn: sqlite3.Connection, chunk_rows: int = 100000):
+        """Add rows above fts_indexed_log_id to logs_fts, committing every chunk_rows rows."""
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'logs_fts'").fetchone() is None:
+            return
+        register_message_functions(conn)
+        indexed_log_id = self._indexed_log_id(conn)
+        last_log_id = conn.execute('SELECT MAX(id) FROM logs').fetchone()[0] or 0
+        start_time = time.time()
+        while indexed_log_id < last_log_id:
+            upper = min(indexed_log_id + chunk_rows, last_log_id)
+            conn.execute(f'''
+                INSERT INTO logs_fts (rowid, log_message)
+                SELECT logs.id, {MESSAGE_TEXT_SQL} FROM logs WHERE logs.id > ? AND logs.id <= ?
+            ''', (indexed_log_id, upper))
+            conn.execute('''
+                DELETE FROM job_metadata WHERE job_id = ? AND type = 'fts_indexed_log_id'
+            ''', (self.job_id,))
+            conn.execute('''
+                INSERT INTO job_metadata (job_id, type, value) VALUES (?, ?, ?)
+            ''', (self.job_id, 'fts_indexed_log_id', str(upper)))
+            conn.commit()
+            indexed_log_id = upper
+        logger.info(f"Search index for job_id: {self.job_id} covers logs up to id {indexed_log_id} "
+                    f"({time.time() - start_time:.2f}s)")
+
+    def _regex_prefilter(self, conn: sqlite3.Connection, pattern: str, params: list) -> str:
+        """Return WHERE terms keeping only rows that contain the pattern's required literals.
+
+        They come before the REGEXP term, so only rows passing the index lookup and the
+        instr checks reach the Python regex callback. Raises re.error for an invalid pattern.
+        """
+        literals = required_literals(pattern)
+        if not literals:
+            return ''
+        where = ''
+        indexed_log_id = self._indexed_log_id(conn)
+        fts_literals = [literal for literal in literals if len(literal) >= FTS_MIN_TERM_LENGTH]
+        if indexed_log_id and fts_literals:
+            where += """
+                AND (logs.id IN (SELECT rowid FROM logs_fts WHERE logs_fts MATCH ?) OR logs.id > ?)
+            """
+            params.extend([' AND '.join(map(fts_phrase, fts_literals)), indexed_log_id])
+        # The trigram index ignores case, so case-sensitive literals are checked again
+        text = MESSAGE_TEXT_SQL
+        if compile_pattern(pattern).flags & re.IGNORECASE:
+            text = f"lower({MESSAGE_TEXT_SQL})"
+        for literal in literals:
+            where += f" AND instr({text}, ?) > 0"
+            params.append(literal)
+        return where
+
+    def _filter(self, dimension: str, name: str, level: str, start_ms: Optional[int] = None,
+                end_ms: Optional[int] = None) -> Tuple[str, list]:
+        """Return the WHERE clause and params selecting a class or service, level and time range."""
+        table, column, _ = DIMENSION_COLUMNS[dimension]
+        where = f"""
+            WHERE logs.job_key = (SELECT job_key FROM job_keys WHERE job_id = ?)
+            AND logs.{column} = (SELECT id FROM {table} WHERE name = ?)
+        """
+        params = [self.job_id, name]
+        if level != "ALL":
+            where += " AND logs.level_id = (SELECT id FROM levels WHERE name = ?)"
+            params.append(level)
+        if start_ms is not None:
+            where += " AND logs.ts >= ?"
+            params.append(start_ms)
+        if end_ms is not None:
+            where += " AND logs.ts < ?"
+            params.append(end_ms)
+        return where, params
+
+    def _scans_in_pool(self, search_query: str, use_regex: bool) -> bool:
+        """Whether a search is a regex without literal text to prefilter on, scanned in the pool."""
+        return use_regex and self.scan_workers > 1 and not required_literals(search_query)
+
+    def _search_terms(self, conn: sqlite3.Connection, search_query: str, use_regex: bool, params: list) -> str:
+        """Return WHERE terms matching messages against a search, through the search index where possible."""
+        if use_regex:
+            where = self._regex_prefilter(conn, search_query, params)
+            where += f" AND {MESSAGE_TEXT_SQL} REGEXP ?"
+            params.append(search_query)
+            return where
+        indexed_log_id = self._indexed_log_id(conn)
+        if indexed_log_id and len(search_query) >= FTS_MIN_TERM_LENGTH:
+            params.extend([fts_phrase(search_query), indexed_log_id, like_substring(search_query)])
+            return f"""
+                AND (logs.id IN (SELECT rowid FROM logs_fts WHERE logs_fts MATCH ?)
+                     OR logs.id > ? AND {MESSAGE_TEXT_SQL} LIKE ? ESCAPE '\\')
+            """
+        params.append(like_substring(search_query))
+        return f" AND {MESSAGE_TEXT_SQL} LIKE ? ESCAPE '\\'"
+
+    def query_logs(self, conn: sqlite3.Connection, dimension: str, name: str, level: str,
+                   limit: int, after: Optional[tuple] = None, search_query: Optional[str] = None,
+                   use_regex: bool = False, start_ms: Optional[int] = None,
+                   end_ms: Optional[int] = None) -> LogPage:
+        """Read a page through the (job, dimension, level, ts) indexes; cursors are (ts, id).
+
+        Regular expressions need register_regexp on conn. One without literal text to
+        prefilter on is scanned in a process pool when scan_workers is above 1.
+        """
+        where, params = self._filter(dimension, name, level, start_ms, end_ms)
+        if after is not None:
+            # The plain ts term is what seeks the index to the cursor
+            where += " AND logs.ts >= ? AND (logs.ts, logs.id) > (?, ?)"
+            params.extend([after[0], after[0], after[1]])
+        searching = bool(search_query and search_query.strip())
+
+        if searching and self._scans_in_pool(search_query, use_regex):
+            log_ids, _, complete = parallel_regex_scan(conn, where, params, search_query, 0, limit,
+                                                       self.scan_workers, self.scan_chunk_rows,
+                                                       count_all=False)
+            rows = conn.execute(f"""
+                SELECT logs.id, logs.ts, logs.timestamp, {MESSAGE_TEXT_SQL},
+                       (SELECT name FROM levels WHERE id = logs.level_id)
+                FROM logs WHERE logs.id IN (SELECT value FROM json_each(?))
+                ORDER BY logs.ts, logs.id
+            """, (json.dumps(log_ids),)).fetchall()
+            has_more = not complete
+        else:
+            if searching:
+                where += self._search_terms(conn, search_query, use_regex, params)
+            query = f"""
+                SELECT logs.id, logs.ts, logs.timestamp, {MESSAGE_TEXT_SQL},
+                       (SELECT name FROM levels WHERE id = logs.level_id)
+                FROM logs
+                {where}
+                ORDER BY logs.ts, logs.id LIMIT ?
+            """
+            logger.debug(f"Executing SQL: {query} with params: {params + [limit + 1]}")
+            rows = conn.execute(query, params + [limit + 1]).fetchall()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+
+        next_cursor = (rows[-1][1], rows[-1][0]) if has_more and rows else None
+        total = None
+        if not searching and start_ms is None and end_ms is None:
+            total = summary_count(conn, self.job_id, dimension, name, level)
+        return LogPage([row[2:] for row in rows], next_cursor, total)
+
+    def count_logs(self, conn: sqlite3.Connection, dimension: str, name: str, level: str,
+                   search_query: Optional[str] = None, use_regex: bool = False,
+                   start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> int:
+        """Count from the summary tables, or over the ts index range and the search."""
+        searching = bool(search_query and search_query.strip())
+        if not searching and start_ms is None and end_ms is None:
+            return summary_count(conn, self.job_id, dimension, name, level)
+        where, params = self._filter(dimension, name, level, start_ms, end_ms)
+        if not searching:
+            return conn.execute(f"SELECT COUNT(*) FROM logs {where}", params).fetchone()[0]
+        if self._scans_in_pool(search_query, use_regex):
+            return parallel_regex_scan(conn, where, params, search_query, 0, 0,
+                                       self.scan_workers, self.scan_chunk_rows)[1]
+        where += self._search_terms(conn, search_query, use_regex, params)
+        return conn.execute(f"SELECT COUNT(*) FROM logs {where}", params).fetchone()[0]
+
+    def iter_logs(self, conn: sqlite3.Connection, dimension: str, name: str, level: str,
+                  search_query: Optional[str] = None, use_regex: bool = False,
+                  start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+                  chunk_rows: int = 10000) -> Iterator[List[tuple]]:
+        """Fetch rows chunk_rows at a time from one cursor over the ts index range.
+
+        A regex scanned in the process pool is listed page by page instead.
+        """
+        searching = bool(search_query and search_query.strip())
+        if searching and self._scans_in_pool(search_query, use_regex):
+            yield from super().iter_logs(conn, dimension, name, level, search_query, use_regex,
+                                         start_ms, end_ms, chunk_rows)
+            return
+        where, params = self._filter(dimension, name, level, start_ms, end_ms)
+        if searching:
+            where += self._search_terms(conn, search_query, use_regex, params)
+        cursor = conn.execute(f"""
+            SELECT logs.timestamp, {MESSAGE_TEXT_SQL}, (SELECT name FROM levels WHERE id = logs.level_id)
+            FROM logs
+            {where}
+            ORDER BY logs.ts, logs.id
+        """, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            cursor.close()
+
+class ParquetLogStore(LogStore):
+    """Keeps log rows as Parquet segments under the job's segments directory.
+
+    Rows are buffered between summary flushes. Each commit writes the buffer as one
+    segment file per hour and service, in hive-style directories
+    (hour=YYYYMMDDHH/service_id=N/seg-<seq>.parquet), and records seq as the job's
+    committed_segment marker. Segment rows are sorted by class, level and ts, so
+    the row-group min/max statistics let a class or level filter skip most row groups,
+    and a service filter skips whole directories. Strings are dictionary-encoded and
+    pages zstd-compressed.
+
+    Segments above the committed marker were never counted (or are half-written) and are
+    ignored by queries and deleted before the job resumes.
+    """
+
+    name = 'parquet'
+
+    # Columns stored in each segment file; hour and service_id come from its directory
+    SCHEMA = pa.schema([
+        ('timestamp', pa.string()),
+        ('ts', pa.int64()),
+        ('level_id', pa.int32()),
+        ('class_id', pa.int32()),
+        ('log_message', pa.string()),
+        ('file_id', pa.int32()),
+        ('line_idx', pa.int64())
+    ]) if pa is not None else None
+
+    def __init__(self, job_id: str, segments_dir: str, row_group_rows: int = 65536):
+        """Initialize ParquetLogStore writing segments under segments_dir."""
+        if pa is None:
+            raise RuntimeError("Parquet log storage needs the pyarrow package")
+        super().__init__(job_id)
+        self.segments_dir = segments_dir
+        self.row_group_rows = row_group_rows
+        self.committed_segment = 0
+        self._buffer = {name: [] for name in ('hour', 'service_id') + tuple(self.SCHEMA.names)}
+        self._partitioning = ds.partitioning(
+            pa.schema([('hour', pa.string()), ('service_id', pa.int32())]), flavor='hive'
+        )
+
+    def _load_committed_segment(self, conn: sqlite3.Connection) -> int:
+        """Return the job's committed_segment marker (0 before the first commit)."""
+        row = conn.execute('''
+            SELECT value FROM job_metadata WHERE job_id = ? AND type = 'committed_segment'
+        ''', (self.job_id,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _segment_files(self) -> List[Tuple[int, str]]:
+        """List (seq, path) of every segment file, including uncommitted ones."""
+        segments = []
+        for root, _, files in os.walk(self.segments_dir):
+            for file in files:
+                if file.startswith('seg-') and file.endswith('.parquet'):
+                    segments.append((int(file[len('seg-'):-len('.parquet')]), os.path.join(root, file)))
+        return segments
+
+    def discard_uncommitted(self, conn: sqlite3.Connection):
+        """Delete segments above the committed_segment marker and temp files of interrupted writes."""
+        self.committed_segment = self._load_committed_segment(conn)
+        removed = 0
+        for seq, path in self._segment_files():
+            if seq > self.committed_segment:
+                os.remove(path)
+                removed += 1
+        for root, _, files in os.walk(self.segments_dir):
+            for file in files:
+                if file.endswith('.tmp'):
+                    os.remove(os.path.join(root, file))
+        if removed:
+            logger.info(f"Removed {removed} uncommitted Parquet segments for job_id: {self.job_id} before resuming")
+
+    def write_batch(self, conn: sqlite3.Connection, dimensions: Dimensions, file_id: int, batch: LogBatch):
+        """Buffer a batch until the next commit."""
+        buffer = self._buffer
+        buffer['hour'].extend(hour[:13].replace('-', '').replace(' ', '') if hour else None for hour in batch.hour)
+        buffer['service_id'].extend(dimensions.ids('services', batch.service))
+        buffer['timestamp'].extend(batch.logtime)
+        buffer['ts'].extend(batch.ts)
+        buffer['level_id'].extend(dimensions.ids('levels', batch.level))
+        buffer['class_id'].extend(dimensions.ids('classes', batch.class_name))
+        buffer['log_message'].extend(batch.log)
+        buffer['file_id'].extend(repeat(file_id, len(batch)))
+        buffer['line_idx'].extend(batch.line_idx)
+
+    def commit(self, conn: sqlite3.Connection):
+        """Write buffered rows as the next segment and record it as committed."""
+        if not self._buffer['timestamp']:
+            return
+        seq = self.committed_segment + 1
+        table = pa.table(self._buffer, schema=pa.schema(
+            [('hour', pa.string()), ('service_id', pa.int32())] + list(self.SCHEMA)
+        )).sort_by([('hour', 'ascending'), ('service_id', 'ascending'), ('class_id', 'ascending'),
+                    ('level_id', 'ascending'), ('ts', 'ascending')])
+        # Groups are sorted like the table, so each one is the next slice of its rows
+        partitions = table.group_by(['hour', 'service_id'], use_threads=False).aggregate(
+            [([], 'count_all')]
+        ).sort_by([('hour', 'ascending'), ('service_id', 'ascending')])
+        start = 0
+        for hour, service_id, rows in zip(partitions['hour'].to_pylist(), partitions['service_id'].to_pylist(),
+                                          partitions['count_all'].to_pylist()):
+            directory = os.path.join(
+                self.segments_dir,
+                f"hour={hour if hour is not None else '__HIVE_DEFAULT_PARTITION__'}",
+                f"service_id={service_id}"
+            )
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f'seg-{seq:08d}.parquet')
+            pq.write_table(table.slice(start, rows).select(self.SCHEMA.names), path + '.tmp',
+                           row_group_size=self.row_group_rows, compression='zstd',
+                           use_dictionary=True, write_statistics=True)
+            os.replace(path + '.tmp', path)
+            start += rows
+        conn.execute('''
+            DELETE FROM job_metadata WHERE job_id = ? AND type = 'committed_segment'
+        ''', (self.job_id,))
+        conn.execute('''
+            INSERT INTO job_metadata (job_id, type, value) VALUES (?, ?, ?)
+        ''', (self.job_id, 'committed_segment', str(seq)))
+        logger.debug(f"Wrote Parquet segment {seq} ({table.num_rows} rows, {partitions.num_rows} partitions) "
+                     f"for job_id: {self.job_id}")
+        self.committed_segment = seq
+        for column in self._buffer.values():
+            column.clear()
+
+    def check_search(self, search_query: Optional[str], use_regex: bool):
+        """Raise ValueError for a regex RE2, which runs Parquet searches, cannot compile.
+
+        RE2 has no lookaround or backreferences, so some patterns Python's re accepts are
+        rejected here.
+        """
+        if use_regex and search_query and search_query.strip():
+            try:
+                pc.match_substring_regex(pa.array([''], pa.string()), search_query)
+            except pa.ArrowInvalid as e:
+                raise ValueError(f"Invalid regex for Parquet log storage (RE2 syntax): {str(e)}")
+
+    def _condition(self, conn: sqlite3.Connection, dimension: str, name: str, level: str,
+                   search_query: Optional[str], use_regex: bool, start_ms: Optional[int],
+                   end_ms: Optional[int]):
+        """Return the dataset filter for a class or service, level, search and time range, or None if nothing matches.
+
+        Raises ValueError for a regex RE2 cannot compile (see check_search).
+        """
+        self.check_search(search_query, use_regex)
+        table_name, column, _ = DIMENSION_COLUMNS[dimension]
+        row = conn.execute(f'SELECT id FROM {table_name} WHERE name = ?', (name,)).fetchone()
+        if row is None:
+            return None
+        condition = ds.field(column) == row[0]
+        if level != "ALL":
+            level_row = conn.execute('SELECT id FROM levels WHERE name = ?', (level,)).fetchone()
+            if level_row is None:
+                return None
+            condition &= ds.field('level_id') == level_row[0]
+        if search_query and search_query.strip():
+            if use_regex:
+                condition &= pc.match_substring_regex(ds.field('log_message'), search_query)
+            else:
+                condition &= pc.match_substring(ds.field('log_message'), search_query, ignore_case=True)
+        if start_ms is not None:
+            condition &= ds.field('ts') >= start_ms
+        if end_ms is not None:
+            condition &= ds.field('ts') < end_ms
+        return condition
+
+    def _ts_range(self, fragment) -> Tuple[float, float]:
+        """Return the min and max ts of a segment file from its row-group statistics.
+
+        Ranges are cached across requests (see _segment_ts_ranges). Entries are checked
+        against the file's mtime, since a deleted job's segment paths are reused if a job
+        with the same id is started again.
+        """
+        key = (self.job_id, fragment.path)
+        mtime_ns = os.stat(fragment.path).st_mtime_ns
+        cached = _segment_ts_ranges.get(key)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1], cached[2]
+        column = self.SCHEMA.get_field_index('ts')
+        metadata = fragment.metadata
+        low, high = float('inf'), float('-inf')
+        for index in range(metadata.num_row_groups):
+            statistics = metadata.row_group(index).column(column).statistics
+            if statistics is None or not statistics.has_min_max:
+                low, high = float('-inf'), float('inf')
+                break
+            low, high = min(low, statistics.min), max(high, statistics.max)
+        with _segment_ts_ranges_lock:
+            _segment_ts_ranges.pop(key, None)
+            _segment_ts_ranges[key] = (mtime_ns, low, high)
+            while len(_segment_ts_ranges) > SEGMENT_TS_RANGES_MAX:
+                del _segment_ts_ranges[next(iter(_segment_ts_ranges))]
+        return low, high
+
+    def _dataset(self, conn: sqlite3.Connection):
+        """Return a dataset over the committed segments, or None if there are none."""
+        committed = self._load_committed_segment(conn)
+        files = [path for seq, path in self._segment_files() if seq <= committed]
+        if not files:
+            return None
+        return ds.dataset(files, format='parquet', partitioning=self._partitioning,
+                          partition_base_dir=self.segments_dir)
+
+    def query_logs(self, conn: sqlite3.Connection, dimension: str, name: str, level: str,
+                   limit: int, after: Optional[tuple] = None, search_query: Optional[str] = None,
+                   use_regex: bool = False, start_ms: Optional[int] = None,
+                   end_ms: Optional[int] = None) -> LogPage:
+        """Scan the committed segments with the filters pushed down to directories and row groups.
+
+        Cursors are (ts, file_id, line_idx); the cursor's and time range's ts bounds skip
+        segments and row groups outside them. Segments are read in ts order and the scan
+        stops once the page is complete, so a page holds at most limit + 1 rows plus one
+        segment's matches, however many rows match. Regular expressions use RE2 syntax
+        (pyarrow's match_substring_regex).
+        """
+        total = None
+        if not (search_query and search_query.strip()) and start_ms is None and end_ms is None:
+            total = summary_count(conn, self.job_id, dimension, name, level)
+        dataset = self._dataset(conn)
+        condition = self._condition(conn, dimension, name, level, search_query, use_regex, start_ms, end_ms)
+        if dataset is None or condition is None:
+            return LogPage([], None, 0 if total is not None else None)
+        if after is not None:
+            ts, file_id, line_idx = after
+            ts_field = ds.field('ts')
+            condition &= (ts_field > ts) | (
+                (ts_field == ts) & ((ds.field('file_id') > file_id) | (
+                    (ds.field('file_id') == file_id) & (ds.field('line_idx') > line_idx))))
+
+        # Segments are read in order of their first ts, keeping the first limit + 1 rows
+        # so far, until the next segment starts after all of them
+        lower = after[0] if after is not None else start_ms
+        segments = []
+        for fragment in dataset.get_fragments(filter=condition):
+            low, high = self._ts_range(fragment)
+            if low > high or (lower is not None and high < lower) or (end_ms is not None and low >= end_ms):
+                continue
+            segments.append((low, fragment))
+        segments.sort(key=lambda segment: segment[0])
+        columns = ['ts', 'timestamp', 'log_message', 'level_id', 'file_id', 'line_idx']
+        sort_keys = [('ts', 'ascending'), ('file_id', 'ascending'), ('line_idx', 'ascending')]
+        first = self.SCHEMA.empty_table().select(columns)
+        for index, (_, fragment) in enumerate(segments):
+            matches = fragment.to_table(schema=dataset.schema, columns=columns, filter=condition)
+            if matches.num_rows:
+                matches = pa.concat_tables([first, matches])
+                first = matches.take(pc.select_k_unstable(
+                    matches, k=min(limit + 1, matches.num_rows), sort_keys=sort_keys
+                ))
+            if (first.num_rows > limit and index + 1 < len(segments)
+                    and pc.max(first['ts']).as_py() < segments[index + 1][0]):
+                break
+        first = first.sort_by(sort_keys)
+        has_more = first.num_rows > limit
+        first = first.slice(0, limit)
+        level_names = dict(conn.execute('SELECT id, name FROM levels').fetchall())
+        columns = [first[name].to_pylist() for name in ('timestamp', 'log_message', 'level_id')]
+        rows = [(timestamp, message, level_names.get(level_id)) for timestamp, message, level_id in zip(*columns)]
+        next_cursor = None
+        if has_more and rows:
+            last = first.slice(first.num_rows - 1)
+            next_cursor = (last['ts'][0].as_py(), last['file_id'][0].as_py(), last['line_idx'][0].as_py())
+        return LogPage(rows, next_cursor, total)
+
+    def count_logs(self, conn: sqlite3.Connection, dimension: str, name: str, level: str,
+                   search_query: Optional[str] = None, use_regex: bool = False,
+                   start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> int:
+        """Count from the summary tables, or by filtering the committed segments."""
+        if not (search_query and search_query.strip()) and start_ms is None and end_ms is None:
+            return summary_count(conn, self.job_id, dimension, name, level)
+        dataset = self._dataset(conn)
+        condition = self._condition(conn, dimension, name, level, search_query, use_regex, start_ms, end_ms)
+        if dataset is None or condition is None:
+            return 0
+        return dataset.count_rows(filter=condition)
+
+def open_log_store(conn: sqlite3.Connection, job_id: str, segments_dir: str,
+                   scan_workers: int = 1, scan_chunk_rows: int = 100000) -> LogStore:
+    """Return the store a job's logs were written to, for reading them.
+
+    The store is recorded in the job's log_storage metadata; jobs without it use SQLite.
+    scan_workers and scan_chunk_rows configure SQLiteLogStore's parallel regex scan.
+    """
+    row = conn.execute('''
+        SELECT value FROM job_metadata WHERE job_id = ? AND type = 'log_storage'
+    ''', (job_id,)).fetchone()
+    if row is not None and row[0] == ParquetLogStore.name:
+        return ParquetLogStore(job_id, segments_dir)
+    return SQLiteLogStore(job_id, scan_workers=scan_workers, scan_chunk_rows=scan_chunk_rows)
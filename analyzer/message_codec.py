@@ -0,0 +1,130 @@
+import logging
+import sqlite3
+from typing import Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Configure logging
+logging.basicConfig(
+    filename='log_analyzer.log',
+    level=logging.DEBUG,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# SQL expression for the text of logs.log_message on a connection passed to
+# register_message_functions. Plain TEXT rows are returned as stored; only compressed
+# (BLOB) rows go through the Python decoder.
+MESSAGE_TEXT_SQL = (
+    "CASE WHEN typeof(logs.log_message) = 'blob' "
+    "THEN message_text(logs.job_key, logs.log_message) ELSE logs.log_message END"
+)
+
+def zstd_available() -> bool:
+    """Check whether the optional zstandard package is installed."""
+    return zstandard is not None
+
+class MessageCompressor:
+    """Compresses log messages for one job with a zstd dictionary trained on its own logs.
+
+    Each message is stored as its own zstd frame, so rows can still be read, paged and
+    filtered one at a time; the shared dictionary is what makes frames of short, repetitive
+    messages small. The dictionary is trained from the first batch written for the job
+    and kept in job_dictionaries, so a resumed job keeps using it. If training fails (too
+    little data) the job's messages are compressed without a dictionary. Messages that
+    do not get smaller are stored as plain text.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, job_key: int, level: int = 3,
+                 dictionary_size: int = 112640, sample_rows: int = 20000):
+        """Initialize MessageCompressor, loading the job's dictionary if it already has one."""
+        self.conn = conn
+        self.job_key = job_key
+        self.level = level
+        self.dictionary_size = dictionary_size
+        self.sample_rows = sample_rows
+        self._compressor = None
+        row = conn.execute(
+            'SELECT dictionary FROM job_dictionaries WHERE job_key = ?', (job_key,)
+        ).fetchone()
+        if row is not None:
+            self._compressor = self._make_compressor(row[0])
+
+    def _make_compressor(self, dictionary: Optional[bytes]):
+        """Build a compressor for a stored dictionary (None compresses without one)."""
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        return zstandard.ZstdCompressor(level=self.level, dict_data=dict_data,
+                                        write_checksum=False, write_dict_id=False)
+
+    def _train(self, messages: List[str]):
+        """Train and store the job's dictionary from a sample of messages."""
+        samples = [message.encode('utf-8') for message in messages[:self.sample_rows] if message]
+        dictionary = None
+        try:
+            dictionary = zstandard.train_dictionary(self.dictionary_size, samples).as_bytes()
+            logger.info(f"Trained {len(dictionary)} byte zstd dictionary for job_key {self.job_key} "
+                        f"from {len(samples)} messages")
+        except zstandard.ZstdError as e:
+            logger.warning(f"Could not train zstd dictionary for job_key {self.job_key}, "
+                           f"compressing without one: {str(e)}")
+        self.conn.execute(
+            'INSERT OR REPLACE INTO job_dictionaries (job_key, dictionary) VALUES (?, ?)',
+            (self.job_key, dictionary)
+        )
+        self._compressor = self._make_compressor(dictionary)
+
+    def compress(self, messages: List[str]) -> list:
+        """Return the values to store for a column of messages."""
+        if self._compressor is None:
+            self._train(messages)
+        compress = self._compressor.compress
+        values = []
+        for message in messages:
+            if not message:
+                values.append(message)
+                continue
+            raw = message.encode('utf-8')
+            frame = compress(raw)
+            values.append(frame if len(frame) < len(raw) else message)
+        return values
+
+class MessageDecoder:
+    """Decompresses stored messages, loading each job's dictionary once per connection."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        """Initialize MessageDecoder for conn."""
+        self.conn = conn
+        self._decompressors: Dict[int, object] = {}
+
+    def _decompressor(self, job_key: int):
+        """Return the decompressor for a job's dictionary."""
+        decompressor = self._decompressors.get(job_key)
+        if decompressor is None:
+            row = self.conn.execute(
+                'SELECT dictionary FROM job_dictionaries WHERE job_key = ?', (job_key,)
+            ).fetchone()
+            dictionary = row[0] if row else None
+            dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+            decompressor = self._decompressors[job_key] = zstandard.ZstdDecompressor(dict_data=dict_data)
+        return decompressor
+
+    def text(self, job_key: int, value):
+        """Return the text of a stored message value."""
+        if not isinstance(value, bytes):
+            return value
+        return self._decompressor(job_key).decompress(value).decode('utf-8')
+
+def register_message_functions(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """Register message_text(job_key, value), used by MESSAGE_TEXT_SQL, on a connection."""
+    if zstandard is None:
+        def message_text(job_key, value):
+            if isinstance(value, bytes):
+                raise ValueError("Compressed log messages need the zstandard package")
+            return value
+    else:
+        message_text = MessageDecoder(conn).text
+    conn.create_function('message_text', 2, message_text, deterministic=True)
+    return conn
@@ -0,0 +1,126 @@
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+from analyzer.message_codec import register_message_functions
+from analyzer.regex_search import register_regexp
+
+# Configure logging
+logging.basicConfig(
+    filename='log_analyzer.log',
+    level=logging.DEBUG,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+class ReadConnectionPool:
+    """Pool of read-only SQLite connections for the backend's read endpoints.
+
+    Connections are opened read-only (mode=ro, query_only) on the catalog and job
+    databases, which the ingest writers keep in WAL mode, so reads never take the write
+    lock and see the last committed state. Each connection has the message decoding and
+    REGEXP functions registered and keeps up to cached_statements prepared statements,
+    so repeated queries skip parsing and planning.
+
+    Up to connections_per_database idle connections are kept per file, for at most
+    max_databases files; the least recently used file's idle connections are closed
+    beyond that. Connections in use are never limited: a request that finds no idle
+    connection opens a new one.
+    """
+
+    def __init__(self, connections_per_database: int = 4, max_databases: int = 16,
+                 busy_timeout_ms: int = 5000, cached_statements: int = 256, mmap_mb: int = 0):
+        """Initialize ReadConnectionPool.
+
+        Args:
+            connections_per_database: Idle connections kept per database file.
+            max_databases: Database files that keep idle connections.
+            busy_timeout_ms: How long a read waits for a lock (a WAL checkpoint or recovery).
+            cached_statements: Prepared statements cached per connection.
+            mmap_mb: Memory-mapped I/O size per connection (0 disables it).
+        """
+        self.connections_per_database = connections_per_database
+        self.max_databases = max_databases
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self.mmap_mb = mmap_mb
+        self._lock = threading.Lock()
+        self._idle: 'OrderedDict[str, List[sqlite3.Connection]]' = OrderedDict()
+        self._generations: Dict[str, int] = {}
+
+    def _open(self, path: str) -> sqlite3.Connection:
+        """Open a read-only connection to path; raises sqlite3.OperationalError if it does not exist."""
+        if not os.path.exists(path):
+            raise sqlite3.OperationalError(f"No database at {path}")
+        conn = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False, cached_statements=self.cached_statements
+        )
+        conn.execute('PRAGMA query_only = ON')
+        if self.mmap_mb:
+            conn.execute(f'PRAGMA mmap_size = {int(self.mmap_mb) * 1024 * 1024}')
+        return register_regexp(register_message_functions(conn))
+
+    @contextmanager
+    def connection(self, path: str) -> Iterator[sqlite3.Connection]:
+        """Lend a read-only connection to the database at path, returning it to the pool afterwards."""
+        path = os.path.abspath(path)
+        with self._lock:
+            idle = self._idle.get(path)
+            conn = idle.pop() if idle else None
+            generation = self._generations.get(path, 0)
+        if conn is None:
+            conn = self._open(path)
+        failed = False
+        try:
+            yield conn
+        except sqlite3.Error:
+            # Not reused: the error may have come from the connection itself
+            failed = True
+            raise
+        finally:
+            if failed:
+                conn.close()
+            else:
+                self._release(path, conn, generation)
+
+    def _release(self, path: str, conn: sqlite3.Connection, generation: int):
+        """Keep conn for reuse unless the pool for its file is full or was closed while it was lent."""
+        closing = [conn]
+        with self._lock:
+            if generation == self._generations.get(path, 0):
+                idle = self._idle.setdefault(path, [])
+                self._idle.move_to_end(path)
+                if len(idle) < self.connections_per_database:
+                    idle.append(conn)
+                    closing = []
+                while len(self._idle) > self.max_databases:
+                    _, evicted = self._idle.popitem(last=False)
+                    closing.extend(evicted)
+        for idle_conn in closing:
+            idle_conn.close()
+
+    def close_database(self, path: str):
+        """Close the idle connections to path; connections lent out are closed when returned.
+
+        Called before a job's database file is deleted.
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            closing = self._idle.pop(path, [])
+            self._generations[path] = self._generations.get(path, 0) + 1
+        for conn in closing:
+            conn.close()
+        if closing:
+            logger.debug(f"Closed {len(closing)} pooled read connections to {path}")
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            paths = list(self._idle)
+        for path in paths:
+            self.close_database(path)
@@ -0,0 +1,187 @@
+import heapq
+import itertools
+import logging
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import List, Pattern, Tuple
+
+try:
+    import re._parser as sre_parse
+    import re._constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+
+from analyzer.message_codec import MESSAGE_TEXT_SQL, register_message_functions
+
+# Configure logging
+logging.basicConfig(
+    filename='log_analyzer.log',
+    level=logging.DEBUG,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Number of compiled search patterns kept per process
+PATTERN_CACHE_SIZE = 256
+
+# ASCII letters that a case-insensitive pattern also matches with a non-ASCII character
+# (dotted/dotless i, Kelvin sign, long s), which SQLite's lower() does not fold
+UNFOLDED_LETTERS = frozenset('iks')
+
+# Parsed-pattern repeat opcodes (possessive repeats exist from Python 3.11)
+REPEAT_OPS = tuple(getattr(sre_constants, name) for name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+                   if hasattr(sre_constants, name))
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def compile_pattern(pattern: str) -> Pattern:
+    """Compile a search pattern, reusing the compiled form of recently used ones."""
+    return re.compile(pattern)
+
+def regexp(pattern: str, value) -> bool:
+    """SQLite REGEXP: whether value contains a match of pattern (NULL never matches)."""
+    if value is None:
+        return False
+    return compile_pattern(pattern).search(value) is not None
+
+def register_regexp(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """Register the REGEXP operator (X REGEXP Y calls regexp(Y, X)) on a connection."""
+    conn.create_function('REGEXP', 2, regexp, deterministic=True)
+    return conn
+
+def _sequence_literals(items, literals: List[str]):
+    """Collect literal runs every match of a parsed pattern sequence must contain."""
+    run = []
+    for op, arg in items:
+        if op is sre_constants.LITERAL:
+            run.append(chr(arg))
+            continue
+        if run:
+            literals.append(''.join(run))
+            run = []
+        if op is sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, sub_items = arg
+            if not add_flags and not del_flags:
+                _sequence_literals(sub_items, literals)
+        elif op in REPEAT_OPS:
+            min_count, _, sub_items = arg
+            if min_count >= 1:
+                _sequence_literals(sub_items, literals)
+    if run:
+        literals.append(''.join(run))
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def required_literals(pattern: str) -> Tuple[str, ...]:
+    """Return substrings that every match of pattern contains, longest first.
+
+    Only plain literal runs of the pattern's mandatory parts count: alternations, optional
+    groups and character classes contribute nothing, so a pattern like "a|b" returns []
+    and any string matching the pattern is still kept by a prefilter on these literals.
+    Case-insensitive patterns return lowercased literals, keeping only those that
+    SQLite's ASCII-only lower() folds the same way as the regex.
+    """
+    parsed = sre_parse.parse(pattern)
+    literals = []
+    _sequence_literals(list(parsed), literals)
+    flags = parsed.state.flags
+    if flags & re.IGNORECASE:
+        literals = [
+            literal.lower() for literal in literals
+            if literal.isascii() and (flags & re.ASCII or not UNFOLDED_LETTERS & set(literal.lower()))
+        ]
+    return tuple(sorted(set(literals), key=len, reverse=True))
+
+_scan_pool = None
+_scan_pool_workers = 0
+_scan_pool_lock = threading.Lock()
+
+def scan_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the process pool shared by regex scans, created on first use."""
+    global _scan_pool, _scan_pool_workers
+    with _scan_pool_lock:
+        if _scan_pool is None or _scan_pool_workers != workers:
+            if _scan_pool is not None:
+                _scan_pool.shutdown(wait=False, cancel_futures=True)
+            _scan_pool = ProcessPoolExecutor(max_workers=workers)
+            _scan_pool_workers = workers
+        return _scan_pool
+
+def scan_chunk(db_path: str, where: str, params: list, first_id: int, last_id: int,
+               pattern: str, keep: int, count_all: bool) -> Tuple[int, List[Tuple[int, int]]]:
+    """Match pattern against the rows with ids in [first_id, last_id] in a worker process.
+
+    Returns the number of matching rows and the (ts, id) of the first keep of them in
+    (ts, id) order. Without count_all the scan stops once keep rows matched.
+    """
+    # NOT INDEXED keeps SQLite on the rowid range rather than the filter's indexes, so a
+    # chunk reads only its own rows
+    query = f"""
+        SELECT logs.ts, logs.id, {MESSAGE_TEXT_SQL} FROM logs NOT INDEXED
+        {where} AND logs.id BETWEEN ? AND ?
+        ORDER BY logs.ts, logs.id
+    """
+    search = compile_pattern(pattern).search
+    matched = 0
+    keys = []
+    conn = register_message_functions(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True))
+    try:
+        for ts, log_id, message in conn.execute(query, list(params) + [first_id, last_id]):
+            if message is None or search(message) is None:
+                continue
+            matched += 1
+            if len(keys) < keep:
+                keys.append((ts, log_id))
+            elif not count_all:
+                break
+    finally:
+        conn.close()
+    return matched, keys
+
+def parallel_regex_scan(conn: sqlite3.Connection, where: str, params: list, pattern: str,
+                        offset: int, limit: int, workers: int, chunk_rows: int,
+                        count_all: bool = True) -> Tuple[List[int], int, bool]:
+    """Find one page of rows matching pattern by scanning chunks of them in a process pool.
+
+    The logs table is split into ranges of chunk_rows ids between its first and last id,
+    read from the primary key without touching the rows. Each range is scanned by a
+    worker with its own read-only connection, which matches the rows selected by where (a
+    WHERE clause over logs) in (ts, id) order; the ranges' matches are then merged in
+    (ts, id) order. Without count_all, each range stops once it has matched the page and
+    one more row (showing there is a next page).
+
+    Returns the page's log ids, the number of matches seen, and whether that number is
+    the exact total.
+    """
+    compile_pattern(pattern)
+    db_path = next(row[2] for row in conn.execute('PRAGMA database_list') if row[1] == 'main')
+    first_id, last_id = conn.execute('SELECT MIN(id), MAX(id) FROM logs').fetchone()
+    ranges = []
+    if first_id is not None:
+        ranges = [(start, min(start + chunk_rows - 1, last_id))
+                  for start in range(first_id, last_id + 1, max(1, chunk_rows))]
+
+    wanted = offset + limit + (0 if count_all else 1)
+    start_time = time.time()
+    pool = scan_pool(workers)
+    futures = [pool.submit(scan_chunk, db_path, where, params, lower, upper, pattern, wanted, count_all)
+               for lower, upper in ranges]
+    matched = 0
+    chunk_keys = []
+    try:
+        for future in futures:
+            range_matched, keys = future.result()
+            matched += range_matched
+            chunk_keys.append(keys)
+    finally:
+        for future in futures:
+            future.cancel()
+    ids = [log_id for _, log_id in itertools.islice(heapq.merge(*chunk_keys), wanted)]
+    # A range stops early only after matching wanted rows, so fewer in total means none did
+    complete = count_all or len(ids) < wanted
+    logger.debug(f"Regex scan of {len(ranges)} id ranges with {workers} workers matched {matched} rows "
+                 f"({'complete' if complete else 'page found'}, {time.time() - start_time:.2f}s)")
+    return ids[offset:offset + limit], matched, complete
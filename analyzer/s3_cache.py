@@ -0,0 +1,118 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import BinaryIO, Optional
+
+# Configure logging
+logging.basicConfig(
+    filename='log_analyzer.log',
+    level=logging.DEBUG,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Copy size used when writing an object body into the cache
+COPY_CHUNK_SIZE = 1024 * 1024
+
+class S3ObjectCache:
+    """On-disk cache of S3 objects keyed by bucket, key and ETag, with LRU eviction.
+
+    An object is stored as one file named by a hash of its bucket/key/ETag, so a changed
+    object (new ETag) never hits a stale entry. Last use is tracked in memory and mirrored
+    to each file's mtime, which orders the entries again after a restart. When the total
+    size exceeds max_bytes, the least recently used entries are deleted; readers that
+    already opened an evicted file keep reading it.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        """Initialize the cache, indexing entries already in cache_dir by last use."""
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self._total_bytes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+        existing = []
+        for name in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, name)
+            if name.endswith('.tmp'):
+                # Left behind by an interrupted download
+                os.remove(path)
+                continue
+            stat = os.stat(path)
+            existing.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(existing):
+            self._entries[name] = size
+            self._total_bytes += size
+        logger.info(f"S3 cache at {cache_dir} holds {len(self._entries)} objects ({self._total_bytes} bytes)")
+
+    @staticmethod
+    def _entry_name(bucket_name: str, key: str, etag: str) -> str:
+        """Return the cache file name for an object version."""
+        digest = hashlib.sha256(f"{bucket_name}/{key}/{etag}".encode('utf-8')).hexdigest()
+        return f"{digest}.gz"
+
+    def open(self, bucket_name: str, key: str, etag: Optional[str]) -> Optional[BinaryIO]:
+        """Open a cached object for reading and mark it as used, or return None on a miss."""
+        if not etag:
+            return None
+        name = self._entry_name(bucket_name, key, etag)
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        path = os.path.join(self.cache_dir, name)
+        try:
+            source = open(path, 'rb')
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._total_bytes -= self._entries.pop(name, 0)
+            return None
+        logger.debug(f"S3 cache hit for s3://{bucket_name}/{key}")
+        return source
+
+    def store(self, bucket_name: str, key: str, etag: str, body: BinaryIO) -> BinaryIO:
+        """Copy an object body into the cache and return the cached file opened for reading.
+
+        An object larger than the whole cache is returned but not kept: its file is
+        unlinked as soon as it has been opened.
+        """
+        name = self._entry_name(bucket_name, key, etag)
+        path = os.path.join(self.cache_dir, name)
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                shutil.copyfileobj(body, temp_file, COPY_CHUNK_SIZE)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        source = open(path, 'rb')
+        size = os.path.getsize(path)
+        if size > self.max_bytes:
+            os.remove(path)
+            return source
+
+        evicted = []
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+            while self._total_bytes > self.max_bytes:
+                old_name, old_size = self._entries.popitem(last=False)
+                self._total_bytes -= old_size
+                evicted.append(old_name)
+        for old_name in evicted:
+            try:
+                os.remove(os.path.join(self.cache_dir, old_name))
+            except FileNotFoundError:
+                pass
+        if evicted:
+            logger.debug(f"Evicted {len(evicted)} objects from the S3 cache")
+        return source
@@ -0,0 +1,185 @@
+import logging
+import shutil
+import tempfile
+import threading
+from typing import BinaryIO, Dict, Iterable, Optional
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from analyzer.s3_cache import S3ObjectCache
+
+# Configure logging
+logging.basicConfig(
+    filename='log_analyzer.log',
+    level=logging.DEBUG,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Copy size used when downloading an object body into its spool file
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_s3_client(max_pool_connections: int = 16):
+    """Return the process-wide S3 client, creating it on first use.
+
+    boto3 clients are thread-safe, so listing, validation and every prefetch thread share
+    one client and its HTTP connection pool instead of opening a new client per object.
+    max_pool_connections only applies when the client is created, so every caller passes
+    the configured s3_max_pool_connections.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = boto3.client('s3', config=Config(
+                    max_pool_connections=max_pool_connections,
+                    retries={'max_attempts': 5, 'mode': 'adaptive'}
+                ))
+    return _client
+
+class BudgetedFile:
+    """A downloaded object's spool file that returns its bytes to the fetcher budget on close."""
+
+    def __init__(self, spool, size: int, position: Optional[int], fetcher: 'S3Fetcher'):
+        self._spool = spool
+        self._size = size
+        self._position = position
+        self._fetcher = fetcher
+
+    def read(self, size: int = -1) -> bytes:
+        return self._spool.read(size)
+
+    def close(self):
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+            self._fetcher.release(self._size, self._position)
+
+class S3Fetcher:
+    """Downloads whole S3 objects for the ingest pipeline within a byte budget.
+
+    Each object is copied into a SpooledTemporaryFile that stays in memory up to
+    spool_memory_bytes and spills to a temp file under temp_dir beyond that. A download
+    waits until the bytes held by downloaded but not yet closed objects fit in
+    budget_bytes. The pipeline consumes objects in file_order, so the earliest object not
+    yet consumed is always let through; otherwise later objects could take the whole
+    budget while the one being waited for never downloads.
+
+    With a cache, an object whose listed ETag is cached is read from disk without a
+    request, and downloads are written into the cache instead of a spool file.
+    """
+
+    def __init__(self, budget_bytes: int, spool_memory_bytes: int, temp_dir: Optional[str] = None,
+                 max_pool_connections: int = 16, file_order: Iterable[str] = (),
+                 cache: Optional[S3ObjectCache] = None, etags: Optional[Dict[str, str]] = None):
+        """Initialize S3Fetcher.
+
+        Args:
+            budget_bytes: Bytes that downloaded but unclosed objects may hold in total.
+            spool_memory_bytes: Object size above which a download is spilled to disk.
+            temp_dir: Directory for spilled downloads (system default if None).
+            file_order: s3:// URIs in the order the pipeline consumes them.
+            cache: Object cache to read from and download into.
+            etags: Listed ETag per s3:// URI, used to look objects up in the cache.
+        """
+        self.budget_bytes = budget_bytes
+        self.spool_memory_bytes = spool_memory_bytes
+        self.temp_dir = temp_dir
+        self.client = get_s3_client(max_pool_connections)
+        self.cache = cache
+        self._etags = dict(etags or {})
+        self._positions = {uri: position for position, uri in enumerate(file_order)}
+        self._finished = set()
+        self._next_position = 0
+        self._held_bytes = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def _finish(self, position: Optional[int]):
+        """Record that the object at position was consumed or skipped. Caller holds the condition.
+
+        A position already behind _next_position (an object opened again and closed twice)
+        is ignored, so it is never left in _finished.
+        """
+        if position is not None and position >= self._next_position:
+            self._finished.add(position)
+            while self._next_position in self._finished:
+                self._finished.discard(self._next_position)
+                self._next_position += 1
+        self._condition.notify_all()
+
+    def _reserve(self, size: int, position: Optional[int]):
+        """Block until size bytes fit in the budget, or raise once the fetcher is closed."""
+        with self._condition:
+            while (not self._closed and self._held_bytes > 0
+                   and self._held_bytes + size > self.budget_bytes
+                   and position != self._next_position):
+                self._condition.wait()
+            if self._closed:
+                raise RuntimeError("S3 fetcher closed")
+            self._held_bytes += size
+
+    def release(self, size: int, position: Optional[int] = None):
+        """Return size bytes to the budget once the object at position is consumed."""
+        with self._condition:
+            self._held_bytes -= size
+            self._finish(position)
+
+    def close(self):
+        """Stop admitting downloads and wake any waiting for budget."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def fetch(self, bucket_name: str, key: str) -> BudgetedFile:
+        """Open s3://bucket_name/key from the cache or download it; raises ClientError from get_object."""
+        uri = f"s3://{bucket_name}/{key}"
+        position = self._positions.get(uri)
+        if self.cache is not None:
+            cached = self.cache.open(bucket_name, key, self._etags.get(uri))
+            if cached is not None:
+                return BudgetedFile(cached, 0, position, self)
+        try:
+            response = self.client.get_object(Bucket=bucket_name, Key=key)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') == 'NoSuchKey':
+                # A missing object is skipped by the pipeline and must not hold back the ones after it
+                self.release(0, position)
+            # Other failures are retried, and the retry must still count as the earliest object
+            raise
+        body = response['Body']
+        size = response.get('ContentLength', 0)
+        try:
+            self._reserve(size, position)
+        except RuntimeError:
+            body.close()
+            raise
+        try:
+            if self.cache is not None and response.get('ETag'):
+                downloaded = self.cache.store(bucket_name, key, response['ETag'], body)
+            else:
+                downloaded = self._spool(body)
+        except Exception:
+            # Only the reservation is returned: the object is fetched again on retry
+            self.release(size)
+            raise
+        finally:
+            body.close()
+        logger.debug(f"Downloaded s3://{bucket_name}/{key} ({size} bytes)")
+        return BudgetedFile(downloaded, size, position, self)
+
+    def _spool(self, body) -> BinaryIO:
+        """Copy an object body into a spool file rewound for reading."""
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_memory_bytes, dir=self.temp_dir)
+        try:
+            shutil.copyfileobj(body, spool, DOWNLOAD_CHUNK_SIZE)
+            spool.seek(0)
+        except Exception:
+            spool.close()
+            raise
+        return spool
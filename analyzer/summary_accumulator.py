@@ -0,0 +1,247 @@
+import logging
+import sqlite3
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from analyzer.dimensions import Dimensions
+from analyzer.log_processor import LogBatch
+
+# Configure logging
+logging.basicConfig(
+    filename='log_analyzer.log',
+    level=logging.DEBUG,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Bucket sizes of timeline_rollups in milliseconds, finest first
+TIMELINE_RESOLUTIONS = {'minute': 60000, 'hour': 3600000, 'day': 86400000}
+
+class SummaryAccumulator:
+    """Accumulates a job's summary counts and metadata in memory between flushes.
+
+    Counts are kept in Counters keyed on interned integer ids and written with one
+    executemany per summary table. Files finished since the last flush are recorded
+    as processed_file markers in the same transaction, so a crash never leaves a file
+    marked as processed without its counts (or counted without its marker).
+
+    Files still being ingested get a file_checkpoints row with the line and decompressed
+    byte offset the counts reach, and the job's log store commits the rows they cover in
+    the same transaction. Rows written after that were never counted and are removed
+    before a job resumes from its checkpoints (see LogStore.discard_uncommitted).
+
+    Per-minute counts by level are rolled up to every TIMELINE_RESOLUTIONS bucket when
+    they are flushed, so timeline_rollups holds minute, hour and day counts alike.
+    """
+
+    def __init__(self, job_id: str, dimensions: Dimensions, flush_rows: int = 200000,
+                 flush_seconds: float = 30.0, log_store=None):
+        """Initialize an empty accumulator for job_id with the given flush thresholds.
+
+        dimensions maps the accumulated names to the integer ids stored in the summary tables;
+        log_store is the LogStore committed with each flush.
+        """
+        self.job_id = job_id
+        self.dimensions = dimensions
+        self.log_store = log_store
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self.class_level = Counter()
+        self.service_level = Counter()
+        self.timeline = Counter()
+        self.timeline_minutes = Counter()
+        self.class_service = Counter()
+        self.seen_classes = set()
+        self.seen_services = set()
+        self.new_classes = set()
+        self.new_services = set()
+        self.pending_files: List[str] = []
+        self.checkpoints: Dict[str, Tuple[int, int]] = {}
+        self.rows_since_flush = 0
+        self.last_flush = time.monotonic()
+
+    def _intern(self, value: str) -> int:
+        """Return the integer id for a class, service, level or hour string."""
+        value_id = self._ids.get(value)
+        if value_id is None:
+            value_id = self._ids[value] = len(self._names)
+            self._names.append(value)
+        return value_id
+
+    def load_seen_metadata(self, conn: sqlite3.Connection):
+        """Preload classes and services already recorded in job_metadata for a resumed job."""
+        cursor = conn.execute('''
+            SELECT type, value FROM job_metadata WHERE job_id = ? AND type IN ('class', 'service')
+        ''', (self.job_id,))
+        for value_type, value in cursor.fetchall():
+            if value_type == 'class':
+                self.seen_classes.add(self._intern(value))
+            else:
+                self.seen_services.add(self._intern(value))
+
+    def _merge(self, target: Counter, counts: Counter):
+        """Merge string-keyed pair counts from one batch into an id-keyed Counter."""
+        intern = self._intern
+        for (first, second), count in counts.items():
+            target[(intern(first), intern(second))] += count
+
+    def add(self, batch: LogBatch):
+        """Count a parsed batch; each distinct key is interned once per batch."""
+        self._merge(self.class_level, Counter(zip(batch.class_name, batch.level)))
+        self._merge(self.service_level, Counter(zip(batch.service, batch.level)))
+        self._merge(self.timeline, Counter((hour, level) for hour, level in zip(batch.hour, batch.level) if hour))
+        minute_ms = TIMELINE_RESOLUTIONS['minute']
+        intern = self._intern
+        for (minute, level), count in Counter(
+            (ts - ts % minute_ms, level) for ts, level in zip(batch.ts, batch.level) if ts > 0
+        ).items():
+            self.timeline_minutes[(minute, intern(level))] += count
+        self._merge(self.class_service, Counter(zip(batch.class_name, batch.service)))
+
+        for class_id in map(self._intern, set(batch.class_name)):
+            if class_id not in self.seen_classes:
+                self.seen_classes.add(class_id)
+                self.new_classes.add(class_id)
+        for service_id in map(self._intern, set(batch.service)):
+            if service_id not in self.seen_services:
+                self.seen_services.add(service_id)
+                self.new_services.add(service_id)
+        self.rows_since_flush += len(batch)
+
+    def checkpoint(self, file_path: str, line_idx: int, byte_offset: int):
+        """Record how far into file_path the accumulated counts reach.
+
+        line_idx and byte_offset point just past the last counted line of the file.
+        """
+        self.checkpoints[file_path] = (line_idx, byte_offset)
+
+    def mark_file_processed(self, file_path: str):
+        """Queue a processed_file marker to be written with the next flush."""
+        self.checkpoints.pop(file_path, None)
+        self.pending_files.append(file_path)
+
+    def should_flush(self) -> bool:
+        """Check whether the row-count or time threshold has been reached."""
+        return (self.rows_since_flush >= self.flush_rows
+                or time.monotonic() - self.last_flush >= self.flush_seconds)
+
+    def flush(self, conn: sqlite3.Connection):
+        """Write accumulated counts, new metadata and pending file markers in one transaction."""
+        names = self._names
+        job_id = self.job_id
+        try:
+            dimensions = self.dimensions
+            job_key = dimensions.job_key(job_id)
+
+            def dimension_id(table: str, value_id: int) -> int:
+                return dimensions.id(table, names[value_id])
+            
+            conn.executemany('''
+                INSERT INTO class_level_counts (job_key, class_id, level_id, count)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(job_key, class_id, level_id) DO UPDATE SET count = count + excluded.count
+            ''', [(job_key, dimension_id('classes', a), dimension_id('levels', b), count) for (a, b), count in self.class_level.items()])
+            conn.executemany('''
+                INSERT INTO service_level_counts (job_key, service_id, level_id, count)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(job_key, service_id, level_id) DO UPDATE SET count = count + excluded.count
+            ''', [(job_key, dimension_id('services', a), dimension_id('levels', b), count) for (a, b), count in self.service_level.items()])
+            conn.executemany('''
+                INSERT INTO timeline_counts (job_key, hour, level_id, count)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(job_key, hour, level_id) DO UPDATE SET count = count + excluded.count
+            ''', [(job_key, names[a], dimension_id('levels', b), count) for (a, b), count in self.timeline.items()])
+            rollups = Counter()
+            for (minute, level), count in self.timeline_minutes.items():
+                for resolution_ms in TIMELINE_RESOLUTIONS.values():
+                    rollups[(resolution_ms, minute - minute % resolution_ms, level)] += count
+            conn.executemany('''
+                INSERT INTO timeline_rollups (job_key, resolution_ms, bucket_ms, level_id, count)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(job_key, resolution_ms, bucket_ms, level_id) DO UPDATE SET count = count + excluded.count
+            ''', [(job_key, resolution_ms, bucket_ms, dimension_id('levels', level), count)
+                  for (resolution_ms, bucket_ms, level), count in rollups.items()])
+            conn.executemany('''
+                INSERT INTO class_service_counts (job_key, class_id, service_id, count)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(job_key, class_id, service_id) DO UPDATE SET count = count + excluded.count
+            ''', [(job_key, dimension_id('classes', a), dimension_id('services', b), count) for (a, b), count in self.class_service.items()])
+            conn.executemany('''
+                INSERT OR IGNORE INTO job_metadata (job_id, type, value)
+                VALUES (?, ?, ?)
+            ''', [(job_id, 'class', names[i]) for i in self.new_classes] +
+                 [(job_id, 'service', names[i]) for i in self.new_services])
+            conn.executemany('''
+                INSERT INTO job_metadata (job_id, type, value)
+                VALUES (?, ?, ?)
+            ''', [(job_id, 'processed_file', file_path) for file_path in self.pending_files])
+            conn.executemany('''
+                DELETE FROM file_checkpoints WHERE job_id = ? AND file_path = ?
+            ''', [(job_id, file_path) for file_path in self.pending_files])
+            conn.executemany('''
+                INSERT INTO file_checkpoints (job_id, file_path, line_idx, byte_offset)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(job_id, file_path) DO UPDATE SET
+                    line_idx = excluded.line_idx, byte_offset = excluded.byte_offset
+            ''', [(job_id, file_path, line_idx, byte_offset)
+                  for file_path, (line_idx, byte_offset) in self.checkpoints.items()])
+            if self.log_store is not None:
+                self.log_store.commit(conn)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error flushing summary counts for job_id {job_id}: {str(e)}")
+            raise
+
+        logger.debug(f"Flushed {self.rows_since_flush} summarised rows and {len(self.pending_files)} "
+                     f"processed files for job_id: {job_id}")
+        self.class_level.clear()
+        self.service_level.clear()
+        self.timeline.clear()
+        self.timeline_minutes.clear()
+        self.class_service.clear()
+        self.new_classes.clear()
+        self.new_services.clear()
+        self.pending_files = []
+        self.checkpoints.clear()
+        self.rows_since_flush = 0
+        self.last_flush = time.monotonic()
+
+def load_file_checkpoints(conn: sqlite3.Connection, job_id: str) -> Dict[str, Tuple[int, int]]:
+    """Return {file_path: (line_idx, byte_offset)} for files a job had partly ingested."""
+    cursor = conn.execute('''
+        SELECT file_path, line_idx, byte_offset FROM file_checkpoints WHERE job_id = ?
+    ''', (job_id,))
+    return {file_path: (line_idx, byte_offset) for file_path, line_idx, byte_offset in cursor.fetchall()}
+
+def delete_uncounted_logs(conn: sqlite3.Connection, job_id: str) -> Optional[int]:
+    """Delete logs rows written after the job's last summary flush, before resuming it.
+
+    Those rows are not covered by the summary counts or the file checkpoints, so they are
+    ingested again from the checkpoints. Returns the job's committed log id, or None for a
+    job that already has processed files but no committed_log_id marker (one created
+    before checkpoints existed), whose rows are kept.
+    """
+    cursor = conn.execute('''
+        SELECT value FROM job_metadata WHERE job_id = ? AND type = 'committed_log_id'
+    ''', (job_id,))
+    row = cursor.fetchone()
+    if row is not None:
+        committed_log_id = int(row[0])
+    else:
+        cursor = conn.execute('''
+            SELECT 1 FROM job_metadata WHERE job_id = ? AND type = 'processed_file' LIMIT 1
+        ''', (job_id,))
+        if cursor.fetchone() is not None:
+            return None
+        committed_log_id = 0
+    deleted = conn.execute('''
+        DELETE FROM logs WHERE id > ? AND job_key = (SELECT job_key FROM job_keys WHERE job_id = ?)
+    ''', (committed_log_id, job_id)).rowcount
+    conn.commit()
+    if deleted:
+        logger.info(f"Removed {deleted} uncounted log rows for job_id: {job_id} before resuming")
+    return committed_log_id
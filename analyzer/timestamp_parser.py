@@ -0,0 +1,118 @@
+from calendar import timegm
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+MONTHS = {
+    'Jan': '01', 'Feb': '02', 'Mar': '03', 'Apr': '04', 'May': '05', 'Jun': '06',
+    'Jul': '07', 'Aug': '08', 'Sep': '09', 'Oct': '10', 'Nov': '11', 'Dec': '12'
+}
+
+# ts stored for rows whose logtime is missing or not recognised, so they sort first
+UNKNOWN_TS = 0
+
+class TimestampParser:
+    """Normalises logtime values to hour buckets and UTC epoch milliseconds by their fixed
+    shape instead of strptime.
+
+    Recognised formats:
+        YYYY-MM-DD HH:MM:SS,fff    (1-6 fractional digits; taken as UTC)
+        YYYY-MM-DD HH:MM:SS        (taken as UTC)
+        DD/Mon/YYYY:HH:MM:SS +zzzz (Apache; the hour bucket is kept in the logged offset,
+                                    epoch milliseconds are converted to UTC)
+
+    The date and hour part of a timestamp is validated once per distinct prefix and the
+    resulting 'YYYY-MM-DD HH:00:00' bucket and the epoch second it starts at are
+    memoized, so per line only the minute, second and fraction fields are read.
+    """
+
+    def __init__(self):
+        """Initialize TimestampParser with empty hour caches."""
+        self._iso_hours: Dict[str, Optional[Tuple[str, int]]] = {}
+        self._apache_hours: Dict[str, Optional[Tuple[str, int]]] = {}
+
+    def hour_bucket(self, timestamp: str) -> Optional[str]:
+        """Return the 'YYYY-MM-DD HH:00:00' bucket for a timestamp, or None if it is not recognised."""
+        return self.parse(timestamp)[0]
+
+    def epoch_ms(self, timestamp: Optional[str]) -> int:
+        """Return the UTC epoch milliseconds of a timestamp, or UNKNOWN_TS if it is not recognised."""
+        if not timestamp:
+            return UNKNOWN_TS
+        epoch_ms = self.parse(timestamp)[1]
+        return UNKNOWN_TS if epoch_ms is None else epoch_ms
+
+    def parse(self, timestamp: str) -> Tuple[Optional[str], Optional[int]]:
+        """Return (hour bucket, UTC epoch milliseconds) for a timestamp, or (None, None) if it is not recognised."""
+        if not isinstance(timestamp, str):
+            return None, None
+        length = len(timestamp)
+        if length >= 19 and timestamp[4] == '-' and timestamp[10] == ' ':
+            if length > 19 and not (length >= 21 and length <= 26 and timestamp[19] == ','
+                                    and timestamp[20:].isdigit()):
+                return None, None
+            if not self._valid_minute_second(timestamp, 13):
+                return None, None
+            prefix = timestamp[:13]
+            hour = self._iso_hours.get(prefix, False)
+            if hour is False:
+                hour = self._iso_hours[prefix] = self._iso_hour(prefix)
+            if hour is None:
+                return None, None
+            bucket, hour_start = hour
+            millis = int(timestamp[20:23].ljust(3, '0')) if length > 19 else 0
+            seconds = hour_start + int(timestamp[14:16]) * 60 + int(timestamp[17:19])
+            return bucket, seconds * 1000 + millis
+        if length == 26 and timestamp[2] == '/' and timestamp[11] == ':':
+            if timestamp[20] != ' ' or timestamp[21] not in '+-' or not timestamp[22:].isdigit():
+                return None, None
+            if not self._valid_minute_second(timestamp, 14):
+                return None, None
+            prefix = timestamp[:14]
+            hour = self._apache_hours.get(prefix, False)
+            if hour is False:
+                hour = self._apache_hours[prefix] = self._apache_hour(prefix)
+            if hour is None:
+                return None, None
+            bucket, hour_start = hour
+            offset = int(timestamp[22:24]) * 3600 + int(timestamp[24:26]) * 60
+            if timestamp[21] == '-':
+                offset = -offset
+            seconds = hour_start + int(timestamp[15:17]) * 60 + int(timestamp[18:20]) - offset
+            return bucket, seconds * 1000
+        return None, None
+
+    @staticmethod
+    def _valid_minute_second(timestamp: str, hour_end: int) -> bool:
+        """Check the ':MM:SS' fields that follow the hour at hour_end."""
+        minute = timestamp[hour_end + 1:hour_end + 3]
+        second = timestamp[hour_end + 4:hour_end + 6]
+        return (timestamp[hour_end] == ':' and timestamp[hour_end + 3] == ':'
+                and minute.isdigit() and second.isdigit() and minute < '60' and second < '60')
+
+    @staticmethod
+    def _iso_hour(prefix: str) -> Optional[Tuple[str, int]]:
+        """Validate a 'YYYY-MM-DD HH' prefix and return its hour bucket and start epoch second."""
+        if prefix[7] != '-':
+            return None
+        year, month, day, hour = prefix[0:4], prefix[5:7], prefix[8:10], prefix[11:13]
+        try:
+            if not (year.isdigit() and month.isdigit() and day.isdigit() and hour.isdigit()):
+                return None
+            start = datetime(int(year), int(month), int(day), int(hour))
+        except ValueError:
+            return None
+        return f"{prefix}:00:00", timegm(start.timetuple())
+
+    @staticmethod
+    def _apache_hour(prefix: str) -> Optional[Tuple[str, int]]:
+        """Validate a 'DD/Mon/YYYY:HH' prefix and return its hour bucket and start epoch second (before the offset)."""
+        if prefix[6] != '/':
+            return None
+        day, month, year, hour = prefix[0:2], MONTHS.get(prefix[3:6]), prefix[7:11], prefix[12:14]
+        try:
+            if month is None or not (year.isdigit() and day.isdigit() and hour.isdigit()):
+                return None
+            start = datetime(int(year), int(month), int(day), int(hour))
+        except ValueError:
+            return None
+        return f"{year}-{month}-{day} {hour}:00:00", timegm(start.timetuple())
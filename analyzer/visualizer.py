@@ -2,7 +2,8 @@ import streamlit as st
 import plotly.express as px
 import pandas as pd
 import logging
-from typing import Dict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
 
 # Configure logging
 logging.basicConfig(
@@ -12,6 +13,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+EPOCH = datetime(1970, 1, 1)
+
+# Shortest job span that gets a time range slider on the timeline
+TIMELINE_MIN_WINDOW_MS = 2 * 60000
+
 class Visualizer:
     """Handles visualization of log analysis data."""
     
@@ -21,63 +27,78 @@ class Visualizer:
         self.log_levels = config.get('app', {}).get('log_levels', [])
         logger.info("Visualizer initialized with config")
 
-    def display_dashboard(self, timeline_data: pd.DataFrame, class_pivot: pd.DataFrame,
+    def display_timeline(self, timeline: Dict, fetch_timeline: Optional[Callable[[int, int], Dict]] = None):
+        """Plot log counts by level over time at the resolution the backend picked for the range.
+
+        timeline covers the whole job. With fetch_timeline, a time range slider zooms in: the
+        selected window is fetched on its own and comes back per minute, hour or day, whichever
+        keeps it within the backend's timeline_max_points.
+        """
+        timeline_data = timeline['data']
+        if timeline_data.empty:
+            st.info("No timeline data available")
+            logger.info("Timeline data is empty")
+            return
+
+        st.markdown("### Log Counts Over Time")
+        if fetch_timeline and timeline['end_ms'] - timeline['start_ms'] > TIMELINE_MIN_WINDOW_MS:
+            job_start = datetime.utcfromtimestamp(timeline['start_ms'] / 1000)
+            job_end = datetime.utcfromtimestamp(timeline['end_ms'] / 1000)
+            window_start, window_end = st.slider(
+                "Time Range (UTC)",
+                min_value=job_start,
+                max_value=job_end,
+                value=(job_start, job_end),
+                step=timedelta(minutes=1),
+                format="YYYY-MM-DD HH:mm",
+                help="Narrow the range to zoom in; shorter ranges are drawn per hour or per minute"
+            )
+            if (window_start, window_end) != (job_start, job_end) and window_end > window_start:
+                timeline = fetch_timeline(int((window_start - EPOCH).total_seconds() * 1000),
+                                          int((window_end - EPOCH).total_seconds() * 1000))
+                timeline_data = timeline['data']
+
+        resolution = timeline['resolution'] or 'hour'
+        fig_timeline = px.line(
+            timeline_data,
+            x='time',
+            y='count',
+            color='level',
+            title=f"Log Counts per {resolution.capitalize()} (UTC)",
+            labels={'time': 'Time', 'count': 'Count', 'level': 'Log Level'},
+            color_discrete_sequence=px.colors.qualitative.Plotly
+        )
+        fig_timeline.update_layout(
+            xaxis_title="Time",
+            yaxis_title="Count",
+            legend_title="Log Level",
+            xaxis_tickformat="%Y-%m-%d %H:%M",
+            xaxis=dict(
+                tickmode='auto',
+                nticks=20,
+                rangeslider_visible=True,
+                showgrid=True,
+                gridcolor='rgba(200, 200, 200, 0.5)'
+            ),
+            yaxis=dict(
+                showgrid=True,
+                gridcolor='rgba(200, 200, 200, 0.5)'
+            ),
+            height=600,
+            margin=dict(b=150)
+        )
+        st.plotly_chart(fig_timeline, use_container_width=True)
+
+    def display_dashboard(self, timeline: Dict, class_pivot: pd.DataFrame,
                          service_pivot: pd.DataFrame, class_totals: pd.DataFrame,
-                         service_totals: pd.DataFrame):
+                         service_totals: pd.DataFrame,
+                         fetch_timeline: Optional[Callable[[int, int], Dict]] = None):
         """Display the main dashboard with analysis visualizations."""
         try:
             st.subheader("Analysis Dashboard")
             
             # Timeline Data
-            if not timeline_data.empty:
-                st.markdown("### Log Counts Over Time")
-                # Ensure hour is in datetime format
-                timeline_data['hour'] = pd.to_datetime(timeline_data['hour'], errors='coerce')
-                if timeline_data['hour'].isna().any():
-                    logger.warning("Some timeline entries have invalid datetime values")
-                    st.session_state.notifications.append({
-                        'type': 'warning',
-                        'message': "Some timeline entries have invalid datetime values and were excluded",
-                        'timestamp': time.time()
-                    })
-                    timeline_data = timeline_data.dropna(subset=['hour'])
-                
-                if not timeline_data.empty:
-                    fig_timeline = px.line(
-                        timeline_data,
-                        x='hour',
-                        y='count',
-                        color='level',
-                        title="Log Counts by Hour",
-                        labels={'hour': 'Time', 'count': 'Count', 'level': 'Log Level'},
-                        color_discrete_sequence=px.colors.qualitative.Plotly
-                    )
-                    fig_timeline.update_layout(
-                        xaxis_title="Time",
-                        yaxis_title="Count",
-                        legend_title="Log Level",
-                        xaxis_tickformat="%Y-%m-%d %H:%M",
-                        xaxis=dict(
-                            tickmode='auto',
-                            nticks=20,
-                            rangeslider_visible=True,
-                            showgrid=True,
-                            gridcolor='rgba(200, 200, 200, 0.5)'
-                        ),
-                        yaxis=dict(
-                            showgrid=True,
-                            gridcolor='rgba(200, 200, 200, 0.5)'
-                        ),
-                        height=600,
-                        margin=dict(b=150)
-                    )
-                    st.plotly_chart(fig_timeline, use_container_width=True)
-                else:
-                    st.info("No valid timeline data available for plotting")
-                    logger.info("No valid timeline data after filtering")
-            else:
-                st.info("No timeline data available")
-                logger.info("Timeline data is empty")
+            self.display_timeline(timeline, fetch_timeline)
             
             # Log Level Counts by Class
             if not class_pivot.empty:
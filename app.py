@@ -1,15 +1,16 @@
 import html
+import json
 import streamlit as st
 import pandas as pd
 import requests
 import yaml
 import logging
 import time
-import json
-import sqlite3
 from datetime import datetime
+from urllib.parse import quote, urlencode
 from analyzer.visualizer import Visualizer
-from analyzer.data_manager import export_to_excel, get_analysis_data, init_db
+from analyzer.data_manager import analysis_frame, timeline_frame
+from analyzer.timestamp_parser import TimestampParser
 from retrying import retry
 import os
 import re
@@ -27,6 +28,9 @@ logger = logging.getLogger(__name__)
 # Backend API base URL
 BACKEND_URL = "http://localhost:8000"
 
+# Seconds a passed backend health check is trusted before a rerun checks again
+BACKEND_HEALTH_TTL = 5
+
 def load_config():
     """Load configuration from YAML file."""
     try:
@@ -53,8 +57,8 @@ def initialize_session_state():
         st.session_state.csv_notifications = []
     if 'backend_available' not in st.session_state:
         st.session_state.backend_available = False
-    if 'db_initialized' not in st.session_state:
-        st.session_state.db_initialized = False
+    if 'backend_checked_at' not in st.session_state:
+        st.session_state.backend_checked_at = 0.0
     if 'log_viewer_job_id' not in st.session_state:
         st.session_state.log_viewer_job_id = None
     if 'cached_job_id' not in st.session_state:
@@ -73,6 +77,11 @@ def initialize_session_state():
         st.session_state.log_viewer_total_logs = 0
     if 'log_viewer_last_job_id' not in st.session_state:
         st.session_state.log_viewer_last_job_id = None
+    if 'log_viewer_cursors' not in st.session_state:
+        # log_viewer_cursors[i] is the cursor page i + 1 starts after (None for page 1)
+        st.session_state.log_viewer_cursors = [None]
+    if 'log_viewer_filters' not in st.session_state:
+        st.session_state.log_viewer_filters = None
     if 'customer_folders' not in st.session_state:
         st.session_state.customer_folders = []
     if 'customer_folders_page' not in st.session_state:
@@ -83,6 +92,8 @@ def initialize_session_state():
         st.session_state.customer_folders_search = ""
     if 'filtered_customer_folders' not in st.session_state:
         st.session_state.filtered_customer_folders = []
+    if 'excel_export_job_id' not in st.session_state:
+        st.session_state.excel_export_job_id = None
 
 @retry(stop_max_attempt_number=3, wait_exponential_multiplier=1000, wait_exponential_max=10000)
 def check_backend_health():
@@ -95,16 +106,11 @@ def check_backend_health():
         logger.info("Backend health check passed")
         
         if st.session_state.selected_job_id:
-            # Verify job_id exists in jobs table
+            # Fetch job status
             try:
-                conn = sqlite3.connect('data/logs.db', timeout=30)
-                cursor = conn.cursor()
-                cursor.execute("SELECT job_id FROM jobs WHERE job_id = ?", (st.session_state.selected_job_id,))
-                job_exists = cursor.fetchone()
-                conn.close()
-                
-                if not job_exists:
-                    logger.warning(f"Selected job_id {st.session_state.selected_job_id} not found in database")
+                job_response = requests.get(f"{BACKEND_URL}/jobs/{quote(st.session_state.selected_job_id, safe='')}/status", timeout=10)
+                if job_response.status_code == 404:
+                    logger.warning(f"Selected job_id {st.session_state.selected_job_id} not found in backend")
                     st.session_state.notifications.append({
                         'type': 'warning',
                         'message': f"Selected job {st.session_state.selected_job_id} no longer exists. Please select a valid job.",
@@ -113,18 +119,6 @@ def check_backend_health():
                     st.session_state.selected_job_id = None
                     st.session_state.show_dashboard = False
                     return True
-            except sqlite3.OperationalError as e:
-                logger.error(f"Database error checking job_id {st.session_state.selected_job_id}: {str(e)}")
-                st.session_state.notifications.append({
-                    'type': 'error',
-                    'message': f"Database error checking job status: {str(e)}",
-                    'timestamp': time.time()
-                })
-                return True
-            
-            # Fetch job status
-            try:
-                job_response = requests.get(f"{BACKEND_URL}/jobs/{st.session_state.selected_job_id}/status", timeout=10)
                 job_response.raise_for_status()
                 job_data = job_response.json()
                 files_processed = job_data.get('files_processed', 0)
@@ -159,6 +153,31 @@ def check_backend_health():
         })
         return False
 
+def refresh_backend_status():
+    """Recheck the backend on a rerun, at most every BACKEND_HEALTH_TTL seconds once it has answered.
+
+    Until the backend answers, check_backend_health runs on every rerun. After that a
+    quick /health request keeps backend_available current, so if the backend goes down
+    mid-session the app takes its backend-unavailable path instead of failing requests.
+    """
+    if not st.session_state.backend_available:
+        check_backend_health()
+        st.session_state.backend_checked_at = time.time()
+        return
+    if time.time() - st.session_state.backend_checked_at < BACKEND_HEALTH_TTL:
+        return
+    try:
+        requests.get(f"{BACKEND_URL}/health", timeout=3).raise_for_status()
+    except requests.RequestException as e:
+        logger.warning(f"Backend health check failed: {str(e)}")
+        st.session_state.backend_available = False
+        st.session_state.notifications.append({
+            'type': 'error',
+            'message': "Backend is not responding. Job control actions are unavailable.",
+            'timestamp': time.time()
+        })
+    st.session_state.backend_checked_at = time.time()
+
 def apply_custom_css():
     """Apply Tailwind CSS with glassmorphism and custom styles for customer folders."""
     st.markdown(
@@ -446,27 +465,30 @@ def apply_custom_css():
         unsafe_allow_html=True
     )
 
+def backend_get(path: str, params: dict = None, timeout: int = 30):
+    """GET a backend read endpoint and return its JSON.
+
+    Raises requests.RequestException, carrying the backend's error detail for an error response.
+    """
+    response = requests.get(f"{BACKEND_URL}{path}", params=params, timeout=timeout)
+    if response.status_code >= 400:
+        try:
+            detail = response.json().get('detail', response.text)
+        except ValueError:
+            detail = response.text
+        raise requests.HTTPError(f"{response.status_code}: {detail}", response=response)
+    return response.json()
+
+def job_path(job_id: str) -> str:
+    """Return the backend path of a job, with its id URL-encoded."""
+    return f"/jobs/{quote(job_id, safe='')}"
+
 @retry(stop_max_attempt_number=3, wait_exponential_multiplier=1000, wait_exponential_max=10000)
 def get_job_status():
-    """Fetch all job statuses from SQLite database."""
+    """Fetch all job statuses from the backend."""
     try:
-        conn = sqlite3.connect('data/logs.db', timeout=30)
-        query = """
-            SELECT job_id, folder_path, status, files_processed, total_files, start_time, last_updated
-            FROM jobs
-        """
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        return df
-    except sqlite3.OperationalError as e:
-        logger.error(f"Database error fetching job status: {str(e)}")
-        st.session_state.notifications.append({
-            'type': 'error',
-            'message': f"Database error fetching job status: {str(e)}",
-            'timestamp': time.time()
-        })
-        return pd.DataFrame()
-    except Exception as e:
+        return pd.DataFrame(backend_get("/jobs", timeout=30))
+    except requests.RequestException as e:
         logger.error(f"Error fetching job status: {str(e)}")
         st.session_state.notifications.append({
             'type': 'error',
@@ -475,33 +497,73 @@ def get_job_status():
         })
         return pd.DataFrame()
 
+def format_eta(seconds) -> str:
+    """Format an ETA in seconds as h:mm:ss, or N/A when it is not known yet."""
+    if seconds is None:
+        return 'N/A'
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}"
+
+def render_job_progress(placeholder, snapshot: dict):
+    """Draw a progress stream snapshot in placeholder."""
+    total_files = snapshot.get('total_files', 0)
+    files_processed = snapshot.get('files_processed', 0)
+    with placeholder.container():
+        st.progress(
+            min(files_processed / total_files, 1.0) if total_files else 0.0,
+            text=f"{snapshot.get('status', 'N/A')}: {files_processed} / {total_files} files"
+        )
+        if snapshot.get('status') == 'RUNNING':
+            st.markdown(
+                f"**Current File:** {snapshot.get('current_file') or 'N/A'} &nbsp;|&nbsp; "
+                f"**Lines/sec:** {snapshot.get('lines_per_sec', 0):,.0f} &nbsp;|&nbsp; "
+                f"**Throughput:** {snapshot.get('bytes_per_sec', 0) / (1024 * 1024):,.1f} MB/s &nbsp;|&nbsp; "
+                f"**ETA:** {format_eta(snapshot.get('eta_seconds'))}"
+            )
+        elif snapshot.get('status') == 'COMPLETED' and snapshot.get('indexes_building'):
+            st.markdown("**Building search indexes...**")
+
+def stream_job_progress(job_id: str, placeholder):
+    """Show a job's live progress in placeholder from the backend's progress stream.
+
+    Blocks until the stream ends; Streamlit stops it at the next update when the user
+    interacts with the page. The app is rerun when the job stops running, so the job
+    details and controls refresh.
+    """
+    heartbeat = float(load_config()['app'].get('progress_heartbeat_seconds', 15))
+    was_active = False
+    snapshot = None
+    try:
+        with requests.get(f"{BACKEND_URL}{job_path(job_id)}/progress", stream=True,
+                          timeout=(10, heartbeat * 3)) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                snapshot = json.loads(line[len('data:'):])
+                if snapshot.get('status') == 'RUNNING' or (snapshot.get('status') == 'COMPLETED'
+                                                           and snapshot.get('indexes_building')):
+                    was_active = True
+                if 'status' in snapshot:
+                    render_job_progress(placeholder, snapshot)
+    except (requests.RequestException, ValueError) as e:
+        logger.warning(f"Progress stream for job {job_id} failed: {str(e)}")
+        placeholder.warning(f"Live progress unavailable: {str(e)}")
+        return
+    if was_active:
+        logger.info(f"Job {job_id} finished with status {snapshot.get('status', 'DELETED')}")
+        st.experimental_rerun()
+
 @st.cache_data(hash_funcs={str: lambda x: x})
 def get_job_metadata(job_id: str):
-    """Fetch unique classes and services for a job from job_metadata table, cached."""
+    """Fetch unique classes and services for a job from the backend, cached."""
     try:
-        conn = sqlite3.connect('data/logs.db', timeout=30)
-        classes = pd.read_sql_query(
-            "SELECT value FROM job_metadata WHERE job_id = ? AND type = 'class'",
-            conn,
-            params=[job_id]
-        )['value'].dropna().unique().tolist()
-        services = pd.read_sql_query(
-            "SELECT value FROM job_metadata WHERE job_id = ? AND type = 'service'",
-            conn,
-            params=[job_id]
-        )['value'].dropna().unique().tolist()
-        conn.close()
+        metadata = backend_get(f"{job_path(job_id)}/metadata")
+        classes, services = metadata['classes'], metadata['services']
         logger.info(f"Fetched metadata for job_id: {job_id}, classes: {len(classes)}, services: {len(services)}")
         return classes, services
-    except sqlite3.OperationalError as e:
-        logger.error(f"Database error fetching metadata for job_id {job_id}: {str(e)}")
-        st.session_state.notifications.append({
-            'type': 'error',
-            'message': f"Database error fetching metadata: {str(e)}",
-            'timestamp': time.time()
-        })
-        return [], []
-    except Exception as e:
+    except requests.RequestException as e:
         logger.error(f"Error fetching metadata for job_id {job_id}: {str(e)}")
         st.session_state.notifications.append({
             'type': 'error',
@@ -510,99 +572,111 @@ def get_job_metadata(job_id: str):
         })
         return [], []
 
+def job_data_version(job_id: str, job_status_df: pd.DataFrame = None) -> str:
+    """Return a key for a job's current data: its status, files processed and last update in /jobs.
+
+    Cached reads of a job's summaries and timeline take it as an argument, so they are
+    fetched again once a running job moves on. job_status_df is fetched when not given.
+    """
+    if job_status_df is None:
+        job_status_df = get_job_status()
+    if job_status_df.empty or 'job_id' not in job_status_df.columns:
+        return ''
+    rows = job_status_df[job_status_df['job_id'] == job_id]
+    if rows.empty:
+        return ''
+    job = rows.iloc[0]
+    return f"{job.get('status')}|{job.get('files_processed')}|{job.get('last_updated')}"
+
+@st.cache_data
+def fetch_analysis_data(job_id: str, query_type: str, data_version: str) -> pd.DataFrame:
+    """Fetch a job's summary counts for query_type from the backend, cached per data version.
+
+    Raises requests.RequestException, so a failed fetch is not cached.
+    """
+    summary = backend_get(f"{job_path(job_id)}/summaries/{query_type}")
+    df = analysis_frame(query_type, summary['columns'], summary['rows'])
+    logger.info(f"Retrieved {query_type} data for job_id: {job_id} (version {data_version}), rows: {len(df)}")
+    return df
+
+def get_analysis_data(job_id: str, query_type: str, data_version: str) -> pd.DataFrame:
+    """Return a job's summary counts for query_type, or an empty frame if the backend fails."""
+    try:
+        return fetch_analysis_data(job_id, query_type, data_version)
+    except requests.RequestException as e:
+        logger.error(f"Error retrieving {query_type} data for job_id {job_id}: {str(e)}")
+        return pd.DataFrame()
+
+@st.cache_data
+def fetch_timeline_data(job_id: str, data_version: str, start_ms: int = None, end_ms: int = None) -> dict:
+    """Fetch a job's log counts by level over a window (the whole job by default), cached per data version.
+
+    Returns the backend's timeline with its rows as a DataFrame in 'data'; the backend picks
+    the minute, hour or day resolution that suits the window. Raises requests.RequestException,
+    so a failed fetch is not cached.
+    """
+    params = {key: value for key, value in (('start_ms', start_ms), ('end_ms', end_ms)) if value is not None}
+    timeline = backend_get(f"{job_path(job_id)}/timeline", params=params)
+    timeline['data'] = timeline_frame(timeline.pop('columns'), timeline.pop('rows'))
+    logger.info(f"Retrieved {timeline['resolution']} timeline for job_id: {job_id} (version {data_version}), rows: {len(timeline['data'])}")
+    return timeline
+
+def get_timeline(job_id: str, data_version: str, start_ms: int = None, end_ms: int = None) -> dict:
+    """Return a job's timeline over a window (see fetch_timeline_data), or an empty one if the backend fails."""
+    try:
+        return fetch_timeline_data(job_id, data_version, start_ms, end_ms)
+    except requests.RequestException as e:
+        logger.error(f"Error retrieving timeline for job_id {job_id}: {str(e)}")
+        return {'resolution': None, 'resolution_ms': None, 'start_ms': None, 'end_ms': None,
+                'data': pd.DataFrame(columns=['time', 'level', 'count'])}
+
+def fetch_logs_page(job_id: str, dimension: str, name: str, level: str, after: tuple, logs_per_page: int,
+                    search_query: str = None, use_regex: bool = False, start_ms: int = None, end_ms: int = None):
+    """Fetch a page of logs by class or service and level from the backend.
+
+    Returns the logs, the total (None for a search or time range until count_matching_logs
+    counts it) and the cursor of the next page (None on the last page).
+    """
+    start_time = time.time()
+    params = {'dimension': dimension, 'name': name, 'level': level, 'limit': logs_per_page}
+    if after is not None:
+        params['after'] = ','.join(str(part) for part in after)
+    if search_query and search_query.strip():
+        params['search'] = search_query
+        params['regex'] = 'true' if use_regex else 'false'
+    if start_ms is not None:
+        params['start_ms'] = start_ms
+    if end_ms is not None:
+        params['end_ms'] = end_ms
+    logger.debug(f"fetch_logs_page: job_id={job_id}, {dimension}={name}, level={level}, after={after}, logs_per_page={logs_per_page}, search_query={search_query}, use_regex={use_regex}, start_ms={start_ms}, end_ms={end_ms}")
+    page = backend_get(f"{job_path(job_id)}/logs", params=params, timeout=300)
+    next_cursor = tuple(page['next_cursor']) if page['next_cursor'] is not None else None
+    logger.debug(f"Fetched {len(page['logs'])} logs, total_logs={page['total']}, after={after}, query_time={time.time() - start_time:.2f}s")
+    return page['logs'], page['total'], next_cursor
+
 @st.cache_data(hash_funcs={str: lambda x: x})
-def get_logs_by_class_and_level(job_id: str, class_name: str, level: str, page: int, logs_per_page: int, search_query: str = None, use_regex: bool = False):
-    """Retrieve logs by class and level from SQLite, cached."""
+def get_logs_by_class_and_level(job_id: str, class_name: str, level: str, after: tuple, logs_per_page: int, search_query: str = None, use_regex: bool = False, start_ms: int = None, end_ms: int = None):
+    """Retrieve the page of logs by class and level following the after cursor, cached (see fetch_logs_page)."""
     try:
-        start_time = time.time()
-        conn = sqlite3.connect('data/logs.db', timeout=30)
-        cursor = conn.cursor()
-        offset = (page - 1) * logs_per_page
-        
-        # Log query parameters
-        logger.debug(f"get_logs_by_class_and_level: job_id={job_id}, class={class_name}, level={level}, page={page}, logs_per_page={logs_per_page}, search_query={search_query}, use_regex={use_regex}")
-        
-        # Base query
-        if level == "ALL":
-            query = """
-                SELECT timestamp, log_message, level, class
-                FROM logs
-                WHERE job_id = ? AND class = ?
-            """
-            params = [job_id, class_name]
-        else:
-            query = """
-                SELECT timestamp, log_message, level, class
-                FROM logs
-                WHERE job_id = ? AND class = ? AND level = ?
-            """
-            params = [job_id, class_name, level]
-        
-        # Add search query if provided
-        if search_query and search_query.strip():
-            if use_regex:
-                query += " AND log_message REGEXP ?"
-                params.append(search_query)
-            else:
-                query += " AND log_message LIKE ?"
-                params.append(f'%{search_query}%')
-        
-        # Add sorting and pagination
-        query += " ORDER BY timestamp LIMIT ? OFFSET ?"
-        params.extend([logs_per_page, offset])
-        
-        # Log the exact query
-        logger.debug(f"Executing SQL: {query} with params: {params}")
-        
-        # Execute data query
-        cursor.execute(query, params)
-        logs = [
-            {"timestamp": row[0], "log_message": row[1], "level": row[2], "class": row[3]}
-            for row in cursor.fetchall()
-        ]
-        
-        # Count query
-        if level == "ALL":
-            count_query = """
-                SELECT COUNT(*) as total
-                FROM logs
-                WHERE job_id = ? AND class = ?
-            """
-            count_params = [job_id, class_name]
-        else:
-            count_query = """
-                SELECT COUNT(*) as total
-                FROM logs
-                WHERE job_id = ? AND class = ? AND level = ?
-            """
-            count_params = [job_id, class_name, level]
-        
-        if search_query and search_query.strip():
-            if use_regex:
-                count_query += " AND log_message REGEXP ?"
-                count_params.append(search_query)
-            else:
-                count_query += " AND log_message LIKE ?"
-                count_params.append(f'%{search_query}%')
-        
-        # Execute count query
-        cursor.execute(count_query, count_params)
-        total_logs = cursor.fetchone()[0]
-        
-        conn.close()
-        query_time = time.time() - start_time
-        logger.debug(f"Fetched {len(logs)} logs, total_logs={total_logs}, page={page}, query_time={query_time:.2f}s")
-        return logs, total_logs
-    except sqlite3.OperationalError as e:
-        logger.error(f"Database error fetching logs by class and level: {str(e)}")
+        return fetch_logs_page(job_id, 'class', class_name, level, after, logs_per_page,
+                               search_query, use_regex, start_ms, end_ms)
+    except requests.RequestException as e:
+        logger.error(f"Error fetching logs by class and level: {str(e)}")
         st.session_state.notifications.append({
             'type': 'error',
-            'message': f"Database error: {str(e)}",
+            'message': f"Error fetching logs: {str(e)}",
             'timestamp': time.time()
         })
         raise
-    except Exception as e:
-        logger.error(f"Error fetching logs by class and level: {str(e)}")
+
+@st.cache_data(hash_funcs={str: lambda x: x})
+def get_logs_by_service_and_level(job_id: str, service_name: str, level: str, after: tuple, logs_per_page: int, search_query: str = None, use_regex: bool = False, start_ms: int = None, end_ms: int = None):
+    """Retrieve the page of logs by service and level following the after cursor, cached (see fetch_logs_page)."""
+    try:
+        return fetch_logs_page(job_id, 'service', service_name, level, after, logs_per_page,
+                               search_query, use_regex, start_ms, end_ms)
+    except requests.RequestException as e:
+        logger.error(f"Error fetching logs by service and level: {str(e)}")
         st.session_state.notifications.append({
             'type': 'error',
             'message': f"Error fetching logs: {str(e)}",
@@ -611,105 +685,110 @@ def get_logs_by_class_and_level(job_id: str, class_name: str, level: str, page:
         raise
 
 @st.cache_data(hash_funcs={str: lambda x: x})
-def get_logs_by_service_and_level(job_id: str, service_name: str, level: str, page: int, logs_per_page: int, search_query: str = None, use_regex: bool = False):
-    """Retrieve logs by service and level from SQLite, cached."""
+def count_matching_logs(job_id: str, dimension: str, name: str, level: str, search_query: str = None, use_regex: bool = False, start_ms: int = None, end_ms: int = None):
+    """Count the logs matching a Log Viewer search and time range by class or service and level, cached."""
     try:
         start_time = time.time()
-        conn = sqlite3.connect('data/logs.db', timeout=30)
-        cursor = conn.cursor()
-        offset = (page - 1) * logs_per_page
-        
-        # Log query parameters
-        logger.debug(f"get_logs_by_service_and_level: job_id={job_id}, service={service_name}, level={level}, page={page}, logs_per_page={logs_per_page}, search_query={search_query}, use_regex={use_regex}")
-        
-        # Base query
-        if level == "ALL":
-            query = """
-                SELECT timestamp, log_message, level, service
-                FROM logs
-                WHERE job_id = ? AND service = ?
-            """
-            params = [job_id, service_name]
-        else:
-            query = """
-                SELECT timestamp, log_message, level, service
-                FROM logs
-                WHERE job_id = ? AND service = ? AND level = ?
-            """
-            params = [job_id, service_name, level]
-        
-        # Add search query if provided
-        if search_query and search_query.strip():
-            if use_regex:
-                query += " AND log_message REGEXP ?"
-                params.append(search_query)
-            else:
-                query += " AND log_message LIKE ?"
-                params.append(f'%{search_query}%')
-        
-        # Add sorting and pagination
-        query += " ORDER BY timestamp LIMIT ? OFFSET ?"
-        params.extend([logs_per_page, offset])
-        
-        # Log the exact query
-        logger.debug(f"Executing SQL: {query} with params: {params}")
-        
-        # Execute data query
-        cursor.execute(query, params)
-        logs = [
-            {"timestamp": row[0], "log_message": row[1], "level": row[2], "service": row[3]}
-            for row in cursor.fetchall()
-        ]
-        
-        # Count query
-        if level == "ALL":
-            count_query = """
-                SELECT COUNT(*) as total
-                FROM logs
-                WHERE job_id = ? AND service = ?
-            """
-            count_params = [job_id, service_name]
-        else:
-            count_query = """
-                SELECT COUNT(*) as total
-                FROM logs
-                WHERE job_id = ? AND service = ? AND level = ?
-            """
-            count_params = [job_id, service_name, level]
-        
+        params = {'dimension': dimension, 'name': name, 'level': level}
         if search_query and search_query.strip():
-            if use_regex:
-                count_query += " AND log_message REGEXP ?"
-                count_params.append(search_query)
-            else:
-                count_query += " AND log_message LIKE ?"
-                count_params.append(f'%{search_query}%')
-        
-        # Execute count query
-        cursor.execute(count_query, count_params)
-        total_logs = cursor.fetchone()[0]
-        
-        conn.close()
-        query_time = time.time() - start_time
-        logger.debug(f"Fetched {len(logs)} logs, total_logs={total_logs}, page={page}, query_time={query_time:.2f}s")
-        return logs, total_logs
-    except sqlite3.OperationalError as e:
-        logger.error(f"Database error fetching logs by service and level: {str(e)}")
-        st.session_state.notifications.append({
-            'type': 'error',
-            'message': f"Database error: {str(e)}",
-            'timestamp': time.time()
-        })
-        raise
-    except Exception as e:
-        logger.error(f"Error fetching logs by service and level: {str(e)}")
+            params['search'] = search_query
+            params['regex'] = 'true' if use_regex else 'false'
+        if start_ms is not None:
+            params['start_ms'] = start_ms
+        if end_ms is not None:
+            params['end_ms'] = end_ms
+        total_logs = backend_get(f"{job_path(job_id)}/logs/count", params=params, timeout=600)['count']
+        logger.debug(f"Counted {total_logs} logs for {dimension}={name}, level={level}, "
+                     f"search_query={search_query}, query_time={time.time() - start_time:.2f}s")
+        return total_logs
+    except requests.RequestException as e:
+        logger.error(f"Error counting logs: {str(e)}")
         st.session_state.notifications.append({
             'type': 'error',
-            'message': f"Error fetching logs: {str(e)}",
+            'message': f"Error counting logs: {str(e)}",
             'timestamp': time.time()
         })
         raise
 
+def parse_time_filter(value: str):
+    """Parse a Log Viewer time bound ('YYYY-MM-DD HH:MM:SS[,fff]', UTC) into epoch milliseconds.
+
+    Returns None for a blank value; raises ValueError for one that is not recognised.
+    """
+    if not value or not value.strip():
+        return None
+    _, epoch_ms = TimestampParser().parse(value.strip())
+    if epoch_ms is None:
+        raise ValueError(f"Unrecognised time '{value}', expected YYYY-MM-DD HH:MM:SS")
+    return epoch_ms
+
+def public_backend_url() -> str:
+    """Return the backend address for links the browser opens (public_backend_url, else BACKEND_URL)."""
+    return (load_config()['app'].get('public_backend_url') or BACKEND_URL).rstrip('/')
+
+def log_export_url(job_id: str, dimension: str, name: str, level: str, search_query: str, use_regex: bool,
+                   start_ms: int, end_ms: int, export_format: str) -> str:
+    """Return the backend URL that streams every log matching the Log Viewer filters as a gzip file.
+
+    The link is opened by the browser, so it uses the app's public_backend_url setting:
+    BACKEND_URL is only reachable from the host the app runs on.
+    """
+    params = {'dimension': dimension, 'name': name, 'level': level, 'format': export_format}
+    if search_query and search_query.strip():
+        params['search'] = search_query
+        params['regex'] = 'true' if use_regex else 'false'
+    if start_ms is not None:
+        params['start_ms'] = start_ms
+    if end_ms is not None:
+        params['end_ms'] = end_ms
+    return f"{public_backend_url()}{job_path(job_id)}/logs/export?{urlencode(params)}"
+
+def display_log_export_links(job_id: str, dimension: str, name: str, level: str, search_query: str,
+                             use_regex: bool, start_ms: int, end_ms: int):
+    """Show download links for all logs matching the Log Viewer filters, streamed by the backend."""
+    ndjson_url = log_export_url(job_id, dimension, name, level, search_query, use_regex, start_ms, end_ms, 'ndjson')
+    csv_url = log_export_url(job_id, dimension, name, level, search_query, use_regex, start_ms, end_ms, 'csv')
+    st.markdown(f"**Download all matching logs:** [NDJSON (gzip)]({ndjson_url}) | [CSV (gzip)]({csv_url})")
+
+def set_log_viewer_total(total_logs, logs_per_page: int):
+    """Record the Log Viewer total (None if not counted) and the number of pages it allows."""
+    st.session_state.log_viewer_total_logs = total_logs
+    if total_logs is None:
+        # Only the pages reached so far, and the one after the last of them, are known
+        st.session_state.log_viewer_total_pages = len(st.session_state.log_viewer_cursors)
+    else:
+        st.session_state.log_viewer_total_pages = max(1, (total_logs + logs_per_page - 1) // logs_per_page)
+
+def log_viewer_page_summary() -> str:
+    """Return the Log Viewer's total and page line."""
+    total_logs = st.session_state.log_viewer_total_logs
+    if total_logs is None:
+        return (f"**Total Logs:** not counted | **Page:** {st.session_state.log_viewer_current_page} "
+                f"of {st.session_state.log_viewer_total_pages} reached so far")
+    return (f"**Total Logs:** {total_logs} | **Page:** {st.session_state.log_viewer_current_page} "
+            f"of {st.session_state.log_viewer_total_pages}")
+
+def fetch_log_viewer_page(fetch_logs, job_id: str, name: str, level: str, page: int, logs_per_page: int,
+                          search_query: str, use_regex: bool, start_ms: int = None, end_ms: int = None):
+    """Fetch a Log Viewer page by cursor, walking forward from the last page reached if needed.
+
+    Returns the page actually shown (the last one if page is past the end), its logs, the
+    total (or None) and whether a next page exists.
+    """
+    cursors = st.session_state.log_viewer_cursors
+    while len(cursors) < page:
+        _, _, next_cursor = fetch_logs(job_id, name, level, cursors[-1], logs_per_page, search_query, use_regex,
+                                       start_ms, end_ms)
+        if next_cursor is None:
+            break
+        cursors.append(next_cursor)
+    page = min(page, len(cursors))
+    logs, total_logs, next_cursor = fetch_logs(job_id, name, level, cursors[page - 1], logs_per_page,
+                                               search_query, use_regex, start_ms, end_ms)
+    if next_cursor is not None and len(cursors) == page:
+        cursors.append(next_cursor)
+    return page, logs, total_logs, next_cursor is not None
+
 @retry(stop_max_attempt_number=3, wait_exponential_multiplier=1000, wait_exponential_max=10000)
 def start_analysis(input_type, folder_path=None, customer_folder=None, start_datetime=None, end_datetime=None):
     """Start a new analysis job via backend API for local folder or S3 bucket."""
@@ -903,16 +982,15 @@ def view_analysis(visualizer):
                 steps = 4
                 step_increment = 1.0 / steps
                 
+                data_version = job_data_version(st.session_state.selected_job_id)
+
                 status_text.text("Fetching timeline data...")
-                timeline_data = get_analysis_data(job_id=st.session_state.selected_job_id, query_type='timeline')
-                # Sort timeline data by hour
-                if not timeline_data.empty:
-                    timeline_data['hour'] = pd.to_datetime(timeline_data['hour'])
-                    timeline_data = timeline_data.sort_values('hour')
+                timeline = get_timeline(st.session_state.selected_job_id, data_version)
                 progress_bar.progress(0.25)
                 
                 status_text.text("Fetching class-level counts...")
-                level_counts_by_class = get_analysis_data(job_id=st.session_state.selected_job_id, query_type='class')
+                level_counts_by_class = get_analysis_data(job_id=st.session_state.selected_job_id, query_type='class',
+                                                          data_version=data_version)
                 # Pivot class data: class as index, levels as columns
                 if not level_counts_by_class.empty:
                     class_pivot = level_counts_by_class.pivot(index='class', columns='level', values='count').fillna(0)
@@ -928,7 +1006,8 @@ def view_analysis(visualizer):
                 progress_bar.progress(0.50)
                 
                 status_text.text("Fetching service-level counts...")
-                level_counts_by_service = get_analysis_data(job_id=st.session_state.selected_job_id, query_type='service')
+                level_counts_by_service = get_analysis_data(job_id=st.session_state.selected_job_id, query_type='service',
+                                                            data_version=data_version)
                 # Pivot service data: service as index, levels as columns
                 if not level_counts_by_service.empty:
                     service_pivot = level_counts_by_service.pivot(index='service', columns='level', values='count').fillna(0)
@@ -947,7 +1026,7 @@ def view_analysis(visualizer):
                 service_totals = level_counts_by_service.groupby('service')['count'].sum().reset_index()
                 progress_bar.progress(1.0)
                 
-                if all(df.empty for df in [timeline_data, level_counts_by_class, level_counts_by_service, class_totals, service_totals]):
+                if all(df.empty for df in [timeline['data'], level_counts_by_class, level_counts_by_service, class_totals, service_totals]):
                     st.session_state.notifications.append({
                         'type': 'warning',
                         'message': "No analysis data available for this job",
@@ -959,7 +1038,7 @@ def view_analysis(visualizer):
                     return
                 
                 st.session_state.dashboard_data = {
-                    'timeline_data': timeline_data,
+                    'timeline': timeline,
                     'class_pivot': class_pivot,
                     'service_pivot': service_pivot,
                     'class_totals': class_totals,
@@ -987,36 +1066,61 @@ def view_analysis(visualizer):
         })
 
 def download_results(job_id):
-    """Download analysis results as Excel."""
+    """Start exporting analysis results to Excel on the backend.
+
+    The backend builds the workbook in the background, or reuses its cached export when the
+    job's data has not changed since; display_excel_export shows its progress and the link.
+    """
     try:
-        with st.spinner("Generating Excel file..."):
-            excel_file = export_to_excel(job_id)
-            with open(excel_file, 'rb') as f:
-                st.download_button(
-                    label="Download Excel",
-                    data=f,
-                    file_name=f"analysis_results_{job_id}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
-            st.session_state.notifications.append({
-                'type': 'success',
-                'message': "Excel file generated successfully",
-                'timestamp': time.time()
-            })
-    except FileNotFoundError:
-        logger.error(f"Excel file not found for job_id: {job_id}")
+        response = requests.post(f"{BACKEND_URL}{job_path(job_id)}/excel", timeout=30)
+        response.raise_for_status()
+        st.session_state.excel_export_job_id = job_id
+    except requests.RequestException as e:
+        logger.error(f"Error starting Excel export: {str(e)}")
         st.session_state.notifications.append({
             'type': 'error',
-            'message': "Excel file could not be generated",
+            'message': f"Error downloading results: {str(e)}",
             'timestamp': time.time()
         })
-    except Exception as e:
-        logger.error(f"Error downloading results: {str(e)}")
+
+def display_excel_export():
+    """Show the progress of the Excel export started by download_results, then its download link.
+
+    The status is checked once per script run instead of waiting for the export. The link
+    points the browser at the backend (see public_backend_url), which streams the file from
+    disk, so the workbook never passes through the app.
+    """
+    job_id = st.session_state.excel_export_job_id
+    if not job_id:
+        return
+    try:
+        export = backend_get(f"{job_path(job_id)}/excel")
+    except requests.RequestException as e:
+        logger.error(f"Error checking Excel export: {str(e)}")
         st.session_state.notifications.append({
             'type': 'error',
             'message': f"Error downloading results: {str(e)}",
             'timestamp': time.time()
         })
+        st.session_state.excel_export_job_id = None
+        return
+    if export['status'] == 'RUNNING':
+        total_rows = export.get('total_rows', 0)
+        st.progress(
+            min(export.get('rows_written', 0) / total_rows, 1.0) if total_rows else 0.0,
+            text=f"Generating Excel file... {export.get('rows_written', 0):,} / {total_rows:,} rows"
+        )
+        st.button("Refresh Export Status", key="refresh_excel_export")
+    elif export['status'] == 'COMPLETED':
+        st.markdown(f"[Download Excel]({public_backend_url()}{job_path(job_id)}/excel/download)")
+    else:
+        logger.error(f"Excel export of job {job_id} failed: {export.get('error')}")
+        st.session_state.notifications.append({
+            'type': 'error',
+            'message': f"Error downloading results: {export.get('error') or export['status']}",
+            'timestamp': time.time()
+        })
+        st.session_state.excel_export_job_id = None
 
 def process_csv_files(uploaded_files):
     """Process uploaded CSV files."""
@@ -1248,17 +1352,7 @@ def get_job_date_range(job_id: str, folder_path: str) -> tuple:
     try:
         if folder_path.startswith('s3://'):
             # S3 job: Fetch from job_metadata
-            conn = sqlite3.connect('data/logs.db', timeout=30)
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT type, value FROM job_metadata
-                WHERE job_id = ? AND type IN ('start_datetime', 'end_datetime')
-                """,
-                (job_id,)
-            )
-            metadata = {row[0]: row[1] for row in cursor.fetchall()}
-            conn.close()
+            metadata = backend_get(f"{job_path(job_id)}/metadata")
             
             start_datetime = metadata.get('start_datetime')
             end_datetime = metadata.get('end_datetime')
@@ -1348,6 +1442,7 @@ def update_log_viewer_job_id():
                 get_job_metadata.clear()
                 get_logs_by_class_and_level.clear()
                 get_logs_by_service_and_level.clear()
+                count_matching_logs.clear()
                 st.session_state.cached_job_id = selected_job
                 st.session_state.log_viewer_last_job_id = selected_job
                 logger.info(f"Cleared cache for new job_id: {selected_job}")
@@ -1356,17 +1451,22 @@ def update_log_viewer_job_id():
             st.session_state.log_viewer_total_pages = 1
             st.session_state.log_viewer_logs = []
             st.session_state.log_viewer_total_logs = 0
+            st.session_state.log_viewer_cursors = [None]
+            st.session_state.log_viewer_filters = None
     else:
         st.session_state.log_viewer_job_id = None
         get_job_metadata.clear()
         get_logs_by_class_and_level.clear()
         get_logs_by_service_and_level.clear()
+        count_matching_logs.clear()
         st.session_state.cached_job_id = None
         st.session_state.log_viewer_last_job_id = None
         st.session_state.log_viewer_current_page = 1
         st.session_state.log_viewer_total_pages = 1
         st.session_state.log_viewer_logs = []
         st.session_state.log_viewer_total_logs = 0
+        st.session_state.log_viewer_cursors = [None]
+        st.session_state.log_viewer_filters = None
 
 def main():
     """Main Streamlit application."""
@@ -1375,17 +1475,11 @@ def main():
     os.makedirs('data', exist_ok=True)
     initialize_session_state()
     
-    if not st.session_state.db_initialized:
-        try:
-            init_db()
-            st.session_state.db_initialized = True
-        except Exception as e:
-            logger.error(f"Failed to initialize database: {str(e)}")
-            st.error(f"Failed to initialize database: {str(e)}")
-            return
-    
     apply_custom_css()
-    check_backend_health()
+    # Job progress comes from the backend's progress stream, so once the backend answers it
+    # is only rechecked every BACKEND_HEALTH_TTL seconds (and on Check Backend Status)
+    refresh_backend_status()
+    progress_job_id = None
 
     st.markdown(
         """
@@ -1406,6 +1500,16 @@ def main():
         visualizer = Visualizer(config)
 
         job_status_df = get_job_status()
+        if (st.session_state.selected_job_id and not job_status_df.empty
+                and st.session_state.selected_job_id not in job_status_df['job_id'].values):
+            logger.warning(f"Selected job_id {st.session_state.selected_job_id} not found in backend")
+            st.session_state.notifications.append({
+                'type': 'warning',
+                'message': f"Selected job {st.session_state.selected_job_id} no longer exists. Please select a valid job.",
+                'timestamp': time.time()
+            })
+            st.session_state.selected_job_id = None
+            st.session_state.show_dashboard = False
         job_options = ['Select a job...']
         if not job_status_df.empty and 'job_id' in job_status_df.columns:
             job_options += job_status_df['job_id'].tolist()
@@ -1445,6 +1549,7 @@ def main():
                         <p><strong>Job ID:</strong> {st.session_state.selected_job_id}</p>
                         <p><strong>Folder Path:</strong> {job_info.get('folder_path', 'N/A')}</p>
                         <p><strong>Status:</strong> {job_info.get('status', 'N/A')}</p>
+                        <p><strong>Search Indexes:</strong> {'Building' if job_info.get('indexes_building', False) else 'Ready'}</p>
                         <p><strong>Files Processed:</strong> {job_info.get('files_processed', 0)} / {job_info.get('total_files', 0)}</p>
                         <p><strong>Start Time:</strong> {job_info.get('start_time', 'N/A')}</p>
                         <p><strong>Last Updated:</strong> {job_info.get('last_updated', 'N/A')}</p>
@@ -1454,15 +1559,23 @@ def main():
                     """,
                     unsafe_allow_html=True
                 )
+                if job_info.get('status') == 'RUNNING' or (job_info.get('status') == 'COMPLETED'
+                                                           and job_info.get('indexes_building', False)):
+                    # Filled from the progress stream once the rest of the page is drawn
+                    progress_job_id = job_info['job_id']
+                    progress_placeholder = st.empty()
 
             if st.session_state.show_dashboard and st.session_state.dashboard_data:
                 st.markdown('<div class="card">', unsafe_allow_html=True)
+                job_id = st.session_state.selected_job_id
+                data_version = job_data_version(job_id, job_status_df)
                 visualizer.display_dashboard(
-                    st.session_state.dashboard_data['timeline_data'],
+                    st.session_state.dashboard_data['timeline'],
                     st.session_state.dashboard_data['class_pivot'],
                     st.session_state.dashboard_data['service_pivot'],
                     st.session_state.dashboard_data['class_totals'],
-                    st.session_state.dashboard_data['service_totals']
+                    st.session_state.dashboard_data['service_totals'],
+                    fetch_timeline=lambda start_ms, end_ms: get_timeline(job_id, data_version, start_ms, end_ms)
                 )
                 st.markdown('</div>', unsafe_allow_html=True)
 
@@ -1553,6 +1666,8 @@ def main():
                 if st.button("Download Results", key="download_results"):
                     download_results(st.session_state.selected_job_id)
                 st.markdown('<span class="tooltiptext">Downloads analysis results as an Excel file</span></div>', unsafe_allow_html=True)
+                if st.session_state.excel_export_job_id == st.session_state.selected_job_id:
+                    display_excel_export()
                 
                 st.markdown('<div class="tooltip">', unsafe_allow_html=True)
                 if st.button("Delete Analysis", key="delete_analysis"):
@@ -1595,6 +1710,10 @@ def main():
 
         if st.session_state.log_viewer_job_id:
             config = load_config()
+            job_rows = job_status_df[job_status_df['job_id'] == st.session_state.log_viewer_job_id] if 'job_id' in job_status_df.columns else job_status_df
+            if not job_rows.empty and job_rows.iloc[0].get('indexes_building', False):
+                st.info("Search indexes for this job are still building. Logs can be browsed, "
+                        "but filtering and searching them is slower until the build finishes.")
             with st.spinner("Loading log viewer data..."):
                 classes, services = get_job_metadata(st.session_state.log_viewer_job_id)
                 class_options = ['None'] + classes if classes else ['None']
@@ -1629,8 +1748,33 @@ def main():
                     help="Search logs by message content"
                 )
                 use_regex = st.checkbox("Use Regex", key="regex_viewer", help="Enable regex for search queries")
+                col1, col2 = st.columns(2)
+                with col1:
+                    time_from = st.text_input(
+                        "From (UTC)",
+                        placeholder="YYYY-MM-DD HH:MM:SS",
+                        key="time_from_viewer",
+                        help="Only show logs at or after this time"
+                    )
+                with col2:
+                    time_to = st.text_input(
+                        "To (UTC)",
+                        placeholder="YYYY-MM-DD HH:MM:SS",
+                        key="time_to_viewer",
+                        help="Only show logs before this time"
+                    )
                 
-                logs_per_page = 100000
+                logs_per_page = int(config['app'].get('log_viewer_page_size', 1000))
+                # Page cursors and totals only hold for the filters they were read with
+                filters = (st.session_state.log_viewer_job_id, selected_class, selected_service,
+                           log_level, search_query, use_regex, time_from, time_to)
+                if st.session_state.log_viewer_filters != filters:
+                    st.session_state.log_viewer_filters = filters
+                    st.session_state.log_viewer_cursors = [None]
+                    st.session_state.log_viewer_current_page = 1
+                    st.session_state.log_viewer_total_pages = 1
+                    st.session_state.log_viewer_logs = []
+                    st.session_state.log_viewer_total_logs = 0
                 page = st.number_input(
                     "Page",
                     min_value=1,
@@ -1663,29 +1807,36 @@ def main():
                     else:
                         with st.spinner("Fetching logs..."):
                             try:
-                                st.session_state.log_viewer_current_page = page
-                                logs, total_logs = (get_logs_by_class_and_level if selected_class != 'None' else get_logs_by_service_and_level)(
+                                start_ms = parse_time_filter(time_from)
+                                end_ms = parse_time_filter(time_to)
+                                page, logs, total_logs, _ = fetch_log_viewer_page(
+                                    get_logs_by_class_and_level if selected_class != 'None' else get_logs_by_service_and_level,
                                     st.session_state.log_viewer_job_id,
                                     selected_class if selected_class != 'None' else selected_service,
                                     log_level,
                                     page,
                                     logs_per_page,
                                     search_query,
-                                    use_regex
+                                    use_regex,
+                                    start_ms,
+                                    end_ms
                                 )
+                                st.session_state.log_viewer_current_page = page
                                 st.session_state.log_viewer_logs = logs
-                                st.session_state.log_viewer_total_logs = total_logs
-                                st.session_state.log_viewer_total_pages = max(1, (total_logs + logs_per_page - 1) // logs_per_page)
+                                set_log_viewer_total(total_logs, logs_per_page)
                                 
                                 if logs:
                                     st.dataframe(pd.DataFrame(logs), use_container_width=True)
-                                    st.markdown(f"**Total Logs:** {total_logs} | **Page:** {page} of {st.session_state.log_viewer_total_pages}")
-                                    st.download_button(
-                                        label="Download Logs as JSON",
-                                        data=json.dumps(logs, indent=2),
-                                        file_name=f"{log_level}_logs_page_{page}.json",
-                                        mime="application/json",
-                                        key=f"download_viewer_{page}"
+                                    st.markdown(log_viewer_page_summary())
+                                    display_log_export_links(
+                                        st.session_state.log_viewer_job_id,
+                                        'class' if selected_class != 'None' else 'service',
+                                        selected_class if selected_class != 'None' else selected_service,
+                                        log_level,
+                                        search_query,
+                                        use_regex,
+                                        start_ms,
+                                        end_ms
                                     )
                                     st.session_state.notifications.append({
                                         'type': 'success',
@@ -1702,6 +1853,7 @@ def main():
                                     st.session_state.log_viewer_logs = []
                                     st.session_state.log_viewer_total_logs = 0
                                     st.session_state.log_viewer_total_pages = 1
+                                    st.session_state.log_viewer_cursors = [None]
                                     st.session_state.notifications.append({
                                         'type': 'warning',
                                         'message': f"No logs found. Cache cleared. Try selecting a different class or service.",
@@ -1719,14 +1871,41 @@ def main():
                 # Display current logs if available
                 if st.session_state.log_viewer_logs:
                     st.dataframe(pd.DataFrame(st.session_state.log_viewer_logs), use_container_width=True)
-                    st.markdown(f"**Total Logs:** {st.session_state.log_viewer_total_logs} | **Page:** {st.session_state.log_viewer_current_page} of {st.session_state.log_viewer_total_pages}")
-                    st.download_button(
-                        label="Download Logs as JSON",
-                        data=json.dumps(st.session_state.log_viewer_logs, indent=2),
-                        file_name=f"{log_level}_logs_page_{st.session_state.log_viewer_current_page}.json",
-                        mime="application/json",
-                        key=f"download_viewer_persistent_{st.session_state.log_viewer_current_page}"
-                    )
+                    st.markdown(log_viewer_page_summary())
+                    if st.session_state.log_viewer_total_logs is None and st.button("Count Matching Logs", key="count_logs"):
+                        with st.spinner("Counting logs..."):
+                            try:
+                                total_logs = count_matching_logs(
+                                    st.session_state.log_viewer_job_id,
+                                    'class' if selected_class != 'None' else 'service',
+                                    selected_class if selected_class != 'None' else selected_service,
+                                    log_level,
+                                    search_query,
+                                    use_regex,
+                                    parse_time_filter(time_from),
+                                    parse_time_filter(time_to)
+                                )
+                                set_log_viewer_total(total_logs, logs_per_page)
+                                st.experimental_rerun()
+                            except Exception as e:
+                                st.session_state.notifications.append({
+                                    'type': 'error',
+                                    'message': f"Failed to count logs: {str(e)}",
+                                    'timestamp': time.time()
+                                })
+                    try:
+                        display_log_export_links(
+                            st.session_state.log_viewer_job_id,
+                            'class' if selected_class != 'None' else 'service',
+                            selected_class if selected_class != 'None' else selected_service,
+                            log_level,
+                            search_query,
+                            use_regex,
+                            parse_time_filter(time_from),
+                            parse_time_filter(time_to)
+                        )
+                    except ValueError as e:
+                        st.error(str(e))
         else:
             st.info("Please select a job to view logs")
         
@@ -1840,5 +2019,8 @@ def main():
         display_notifications()
         st.markdown('</div>', unsafe_allow_html=True)  # Close tab-content
 
+    if progress_job_id:
+        stream_job_progress(progress_job_id, progress_placeholder)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,19 +1,40 @@
 import asyncio
-import gzip
+import hashlib
+import itertools
 import json
 import os
+import re
+import time
 import sqlite3
 import logging
 import pandas as pd
 import uuid
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from datetime import datetime, timedelta
-from typing import Dict, Optional, List, Generator
-from analyzer.data_manager import init_db
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Dict, Optional, List, Tuple
+from analyzer.data_manager import (ANALYSIS_QUERIES, CATALOG_DB, build_log_indexes, connect_catalog, connect_job_db,
+                                   defer_log_indexes, delete_job_db, init_db, init_job_db, job_db_path,
+                                   job_segments_dir, log_indexes_building, query_analysis_rows, query_timeline)
+from analyzer.dimensions import Dimensions
+from analyzer.message_codec import MessageCompressor, zstd_available
+from analyzer.excel_export import (delete_excel_exports, excel_export_path, export_summary_workbook,
+                                   prune_excel_exports)
+from analyzer.ingest_pipeline import IngestPipeline
+from analyzer.job_progress import JobProgress
+from analyzer.log_export import EXPORT_FORMATS, gzip_export
+from analyzer.log_store import (DIMENSION_COLUMNS, LogStore, ParquetLogStore, SQLiteLogStore, open_log_store,
+                                parquet_available)
+from analyzer.read_pool import ReadConnectionPool
+from analyzer.regex_search import compile_pattern
+from analyzer.s3_cache import S3ObjectCache
+from analyzer.s3_fetcher import S3Fetcher, get_s3_client
+from analyzer.summary_accumulator import SummaryAccumulator, load_file_checkpoints
 from yaml import safe_load
 from retrying import retry
-import boto3
 from botocore.exceptions import ClientError
 
 # Configure logging
@@ -28,7 +49,12 @@ app = FastAPI(title="Saviynt Log Analyzer Backend")
 
 # Global job state
 job_states: Dict[str, Dict] = {}
+# Live ingest rates of jobs started since the backend came up, streamed by /jobs/{job_id}/progress
+job_progress: Dict[str, JobProgress] = {}
+# Latest Excel export of each job: status, data version and rows written so far
+excel_exports: Dict[str, Dict] = {}
 db_initialized = False
+s3_cache: Optional[S3ObjectCache] = None
 
 class StartJobRequest(BaseModel):
     folder_path: Optional[str] = None
@@ -44,6 +70,7 @@ class JobResponse(BaseModel):
     total_files: int
     start_time: str
     last_updated: str
+    indexes_building: bool = False
 
 def load_config():
     """Load configuration from YAML file."""
@@ -59,87 +86,37 @@ def load_config():
 
 config = load_config()
 
-def update_summary_tables(conn: sqlite3.Connection, job_id: str, batch: list):
-    """Update summary tables with batched log entries."""
-    try:
-        cursor = conn.cursor()
-        class_level_batch = {}
-        service_level_batch = {}
-        timeline_batch = {}
-        class_service_batch = {}
-        invalid_timestamp_count = 0
-        
-        for log_entry in batch:
-            level = log_entry.get('level', 'UNKNOWN')
-            class_name = log_entry.get('class', 'Unknown')
-            service = log_entry.get('service', class_name)
-            timestamp = log_entry.get('logtime', '')
-            
-            if class_name and level:
-                key = (job_id, class_name, level)
-                class_level_batch[key] = class_level_batch.get(key, 0) + 1
-            
-            if service and level:
-                key = (job_id, service, level)
-                service_level_batch[key] = service_level_batch.get(key, 0) + 1
-            
-            if timestamp and level:
-                try:
-                    # Try parsing with milliseconds
-                    try:
-                        dt = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S,%f')
-                    except ValueError:
-                        # Try parsing without milliseconds
-                        try:
-                            dt = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
-                        except ValueError:
-                            # Try parsing Apache-like format with timezone
-                            dt = datetime.strptime(timestamp, '%d/%b/%Y:%H:%M:%S %z')
-                    hour = dt.strftime('%Y-%m-%d %H:00:00')
-                    key = (job_id, hour, level)
-                    timeline_batch[key] = timeline_batch.get(key, 0) + 1
-                except ValueError:
-                    invalid_timestamp_count += 1
-            
-            if class_name and service:
-                key = (job_id, class_name, service)
-                class_service_batch[key] = class_service_batch.get(key, 0) + 1
-        
-        for (job_id, class_name, level), count in class_level_batch.items():
-            cursor.execute('''
-                INSERT INTO class_level_counts (job_id, class, level, count)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(job_id, class, level) DO UPDATE SET count = count + ?
-            ''', (job_id, class_name, level, count, count))
-        
-        for (job_id, service, level), count in service_level_batch.items():
-            cursor.execute('''
-                INSERT INTO service_level_counts (job_id, service, level, count)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(job_id, service, level) DO UPDATE SET count = count + ?
-            ''', (job_id, service, level, count, count))
-        
-        for (job_id, hour, level), count in timeline_batch.items():
-            cursor.execute('''
-                INSERT INTO timeline_counts (job_id, hour, level, count)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(job_id, hour, level) DO UPDATE SET count = count + ?
-            ''', (job_id, hour, level, count, count))
-        
-        for (job_id, class_name, service), count in class_service_batch.items():
-            cursor.execute('''
-                INSERT INTO class_service_counts (job_id, class, service, count)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(job_id, class, service) DO UPDATE SET count = count + ?
-            ''', (job_id, class_name, service, count, count))
-        
-        conn.commit()
-        if invalid_timestamp_count > 0:
-            logger.debug(f"Skipped {invalid_timestamp_count} log entries with invalid timestamps in job_id: {job_id}")
-    except sqlite3.OperationalError as e:
-        logger.error(f"Error updating summary tables for job_id {job_id}: {str(e)}")
-    except Exception as e:
-        logger.error(f"Unexpected error updating summary tables for job_id {job_id}: {str(e)}")
+# Read-only connections shared by the read endpoints (jobs, metadata, summaries and logs)
+read_pool = ReadConnectionPool(
+    connections_per_database=int(config['app'].get('read_pool_connections', 4)),
+    max_databases=int(config['app'].get('read_pool_databases', 16)),
+    busy_timeout_ms=int(config['app'].get('read_busy_timeout_ms', 5000)),
+    cached_statements=int(config['app'].get('read_cached_statements', 256)),
+    mmap_mb=int(config['app'].get('read_mmap_mb', 0))
+)
+
+def get_job_progress(job_id: str) -> JobProgress:
+    """Return the job's progress tracker, creating it on first use (on the event loop)."""
+    progress = job_progress.get(job_id)
+    if progress is None:
+        progress = job_progress[job_id] = JobProgress(
+            window_seconds=float(config['app'].get('progress_rate_window_seconds', 10))
+        )
+    return progress
+
+def notify_progress(job_id: str):
+    """Wake the job's progress subscribers after its counters or status changed."""
+    progress = job_progress.get(job_id)
+    if progress is not None:
+        progress.notify()
+
+def get_s3_cache() -> Optional[S3ObjectCache]:
+    """Return the shared S3 object cache, or None when s3_cache_max_mb is 0."""
+    global s3_cache
+    max_mb = int(config['app'].get('s3_cache_max_mb', 0))
+    if s3_cache is None and max_mb > 0:
+        s3_cache = S3ObjectCache(config['app'].get('s3_cache_dir', 'data/s3_cache'), max_mb * 1024 * 1024)
+    return s3_cache
 
 def generate_s3_paths(customer_folder: str, start_datetime: str, end_datetime: str) -> List[str]:
     """Generate S3 subfolder paths for the given date-time range."""
@@ -171,7 +148,7 @@ def generate_s3_paths(customer_folder: str, start_datetime: str, end_datetime: s
 def validate_customer_folder(customer_folder: str) -> bool:
     """Validate if the customer folder exists in the S3 bucket."""
     try:
-        s3_client = boto3.client('s3')
+        s3_client = get_s3_client(int(config['app'].get('s3_max_pool_connections', 16)))
         bucket_name = 'k8-customer-logs'
         response = s3_client.list_objects_v2(
             Bucket=bucket_name,
@@ -200,10 +177,10 @@ def validate_customer_folder(customer_folder: str) -> bool:
         raise HTTPException(status_code=500, detail=f"Error validating customer folder: {str(e)}")
 
 @retry(stop_max_attempt_number=3, wait_exponential_multiplier=1000, wait_exponential_max=10000)
-def list_s3_files(bucket_name: str, prefix: str) -> List[str]:
-    """List .gz files in the specified S3 prefix."""
+def list_s3_files(bucket_name: str, prefix: str) -> List[Dict]:
+    """List .gz files in the specified S3 prefix as {'key', 'size', 'etag'} entries."""
     try:
-        s3_client = boto3.client('s3')
+        s3_client = get_s3_client(int(config['app'].get('s3_max_pool_connections', 16)))
         paginator = s3_client.get_paginator('list_objects_v2')
         files = []
         
@@ -211,7 +188,7 @@ def list_s3_files(bucket_name: str, prefix: str) -> List[str]:
             if 'Contents' in page:
                 for obj in page['Contents']:
                     if obj['Key'].endswith('.gz'):
-                        files.append(obj['Key'])
+                        files.append({'key': obj['Key'], 'size': obj.get('Size'), 'etag': obj.get('ETag')})
         
         logger.info(f"Found {len(files)} .gz files in s3://{bucket_name}/{prefix}")
         return files
@@ -231,243 +208,300 @@ def list_s3_files(bucket_name: str, prefix: str) -> List[str]:
         raise HTTPException(status_code=500, detail=f"Error listing S3 files: {str(e)}")
 
 @retry(stop_max_attempt_number=3, wait_exponential_multiplier=1000, wait_exponential_max=10000)
-def stream_s3_log_file(bucket_name: str, key: str) -> Generator[str, None, None]:
-    """Stream and decompress a .gz log file from S3, yielding log lines."""
+def open_s3_log_file(bucket_name: str, key: str, fetcher: S3Fetcher):
+    """Download a .gz log file from S3 through the job's fetcher, or return None if it no longer exists."""
     try:
-        s3_client = boto3.client('s3')
-        response = s3_client.get_object(Bucket=bucket_name, Key=key)
-        gzipped_content = response['Body']
-        
-        with gzip.GzipFile(fileobj=gzipped_content, mode='rb') as gz:
-            for line in gz:
-                try:
-                    yield line.decode('utf-8')
-                except UnicodeDecodeError:
-                    logger.warning(f"Skipping line in s3://{bucket_name}/{key} due to decode error")
-                    continue
-        logger.info(f"Successfully streamed s3://{bucket_name}/{key}")
+        source = fetcher.fetch(bucket_name, key)
+        logger.info(f"Fetched s3://{bucket_name}/{key}")
+        return source
     except ClientError as e:
         error_code = e.response['Error']['Code']
         if error_code == 'NoSuchKey':
             logger.warning(f"S3 file not found: s3://{bucket_name}/{key}")
-            return
+            return None
         elif error_code == 'AccessDenied':
             logger.error(f"Access denied to s3://{bucket_name}/{key}")
             raise HTTPException(status_code=403, detail=f"Access denied to S3 file: {key}")
         else:
-            logger.error(f"S3 error streaming file s3://{bucket_name}/{key}: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"S3 error streaming file: {str(e)}")
-    except gzip.BadGzipFile:
-        logger.error(f"Corrupted .gz file: s3://{bucket_name}/{key}")
-        return
-    except Exception as e:
-        logger.error(f"Error streaming S3 file s3://{bucket_name}/{key}: {str(e)}")
-        return
+            logger.error(f"S3 error fetching file s3://{bucket_name}/{key}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"S3 error fetching file: {str(e)}")
 
-@retry(stop_max_attempt_number=3, wait_exponential_multiplier=1000, wait_exponential_max=10000)
-async def process_log_file(file_path: str, job_id: str, conn: sqlite3.Connection, s3_lines: Optional[Generator[str, None, None]] = None):
-    """Process a single .gz log file or S3 stream and insert logs into SQLite with retries."""
-    try:
-        valid_levels = set(config['app']['log_levels'])
-        batch_size = 500
-        log_batch = []
-        log_entries = []
-        classes = set()
-        services = set()
-        missing_class_count = 0
-        invalid_timestamp_count = 0
-        
-        if s3_lines:
-            lines = s3_lines
-            folder = os.path.dirname(file_path)
-            file_name = os.path.basename(file_path)
-        else:
-            lines = gzip.open(file_path, 'rt', encoding='utf-8')
-            folder = os.path.dirname(file_path)
-            file_name = os.path.basename(file_path)
-        
-        for line_idx, line in enumerate(lines):
-            try:
-                log_entry = json.loads(line.strip())
-                timestamp = log_entry.get('logtime', '')
-                level = log_entry.get('level', 'UNKNOWN')
-                if level not in valid_levels:
-                    level = 'UNKNOWN'
-                class_field = log_entry.get('class', None)
-                log_message = log_entry.get('log', '')
-                
-                # Extract class and service
-                if class_field and '.' in class_field:
-                    service, class_name = class_field.split('.', 1)
-                else:
-                    class_name = 'Unknown'
-                    service = 'Unknown'
-                    missing_class_count += 1
-                
-                # Validate timestamp
-                if timestamp:
-                    try:
-                        try:
-                            datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S,%f')
-                        except ValueError:
-                            try:
-                                datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
-                            except ValueError:
-                                datetime.strptime(timestamp, '%d/%b/%Y:%H:%M:%S %z')
-                    except ValueError:
-                        invalid_timestamp_count += 1
-                
-                log_batch.append((job_id, timestamp, level, class_name, service, log_message, folder, file_name, line_idx))
-                log_entries.append({
-                    'logtime': timestamp,
-                    'level': level,
-                    'class': class_name,
-                    'service': service,
-                    'log': log_message
-                })
-                classes.add(class_name)
-                services.add(service)
-                
-                if len(log_batch) >= batch_size:
-                    conn.executemany('''
-                        INSERT INTO logs (job_id, timestamp, level, class, service, log_message, folder, file_name, line_idx)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', log_batch)
-                    update_summary_tables(conn, job_id, log_entries)
-                    
-                    for class_name in classes:
-                        conn.execute('''
-                            INSERT OR IGNORE INTO job_metadata (job_id, type, value)
-                            VALUES (?, ?, ?)
-                        ''', (job_id, 'class', class_name))
-                    for service in services:
-                        conn.execute('''
-                            INSERT OR IGNORE INTO job_metadata (job_id, type, value)
-                            VALUES (?, ?, ?)
-                        ''', (job_id, 'service', service))
-                    
-                    conn.commit()
-                    log_batch = []
-                    log_entries = []
-                    classes.clear()
-                    services.clear()
-                    await asyncio.sleep(0)
-            except json.JSONDecodeError:
-                logger.warning(f"Invalid JSON in {file_path} at line {line_idx}")
-            except Exception as e:
-                logger.error(f"Error processing line {line_idx} in {file_path}: {str(e)}")
-        
-        if log_batch:
-            conn.executemany('''
-                INSERT INTO logs (job_id, timestamp, level, class, service, log_message, folder, file_name, line_idx)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', log_batch)
-            update_summary_tables(conn, job_id, log_entries)
-            
-            for class_name in classes:
-                conn.execute('''
-                    INSERT OR IGNORE INTO job_metadata (job_id, type, value)
-                    VALUES (?, ?, ?)
-                ''', (job_id, 'class', class_name))
-            for service in services:
-                conn.execute('''
-                    INSERT OR IGNORE INTO job_metadata (job_id, type, value)
-                    VALUES (?, ?, ?)
-                ''', (job_id, 'service', service))
-            
-            conn.commit()
-        
-        # Log the processed file in the database
+def open_log_source(file_path: str, fetcher: Optional[S3Fetcher] = None):
+    """Return a local .gz file's path for the parse workers to open, or download an s3:// URI
+    through fetcher as a compressed binary stream."""
+    if file_path.startswith('s3://'):
+        bucket_name, s3_key = file_path[len('s3://'):].split('/', 1)
+        return open_s3_log_file(bucket_name, s3_key, fetcher)
+    return file_path
+
+def find_local_log_files(folder_path: str) -> List[str]:
+    """Recursively find .gz files under a local folder."""
+    log_files = []
+    for root, _, files in os.walk(folder_path):
+        for file in files:
+            if file.endswith('.gz'):
+                full_path = os.path.join(root, file)
+                log_files.append(full_path)
+                logger.debug(f"Found log file: {full_path}")
+    return log_files
+
+def list_s3_log_files(bucket_name: str, s3_paths: List[str], workers: int = 16) -> Tuple[List[Dict], List[str]]:
+    """List .gz files under all hourly S3 prefixes in parallel, skipping prefixes that fail.
+
+    Returns manifest entries {'file_path', 'size', 'etag'} in prefix order, with file_path
+    as an s3:// URI, and the prefixes that failed to list.
+    """
+    def list_prefix(s3_path: str) -> Optional[List[Dict]]:
+        try:
+            return list_s3_files(bucket_name, s3_path)
+        except Exception as e:
+            logger.warning(f"Skipping S3 path {s3_path} due to error: {str(e)}")
+            return None
+    
+    manifest = []
+    failed_paths = []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="s3-list") as executor:
+        for s3_path, files in zip(s3_paths, executor.map(list_prefix, s3_paths)):
+            if files is None:
+                failed_paths.append(s3_path)
+                continue
+            manifest.extend({'file_path': f"s3://{bucket_name}/{f['key']}", 'size': f['size'], 'etag': f['etag']}
+                            for f in files)
+    return manifest, failed_paths
+
+def load_job_manifest(conn: sqlite3.Connection, job_id: str) -> Optional[List[Dict]]:
+    """Return the job's stored S3 file manifest in listing order, or None if it was never saved."""
+    cursor = conn.execute('''
+        SELECT file_path, size, etag FROM job_manifest WHERE job_id = ? ORDER BY position
+    ''', (job_id,))
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+    return [{'file_path': file_path, 'size': size, 'etag': etag} for file_path, size, etag in rows]
+
+def save_job_manifest(conn: sqlite3.Connection, job_id: str, manifest: List[Dict]):
+    """Persist a job's S3 file manifest so resumed runs skip validation and listing."""
+    conn.execute('DELETE FROM job_manifest WHERE job_id = ?', (job_id,))
+    conn.executemany('''
+        INSERT INTO job_manifest (job_id, position, file_path, size, etag)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(job_id, position, entry['file_path'], entry['size'], entry['etag'])
+          for position, entry in enumerate(manifest)])
+    conn.commit()
+    logger.info(f"Saved manifest of {len(manifest)} S3 files for job_id: {job_id}")
+
+def update_job_state(job_id: str, values: Dict):
+    """Apply values to a job's state and wake its progress subscribers.
+
+    Runs on the event loop, which owns job_states; threads schedule it with
+    loop.call_soon_threadsafe. A job deleted meanwhile is left alone.
+    """
+    if job_id in job_states:
+        job_states[job_id].update(values)
+        notify_progress(job_id)
+
+def mark_file_processed(conn: sqlite3.Connection, catalog: sqlite3.Connection, job_id: str,
+                        file_path: str, accumulator: SummaryAccumulator, files_processed: int,
+                        loop: asyncio.AbstractEventLoop):
+    """Advance the job's progress counters to files_processed for a fully ingested file.
+
+    Runs in the ingest writer thread. The processed_file marker is queued on the accumulator
+    and written to the job database together with the file's summary counts, which are
+    flushed here once a row-count or time threshold is hit. The progress counters are
+    updated in the catalog, and in job_states on the event loop.
+    """
+    accumulator.mark_file_processed(file_path)
+    values = {
+        'files_processed': files_processed,
+        'current_file': os.path.basename(file_path),
+        'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    
+    if accumulator.should_flush():
+        accumulator.flush(conn)
+    else:
+        conn.commit()
+    catalog.execute('''
+        UPDATE jobs SET files_processed = ?, current_file = ?, last_updated = ?
+        WHERE job_id = ?
+    ''', (values['files_processed'], values['current_file'], values['last_updated'], job_id))
+    catalog.commit()
+    loop.call_soon_threadsafe(update_job_state, job_id, values)
+
+def get_job_source(job_id: str, folder_path: str) -> Dict[str, Optional[str]]:
+    """Rebuild process_job's source arguments for an existing job from its database."""
+    if not folder_path.startswith('s3://'):
+        return {'folder_path': folder_path, 'customer_folder': None, 'start_datetime': None, 'end_datetime': None}
+    conn = connect_job_db(job_id, timeout=60)
+    cursor = conn.execute('''
+        SELECT type, value FROM job_metadata WHERE job_id = ? AND type IN ('start_datetime', 'end_datetime')
+    ''', (job_id,))
+    metadata = dict(cursor.fetchall())
+    conn.close()
+    if 'start_datetime' not in metadata or 'end_datetime' not in metadata:
+        raise HTTPException(status_code=400, detail="S3 job is missing its start_datetime/end_datetime")
+    return {
+        'folder_path': None,
+        'customer_folder': folder_path.split('/')[-1],
+        'start_datetime': metadata['start_datetime'],
+        'end_datetime': metadata['end_datetime']
+    }
+
+def create_log_store(conn: sqlite3.Connection, job_id: str, dimensions: Dimensions) -> LogStore:
+    """Return the log store a job writes to, recording log_storage in job_metadata on its first run.
+
+    A resumed job keeps the store it started with, and a job that already has logs rows
+    from before log_storage existed stays on SQLite.
+    """
+    app_config = config['app']
+    row = conn.execute('''
+        SELECT value FROM job_metadata WHERE job_id = ? AND type = 'log_storage'
+    ''', (job_id,)).fetchone()
+    if row is not None:
+        storage = row[0]
+    else:
+        storage = app_config.get('log_storage', 'sqlite')
+        if storage == 'parquet' and not parquet_available():
+            logger.warning("log_storage is parquet but the pyarrow package is not installed; storing logs in SQLite")
+            storage = 'sqlite'
+        if conn.execute('SELECT 1 FROM logs LIMIT 1').fetchone() is not None:
+            storage = 'sqlite'
         conn.execute('''
-            INSERT INTO job_metadata (job_id, type, value)
-            VALUES (?, ?, ?)
-        ''', (job_id, 'processed_file', file_path))
+            INSERT OR IGNORE INTO job_metadata (job_id, type, value) VALUES (?, ?, ?)
+        ''', (job_id, 'log_storage', storage))
         conn.commit()
-        
-        logger.info(f"Processed log file: {file_path} for job_id: {job_id}, "
-                   f"missing or invalid class formats: {missing_class_count}, "
-                   f"invalid timestamps: {invalid_timestamp_count}")
-    except Exception as e:
-        logger.error(f"Error processing log file {file_path}: {str(e)}")
-        raise
+    
+    if storage == 'parquet':
+        return ParquetLogStore(
+            job_id, job_segments_dir(job_id),
+            row_group_rows=int(app_config.get('parquet_row_group_rows', 65536))
+        )
+    compressor = None
+    if app_config.get('message_compression', 'none') == 'zstd':
+        if zstd_available():
+            compressor = MessageCompressor(
+                conn, dimensions.job_key(job_id),
+                level=int(app_config.get('zstd_level', 3)),
+                dictionary_size=int(app_config.get('zstd_dictionary_kb', 110)) * 1024,
+                sample_rows=int(app_config.get('zstd_sample_rows', 20000))
+            )
+        else:
+            logger.warning("message_compression is zstd but the zstandard package is not installed; "
+                           "storing messages uncompressed")
+    return SQLiteLogStore(job_id, compressor)
+
+def build_job_indexes(job_id: str, loop: asyncio.AbstractEventLoop):
+    """Build the logs and search indexes a bulk-loaded job deferred, in an executor thread.
+
+    Runs after the job is marked COMPLETED; a failed or interrupted build keeps the job's
+    log_indexes marker and is retried on the next backend startup.
+    """
+    conn = None
+    try:
+        conn = connect_job_db(job_id, timeout=60)
+        build_search_index = None
+        if config['app'].get('search_index', True):
+            build_search_index = SQLiteLogStore(job_id).build_search_index
+        build_log_indexes(conn, job_id, build_search_index)
+        loop.call_soon_threadsafe(update_job_state, job_id, {'indexes_building': False})
+        logger.info(f"Indexes built for job: {job_id}")
+    except sqlite3.Error as e:
+        logger.error(f"Error building indexes for job {job_id}: {str(e)}")
     finally:
-        if not s3_lines and lines:
-            lines.close()
+        if conn is not None:
+            conn.close()
 
 async def process_job(job_id: str, folder_path: Optional[str] = None, 
                     customer_folder: Optional[str] = None, 
                     start_datetime: Optional[str] = None, 
                     end_datetime: Optional[str] = None):
     """Process log files in the specified folder or S3 bucket, resuming from last processed file."""
+    accumulator = None
+    fetcher = None
+    conn = None
+    catalog = None
+    loop = asyncio.get_running_loop()
+    progress = get_job_progress(job_id)
     try:
-        conn = sqlite3.connect('data/logs.db', timeout=60)
+        # The ingest pipeline's writer thread uses both connections while the job runs: logs and
+        # summaries go to the job's own database, progress counters to the catalog
+        catalog = connect_catalog(timeout=60, check_same_thread=False)
+        init_job_db(job_id)
+        conn = connect_job_db(job_id, timeout=60, check_same_thread=False)
         conn.execute('PRAGMA journal_mode=WAL')
         
         if folder_path:  # Local folder processing
             if not os.path.isdir(folder_path):
                 logger.error(f"Invalid folder path: {folder_path}")
-                conn.execute('''
+                catalog.execute('''
                     UPDATE jobs SET status = ?, last_updated = ?, total_files = ?, files_processed = ?
                     WHERE job_id = ?
                 ''', ('ERROR', datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 0, 0, job_id))
-                conn.commit()
+                catalog.commit()
                 job_states[job_id]['status'] = 'ERROR'
                 job_states[job_id]['files_processed'] = 0
                 job_states[job_id]['total_files'] = 0
+                progress.notify()
                 conn.close()
+                catalog.close()
                 raise HTTPException(status_code=400, detail=f"Invalid folder path: {folder_path}")
             
             # Recursively find .gz files
-            log_files = []
-            for root, _, files in os.walk(folder_path):
-                for file in files:
-                    if file.endswith('.gz'):
-                        full_path = os.path.join(root, file)
-                        log_files.append(full_path)
-                        logger.debug(f"Found log file: {full_path}")
+            log_files = await loop.run_in_executor(None, find_local_log_files, folder_path)
             
             total_files = len(log_files)
             folder_path_display = folder_path
         
         else:  # S3 bucket processing
             bucket_name = 'k8-customer-logs'
-            if not validate_customer_folder(customer_folder):
-                logger.error(f"Customer folder not found: {customer_folder}")
-                conn.execute('''
-                    UPDATE jobs SET status = ?, last_updated = ?, total_files = ?, files_processed = ?
-                    WHERE job_id = ?
-                ''', ('ERROR', datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 0, 0, job_id))
-                conn.commit()
-                job_states[job_id]['status'] = 'ERROR'
-                job_states[job_id]['files_processed'] = 0
-                job_states[job_id]['total_files'] = 0
-                conn.close()
-                raise HTTPException(status_code=400, detail=f"Customer folder not found: {customer_folder}")
-            
-            s3_paths = generate_s3_paths(customer_folder, start_datetime, end_datetime)
-            log_files = []
-            for s3_path in s3_paths:
-                try:
-                    files = list_s3_files(bucket_name, s3_path)
-                    log_files.extend([f"s3://{bucket_name}/{f}" for f in files])
-                except Exception as e:
-                    logger.warning(f"Skipping S3 path {s3_path} due to error: {str(e)}")
-                    continue
+            manifest = load_job_manifest(conn, job_id)
+            if manifest is None:
+                if not await loop.run_in_executor(None, validate_customer_folder, customer_folder):
+                    logger.error(f"Customer folder not found: {customer_folder}")
+                    catalog.execute('''
+                        UPDATE jobs SET status = ?, last_updated = ?, total_files = ?, files_processed = ?
+                        WHERE job_id = ?
+                    ''', ('ERROR', datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 0, 0, job_id))
+                    catalog.commit()
+                    job_states[job_id]['status'] = 'ERROR'
+                    job_states[job_id]['files_processed'] = 0
+                    job_states[job_id]['total_files'] = 0
+                    progress.notify()
+                    conn.close()
+                    catalog.close()
+                    raise HTTPException(status_code=400, detail=f"Customer folder not found: {customer_folder}")
+                
+                s3_paths = generate_s3_paths(customer_folder, start_datetime, end_datetime)
+                manifest, failed_paths = await loop.run_in_executor(
+                    None, list_s3_log_files, bucket_name, s3_paths, int(config['app'].get('s3_list_workers', 16))
+                )
+                if failed_paths:
+                    # A stored manifest is never listed again, so a partial one would drop those hours for good
+                    logger.warning(f"Not saving manifest for job_id: {job_id}; {len(failed_paths)} S3 paths "
+                                   f"failed to list and are listed again when the job is resumed")
+                else:
+                    save_job_manifest(conn, job_id, manifest)
+            else:
+                logger.info(f"Job {job_id} using stored manifest of {len(manifest)} S3 files")
+            log_files = [entry['file_path'] for entry in manifest]
+            etags = {entry['file_path']: entry['etag'] for entry in manifest}
             
             total_files = len(log_files)
             folder_path_display = f"s3://{bucket_name}/{customer_folder}"
         
         if total_files == 0:
             logger.warning(f"No .gz files found in {'folder: ' + folder_path if folder_path else 'S3 bucket: ' + folder_path_display}")
-            conn.execute('''
+            catalog.execute('''
                 UPDATE jobs SET status = ?, last_updated = ?, total_files = ?, files_processed = ?
                 WHERE job_id = ?
             ''', ('COMPLETED', datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 0, 0, job_id))
-            conn.commit()
+            catalog.commit()
             job_states[job_id]['status'] = 'COMPLETED'
             job_states[job_id]['files_processed'] = 0
             job_states[job_id]['total_files'] = 0
+            progress.notify()
             conn.close()
+            catalog.close()
             return
         
         # Get already processed files
@@ -480,69 +514,124 @@ async def process_job(job_id: str, folder_path: Optional[str] = None,
         logger.info(f"Job {job_id} resuming with {files_processed}/{total_files} files already processed")
         
         # Update job metadata
-        conn.execute('''
+        catalog.execute('''
             UPDATE jobs SET status = ?, total_files = ?, files_processed = ?, last_updated = ?
             WHERE job_id = ?
         ''', ('RUNNING', total_files, files_processed, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), job_id))
-        conn.commit()
+        catalog.commit()
         job_states[job_id]['total_files'] = total_files
         job_states[job_id]['files_processed'] = files_processed
         job_states[job_id]['folder_path'] = folder_path_display
+        progress.start(files_processed)
         
-        # Process remaining files
-        for idx, file_path in enumerate(log_files):
-            if file_path in processed_files:
-                logger.debug(f"Skipping already processed file: {file_path}")
-                continue
-            
-            if job_states[job_id]['status'] == 'PAUSED':
-                logger.info(f"Job {job_id} paused at file {file_path}")
-                conn.execute('''
-                    UPDATE jobs SET status = ?, last_updated = ?, files_processed = ?
-                    WHERE job_id = ?
-                ''', ('PAUSED', datetime.now().strftime('%Y-%m-%d %H:%M:%S'), job_states[job_id]['files_processed'], job_id))
-                conn.commit()
-                conn.close()
-                return
-            
-            logger.info(f"Processing file {file_path} for job {job_id}")
-            if file_path.startswith('s3://'):
-                s3_key = file_path.replace(f"s3://{bucket_name}/", "")
-                s3_lines = stream_s3_log_file(bucket_name, s3_key)
-                await process_log_file(file_path, job_id, conn, s3_lines)
-            else:
-                await process_log_file(file_path, job_id, conn)
-            
-            job_states[job_id]['files_processed'] += 1
-            job_states[job_id]['last_updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            conn.execute('''
-                UPDATE jobs SET files_processed = ?, current_file = ?, last_updated = ?
+        app_config = config['app']
+        dimensions = Dimensions(conn)
+        log_store = create_log_store(conn, job_id, dimensions)
+        accumulator = SummaryAccumulator(
+            job_id,
+            dimensions,
+            flush_rows=int(app_config.get('summary_flush_rows', 200000)),
+            flush_seconds=float(app_config.get('summary_flush_seconds', 30)),
+            log_store=log_store
+        )
+        if app_config.get('bulk_load', False) and isinstance(log_store, SQLiteLogStore):
+            # Logs indexes are built once the job completes instead of updated row by row
+            defer_log_indexes(conn, job_id)
+        job_states[job_id]['indexes_building'] = log_indexes_building(conn, job_id)
+        accumulator.load_seen_metadata(conn)
+        log_store.discard_uncommitted(conn)
+        checkpoints = load_file_checkpoints(conn, job_id)
+        
+        # Process remaining files, continuing partly ingested ones from their checkpoints
+        remaining_files = [f for f in log_files if f not in processed_files]
+        prefetch_files = int(app_config.get('ingest_prefetch_files', 2))
+        if not folder_path:
+            # S3 objects are downloaded whole, several at a time, while earlier ones are parsed
+            fetcher = S3Fetcher(
+                budget_bytes=int(app_config.get('s3_prefetch_budget_mb', 512)) * 1024 * 1024,
+                spool_memory_bytes=int(app_config.get('s3_spool_memory_mb', 64)) * 1024 * 1024,
+                temp_dir=app_config.get('data_dir', 'data'),
+                max_pool_connections=int(app_config.get('s3_max_pool_connections', 16)),
+                file_order=remaining_files,
+                cache=await loop.run_in_executor(None, get_s3_cache),
+                etags=etags
+            )
+            prefetch_files = int(app_config.get('s3_prefetch_objects', 4))
+        # Counted in the writer thread; job_states follows on the event loop
+        files_done = itertools.count(files_processed + 1)
+        pipeline = IngestPipeline(
+            job_id, conn, accumulator, log_store,
+            open_source=lambda file_path: open_log_source(file_path, fetcher),
+            on_file_done=lambda file_path: mark_file_processed(conn, catalog, job_id, file_path, accumulator,
+                                                               next(files_done), loop),
+            is_paused=lambda: job_states[job_id]['status'] == 'PAUSED',
+            valid_levels=app_config['log_levels'],
+            workers=int(app_config.get('ingest_workers', 1) or 1),
+            queue_depth=int(app_config.get('ingest_queue_depth', 8)),
+            prefetch_files=prefetch_files,
+            checkpoints=checkpoints,
+            on_batch_written=progress.record_batch
+        )
+        try:
+            paused = await pipeline.run(remaining_files)
+        finally:
+            if fetcher is not None:
+                fetcher.close()
+        # The final flush writes the last summaries (and for Parquet the last segment), so it
+        # runs in an executor like the pipeline's own flushes
+        if paused:
+            await loop.run_in_executor(None, accumulator.flush, conn)
+            catalog.execute('''
+                UPDATE jobs SET status = ?, last_updated = ?, files_processed = ?
                 WHERE job_id = ?
-            ''', (job_states[job_id]['files_processed'], os.path.basename(file_path), job_states[job_id]['last_updated'], job_id))
-            conn.commit()
+            ''', ('PAUSED', datetime.now().strftime('%Y-%m-%d %H:%M:%S'), job_states[job_id]['files_processed'], job_id))
+            catalog.commit()
+            conn.close()
+            catalog.close()
+            progress.notify()
+            return
+        
+        await loop.run_in_executor(None, accumulator.flush, conn)
+        indexes_building = job_states[job_id]['indexes_building']
+        if app_config.get('search_index', True) and not indexes_building:
+            await loop.run_in_executor(None, log_store.build_search_index, conn)
         
         # Mark job as completed
         job_states[job_id]['status'] = 'COMPLETED'
         job_states[job_id]['last_updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        conn.execute('''
+        catalog.execute('''
             UPDATE jobs SET status = ?, last_updated = ?, files_processed = ?, total_files = ?
             WHERE job_id = ?
         ''', ('COMPLETED', job_states[job_id]['last_updated'], job_states[job_id]['files_processed'], total_files, job_id))
-        conn.commit()
+        catalog.commit()
+        progress.notify()
         
         conn.close()
+        catalog.close()
         logger.info(f"Completed job: {job_id} with {job_states[job_id]['files_processed']}/{total_files} files processed")
+        if indexes_building:
+            # The job's logs are already readable; searches scan them until the indexes exist
+            await loop.run_in_executor(None, build_job_indexes, job_id, loop)
     except Exception as e:
         logger.error(f"Error processing job {job_id}: {str(e)}")
+        if accumulator is not None:
+            # Files finished before the failure keep their counts and processed_file markers
+            try:
+                await loop.run_in_executor(None, accumulator.flush, conn)
+            except Exception:
+                pass
         job_states[job_id]['status'] = 'ERROR'
         job_states[job_id]['last_updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        conn.execute('''
-            UPDATE jobs SET status = ?, last_updated = ?, files_processed = ?, total_files = ?
-            WHERE job_id = ?
-        ''', ('ERROR', job_states[job_id]['last_updated'], job_states[job_id]['files_processed'], job_states[job_id]['total_files'], job_id))
-        conn.commit()
-        conn.close()
+        progress.notify()
+        if catalog is not None:
+            catalog.execute('''
+                UPDATE jobs SET status = ?, last_updated = ?, files_processed = ?, total_files = ?
+                WHERE job_id = ?
+            ''', ('ERROR', job_states[job_id]['last_updated'], job_states[job_id]['files_processed'], job_states[job_id]['total_files'], job_id))
+            catalog.commit()
+            catalog.close()
+        if conn is not None:
+            conn.close()
         raise
 
 @app.on_event("startup")
@@ -557,7 +646,7 @@ async def startup_event():
             
             # Load job states from jobs table
             try:
-                conn = sqlite3.connect('data/logs.db', timeout=60)
+                conn = connect_catalog(timeout=60)
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT job_id, folder_path, status, files_processed, total_files, start_time, last_updated
@@ -576,9 +665,35 @@ async def startup_event():
                         'total_files': total_files,
                         'current_file': '',
                         'start_time': start_time,
-                        'last_updated': last_updated
+                        'last_updated': last_updated,
+                        'indexes_building': False
                     }
                 logger.info(f"Loaded {len(jobs)} job states from database")
+                
+                # Completed bulk-loaded jobs whose index build was interrupted finish it in the background
+                for job in jobs:
+                    try:
+                        job_conn = connect_job_db(job[0], timeout=60)
+                        job_states[job[0]]['indexes_building'] = log_indexes_building(job_conn, job[0])
+                        job_conn.close()
+                    except sqlite3.OperationalError as e:
+                        logger.error(f"Cannot read index state of job {job[0]}: {str(e)}")
+                        continue
+                    if job[2] == 'COMPLETED' and job_states[job[0]]['indexes_building']:
+                        loop = asyncio.get_running_loop()
+                        loop.run_in_executor(None, build_job_indexes, job[0], loop)
+                        logger.info(f"Resuming index build for job: {job[0]}")
+                
+                # Jobs still marked RUNNING were interrupted by a restart; continue them from their checkpoints
+                interrupted_jobs = [job[0] for job in jobs if job[2] == 'RUNNING']
+                for job_id in interrupted_jobs:
+                    try:
+                        source = get_job_source(job_id, job_states[job_id]['folder_path'])
+                    except (HTTPException, sqlite3.OperationalError) as e:
+                        logger.error(f"Cannot auto-resume job {job_id}: {getattr(e, 'detail', str(e))}")
+                        continue
+                    asyncio.create_task(process_job(job_id, **source))
+                    logger.info(f"Auto-resuming interrupted job: {job_id}")
             except sqlite3.OperationalError as e:
                 logger.error(f"Error loading job states: {str(e)}")
             except Exception as e:
@@ -587,6 +702,11 @@ async def startup_event():
             logger.error(f"Failed to initialize database: {str(e)}")
             raise HTTPException(status_code=500, detail="Failed to initialize database")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close pooled read connections on shutdown."""
+    read_pool.close()
+
 @app.get("/health")
 async def health_check():
     """Check backend health."""
@@ -624,11 +744,28 @@ async def start_job(request: StartJobRequest):
         'total_files': 0,
         'current_file': '',
         'start_time': start_time,
-        'last_updated': start_time
+        'last_updated': start_time,
+        'indexes_building': False
     }
     
     try:
-        conn = sqlite3.connect('data/logs.db', timeout=60)
+        # Each job's logs, metadata and summaries live in its own database file
+        init_job_db(job_id)
+        # Store start_datetime and end_datetime for S3 jobs in job_metadata
+        if request.customer_folder and request.start_datetime and request.end_datetime:
+            conn = connect_job_db(job_id, timeout=60)
+            conn.execute('''
+                INSERT OR IGNORE INTO job_metadata (job_id, type, value)
+                VALUES (?, ?, ?)
+            ''', (job_id, 'start_datetime', request.start_datetime))
+            conn.execute('''
+                INSERT OR IGNORE INTO job_metadata (job_id, type, value)
+                VALUES (?, ?, ?)
+            ''', (job_id, 'end_datetime', request.end_datetime))
+            conn.commit()
+            conn.close()
+        
+        conn = connect_catalog(timeout=60)
         conn.execute('PRAGMA journal_mode=WAL')
         conn.execute('''
             INSERT INTO jobs (job_id, folder_path, status, files_processed, total_files, start_time, last_updated)
@@ -642,16 +779,6 @@ async def start_job(request: StartJobRequest):
             start_time,
             start_time
         ))
-        # Store start_datetime and end_datetime for S3 jobs in job_metadata
-        if request.customer_folder and request.start_datetime and request.end_datetime:
-            conn.execute('''
-                INSERT OR IGNORE INTO job_metadata (job_id, type, value)
-                VALUES (?, ?, ?)
-            ''', (job_id, 'start_datetime', request.start_datetime))
-            conn.execute('''
-                INSERT OR IGNORE INTO job_metadata (job_id, type, value)
-                VALUES (?, ?, ?)
-            ''', (job_id, 'end_datetime', request.end_datetime))
         conn.commit()
         conn.close()
         
@@ -679,6 +806,56 @@ async def get_job_status(job_id: str):
     logger.debug(f"Retrieved status for job: {job_id}")
     return job_states[job_id]
 
+def progress_snapshot(job_id: str, progress: JobProgress) -> Dict:
+    """Return the job's state with its live rates and ETA, as sent on the progress stream."""
+    state = job_states[job_id]
+    snapshot = {
+        'job_id': job_id,
+        'status': state['status'],
+        'files_processed': state['files_processed'],
+        'total_files': state['total_files'],
+        'current_file': state.get('current_file'),
+        'indexes_building': state.get('indexes_building', False),
+        'last_updated': state['last_updated']
+    }
+    snapshot.update(progress.snapshot(state['files_processed'], state['total_files']))
+    if state['status'] != 'RUNNING':
+        snapshot.update(lines_per_sec=0.0, bytes_per_sec=0.0, eta_seconds=None)
+    return snapshot
+
+@app.get("/jobs/{job_id}/progress")
+async def stream_job_progress(job_id: str):
+    """Stream a job's progress as Server-Sent Events.
+
+    Each event's data is a JSON snapshot of the job's files processed, current file,
+    lines/sec, bytes/sec and ETA. Events follow the ingest's batches and file completions
+    but are sent at most once per progress_interval_seconds, with an unchanged snapshot
+    repeated every progress_heartbeat_seconds while nothing happens. The stream ends once
+    the job stops running (after its deferred indexes are built, if it completed), or
+    when it is deleted.
+    """
+    check_job_exists(job_id)
+    interval = float(config['app'].get('progress_interval_seconds', 1))
+    heartbeat = float(config['app'].get('progress_heartbeat_seconds', 15))
+    progress = get_job_progress(job_id)
+    
+    async def events():
+        while job_id in job_states:
+            version = progress.version
+            snapshot = progress_snapshot(job_id, progress)
+            yield f"data: {json.dumps(snapshot)}\n\n"
+            if snapshot['status'] != 'RUNNING' and not (snapshot['status'] == 'COMPLETED' and snapshot['indexes_building']):
+                return
+            await asyncio.sleep(interval)
+            await progress.wait_for_change(version, heartbeat)
+        yield f"event: deleted\ndata: {json.dumps({'job_id': job_id})}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.get("/jobs/{job_id}/processed_files")
 async def get_processed_files(job_id: str):
     """Get list of processed files for a specific job."""
@@ -686,7 +863,7 @@ async def get_processed_files(job_id: str):
         logger.error(f"Job not found: {job_id}")
         raise HTTPException(status_code=404, detail="Job not found")
     try:
-        conn = sqlite3.connect('data/logs.db', timeout=60)
+        conn = connect_job_db(job_id, timeout=60)
         cursor = conn.cursor()
         cursor.execute('''
             SELECT value FROM job_metadata WHERE job_id = ? AND type = 'processed_file'
@@ -713,7 +890,7 @@ async def pause_job(job_id: str):
         job_states[job_id]['status'] = 'PAUSED'
         job_states[job_id]['last_updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        conn = sqlite3.connect('data/logs.db', timeout=60)
+        conn = connect_catalog(timeout=60)
         conn.execute('''
             UPDATE jobs
             SET status = ?, last_updated = ?
@@ -721,6 +898,7 @@ async def pause_job(job_id: str):
         ''', (job_states[job_id]['status'], job_states[job_id]['last_updated'], job_id))
         conn.commit()
         conn.close()
+        notify_progress(job_id)
         
         logger.info(f"Paused job: {job_id}")
         return {"status": "Job paused"}
@@ -742,7 +920,7 @@ async def resume_job(job_id: str):
         job_states[job_id]['status'] = 'RUNNING'
         job_states[job_id]['last_updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        conn = sqlite3.connect('data/logs.db', timeout=60)
+        conn = connect_catalog(timeout=60)
         cursor = conn.cursor()
         cursor.execute('''
             SELECT folder_path FROM jobs WHERE job_id = ?
@@ -752,17 +930,7 @@ async def resume_job(job_id: str):
             logger.error(f"Job {job_id} not found in database")
             raise HTTPException(status_code=404, detail="Job not found in database")
         
-        folder_path = result[0]
-        customer_folder = None
-        start_datetime = None
-        end_datetime = None
-        
-        if folder_path.startswith('s3://k8-customer-logs/'):
-            customer_folder = folder_path.split('/')[-1]
-            # For simplicity, assume resuming requires re-specifying parameters
-            # In production, store these in DB or job metadata
-            logger.warning(f"Resuming S3 job {job_id} requires re-specifying start_datetime and end_datetime")
-            raise HTTPException(status_code=400, detail="S3 job resumption requires re-specifying parameters")
+        source = get_job_source(job_id, result[0])
         
         cursor.execute('''
             UPDATE jobs
@@ -772,56 +940,348 @@ async def resume_job(job_id: str):
         conn.commit()
         conn.close()
         
-        asyncio.create_task(process_job(
-            job_id, 
-            folder_path if not folder_path.startswith('s3://') else None, 
-            customer_folder, 
-            start_datetime, 
-            end_datetime
-        ))
+        asyncio.create_task(process_job(job_id, **source))
         logger.info(f"Resumed job: {job_id} from {job_states[job_id]['files_processed']} files processed")
         return {"status": "Job resumed"}
     except Exception as e:
         logger.error(f"Error resuming job {job_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error resuming job: {str(e)}")
 
+def check_job_exists(job_id: str):
+    """Raise a 404 HTTPException if job_id is not a known job."""
+    if job_id not in job_states:
+        logger.error(f"Job not found: {job_id}")
+        raise HTTPException(status_code=404, detail="Job not found")
+
+def check_log_filters(dimension: str, search: Optional[str], regex: bool):
+    """Raise a 400 HTTPException for an unknown dimension or an invalid regex search."""
+    if dimension not in DIMENSION_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"dimension must be one of {', '.join(DIMENSION_COLUMNS)}")
+    if regex and search:
+        try:
+            compile_pattern(search)
+        except re.error as e:
+            raise HTTPException(status_code=400, detail=f"Invalid regex: {str(e)}")
+
+def read_log_store(conn: sqlite3.Connection, job_id: str) -> LogStore:
+    """Return the store to read a job's logs from over a pooled connection."""
+    app_config = config['app']
+    return open_log_store(conn, job_id, job_segments_dir(job_id),
+                          scan_workers=app_config.get('regex_scan_workers', 1),
+                          scan_chunk_rows=app_config.get('regex_scan_chunk_rows', 100000))
+
+def parse_cursor(after: Optional[str]) -> Optional[tuple]:
+    """Parse a page cursor passed as comma-separated integers (a next_cursor joined by commas)."""
+    if not after:
+        return None
+    try:
+        return tuple(int(part) for part in after.split(','))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {after}")
+
+@app.get("/jobs")
+def list_jobs():
+    """List all jobs from the catalog."""
+    try:
+        with read_pool.connection(CATALOG_DB) as conn:
+            rows = conn.execute('''
+                SELECT job_id, folder_path, status, files_processed, total_files, start_time, last_updated
+                FROM jobs
+            ''').fetchall()
+    except sqlite3.OperationalError as e:
+        logger.error(f"Database error listing jobs: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error listing jobs: {str(e)}")
+    columns = ['job_id', 'folder_path', 'status', 'files_processed', 'total_files', 'start_time', 'last_updated']
+    jobs = []
+    for row in rows:
+        job = dict(zip(columns, row))
+        job['indexes_building'] = job_states.get(job['job_id'], {}).get('indexes_building', False)
+        jobs.append(job)
+    return jobs
+
+@app.get("/jobs/{job_id}/metadata")
+def get_job_metadata(job_id: str):
+    """Get a job's classes and services, S3 date range and whether its indexes are still building."""
+    check_job_exists(job_id)
+    try:
+        with read_pool.connection(job_db_path(job_id)) as conn:
+            rows = conn.execute('''
+                SELECT type, value FROM job_metadata
+                WHERE job_id = ? AND type IN ('class', 'service', 'start_datetime', 'end_datetime')
+            ''', (job_id,)).fetchall()
+            indexes_building = log_indexes_building(conn, job_id)
+    except sqlite3.OperationalError as e:
+        logger.error(f"Database error fetching metadata for job {job_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error fetching metadata: {str(e)}")
+    values = {'class': [], 'service': [], 'start_datetime': [], 'end_datetime': []}
+    for metadata_type, value in rows:
+        if value is not None and value not in values[metadata_type]:
+            values[metadata_type].append(value)
+    return {
+        'job_id': job_id,
+        'classes': values['class'],
+        'services': values['service'],
+        'start_datetime': values['start_datetime'][0] if values['start_datetime'] else None,
+        'end_datetime': values['end_datetime'][0] if values['end_datetime'] else None,
+        'indexes_building': indexes_building
+    }
+
+@app.get("/jobs/{job_id}/summaries/{query_type}")
+def get_job_summary(job_id: str, query_type: str):
+    """Get a job's summary counts by class, service, timeline hour or class and service."""
+    check_job_exists(job_id)
+    if query_type not in ANALYSIS_QUERIES:
+        raise HTTPException(status_code=400, detail=f"query_type must be one of {', '.join(ANALYSIS_QUERIES)}")
+    try:
+        with read_pool.connection(job_db_path(job_id)) as conn:
+            columns, rows = query_analysis_rows(conn, job_id, query_type)
+    except sqlite3.OperationalError as e:
+        logger.error(f"Database error retrieving {query_type} data for job {job_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving {query_type} data: {str(e)}")
+    logger.debug(f"Retrieved {query_type} data for job: {job_id}, rows: {len(rows)}")
+    return {'columns': columns, 'rows': rows}
+
+@app.get("/jobs/{job_id}/timeline")
+def get_job_timeline(job_id: str, start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+                     max_points: Optional[int] = Query(None, ge=1, le=100000)):
+    """Get a job's log counts by level over a time window (UTC epoch ms), the whole job by default.
+
+    The counts are per minute, hour or day: the finest resolution that keeps the window
+    within max_points buckets (timeline_max_points by default).
+    """
+    check_job_exists(job_id)
+    if start_ms is not None and end_ms is not None and end_ms <= start_ms:
+        raise HTTPException(status_code=400, detail="end_ms must be after start_ms")
+    if max_points is None:
+        max_points = int(config['app'].get('timeline_max_points', 1500))
+    try:
+        with read_pool.connection(job_db_path(job_id)) as conn:
+            timeline = query_timeline(conn, job_id, start_ms, end_ms, max_points)
+    except sqlite3.OperationalError as e:
+        logger.error(f"Database error retrieving timeline for job {job_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving timeline: {str(e)}")
+    logger.debug(f"Retrieved {timeline['resolution']} timeline for job: {job_id}, rows: {len(timeline['rows'])}")
+    return timeline
+
+@app.get("/jobs/{job_id}/logs")
+def get_job_logs(job_id: str, dimension: str, name: str, level: str = 'ALL',
+                 limit: int = Query(1000, ge=1, le=100000), after: Optional[str] = None,
+                 search: Optional[str] = None, regex: bool = False,
+                 start_ms: Optional[int] = None, end_ms: Optional[int] = None):
+    """Get one Log Viewer page of a job's logs for a class or service, level, search and time range.
+
+    after is the previous page's next_cursor joined by commas. total is None when it was
+    not counted (a search or time range); /logs/count counts it.
+    """
+    check_job_exists(job_id)
+    check_log_filters(dimension, search, regex)
+    cursor = parse_cursor(after)
+    start_time = time.time()
+    try:
+        with read_pool.connection(job_db_path(job_id)) as conn:
+            log_page = read_log_store(conn, job_id).query_logs(
+                conn, dimension, name, level, limit, after=cursor, search_query=search,
+                use_regex=regex, start_ms=start_ms, end_ms=end_ms
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except sqlite3.OperationalError as e:
+        logger.error(f"Database error fetching logs of job {job_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    logger.debug(f"Fetched {len(log_page.rows)} logs of job {job_id} for {dimension}={name}, level={level}, "
+                 f"after={cursor}, query_time={time.time() - start_time:.2f}s")
+    return {
+        'logs': [
+            {"timestamp": row[0], "log_message": row[1], "level": row[2], dimension: name}
+            for row in log_page.rows
+        ],
+        'total': log_page.total,
+        'next_cursor': log_page.next_cursor
+    }
+
+@app.get("/jobs/{job_id}/logs/count")
+def count_job_logs(job_id: str, dimension: str, name: str, level: str = 'ALL',
+                   search: Optional[str] = None, regex: bool = False,
+                   start_ms: Optional[int] = None, end_ms: Optional[int] = None):
+    """Count a job's logs matching the Log Viewer filters."""
+    check_job_exists(job_id)
+    check_log_filters(dimension, search, regex)
+    try:
+        with read_pool.connection(job_db_path(job_id)) as conn:
+            total = read_log_store(conn, job_id).count_logs(
+                conn, dimension, name, level, search_query=search, use_regex=regex,
+                start_ms=start_ms, end_ms=end_ms
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except sqlite3.OperationalError as e:
+        logger.error(f"Database error counting logs of job {job_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    return {'count': total}
+
+@app.get("/jobs/{job_id}/logs/export")
+def export_logs(job_id: str, dimension: str, name: str, level: str = 'ALL',
+                search: Optional[str] = None, regex: bool = False,
+                start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+                export_format: str = Query('ndjson', alias='format')):
+    """Stream a job's logs for a class or service, level, search and time range as gzip-compressed NDJSON or CSV.
+
+    Rows are read in chunks from one query and compressed as they go, so the response
+    holds only one chunk in memory however many logs match.
+    """
+    check_job_exists(job_id)
+    check_log_filters(dimension, search, regex)
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    
+    # The pooled connection is held until the response is fully sent
+    lease = ExitStack()
+    try:
+        conn = lease.enter_context(read_pool.connection(job_db_path(job_id)))
+        store = read_log_store(conn, job_id)
+        # Checked before streaming: once headers are sent, errors can only truncate the file
+        store.check_search(search, regex)
+    except ValueError as e:
+        lease.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    except sqlite3.OperationalError as e:
+        logger.error(f"Error opening logs of job {job_id} for export: {str(e)}")
+        lease.close()
+        raise HTTPException(status_code=500, detail=f"Error exporting logs: {str(e)}")
+    
+    def generate():
+        with lease:
+            try:
+                chunks = store.iter_logs(conn, dimension, name, level, search, regex, start_ms, end_ms,
+                                         chunk_rows=int(config['app'].get('export_chunk_rows', 10000)))
+                yield from gzip_export(chunks, export_format, dimension, name)
+            except Exception as e:
+                # Headers are already sent, so the client sees a truncated gzip stream
+                logger.error(f"Error exporting logs of job {job_id}: {str(e)}")
+                raise
+    
+    file_name = re.sub(r'[^A-Za-z0-9._-]+', '_', f"{job_id}_{name}_{level}_logs") + f".{export_format}.gz"
+    logger.info(f"Exporting logs of job {job_id}: {dimension}={name}, level={level}, format={export_format}")
+    return StreamingResponse(
+        generate(),
+        media_type='application/gzip',
+        headers={'Content-Disposition': f'attachment; filename="{file_name}"'}
+    )
+
+def job_data_version(job_id: str) -> str:
+    """Return an id of the job's current data, for caching exports of it.
+
+    The id is the job's last update time (YYYYMMDDHHMMSS), so versions sort by age,
+    followed by a short hash of its state.
+    """
+    state = job_states[job_id]
+    key = f"{state['status']}|{state['files_processed']}|{state['total_files']}|{state['last_updated']}"
+    updated = re.sub(r'[^0-9]', '', state['last_updated'] or '')
+    return f"{updated}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}"
+
+def write_excel_export(job_id: str, export: Dict):
+    """Write the job's summaries workbook for export['version'], recording progress in export."""
+    def on_progress(rows_written: int, total_rows: int):
+        export['rows_written'] = rows_written
+        export['total_rows'] = total_rows
+    
+    output_file = excel_export_path(job_id, export['version'])
+    with read_pool.connection(job_db_path(job_id)) as conn:
+        export_summary_workbook(conn, job_id, output_file, on_progress=on_progress)
+    prune_excel_exports(job_id, export['version'])
+
+async def run_excel_export(job_id: str, export: Dict):
+    """Run write_excel_export in the background and record how it ended."""
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(None, write_excel_export, job_id, export)
+        export['status'] = 'COMPLETED'
+    except Exception as e:
+        logger.error(f"Error exporting job {job_id} to Excel: {str(e)}")
+        export['status'] = 'ERROR'
+        export['error'] = str(e)
+
+@app.post("/jobs/{job_id}/excel")
+async def start_excel_export(job_id: str):
+    """Start exporting the job's summaries to Excel in the background.
+
+    Exports are cached per version of the job's data: if the current version was already
+    exported, or is being exported, that export is returned instead of starting another.
+    Poll GET /jobs/{job_id}/excel for progress and fetch the file from
+    /jobs/{job_id}/excel/download once its status is COMPLETED.
+    """
+    check_job_exists(job_id)
+    version = job_data_version(job_id)
+    export = excel_exports.get(job_id)
+    if export and export['version'] == version and export['status'] == 'RUNNING':
+        return export
+    
+    export = excel_exports[job_id] = {'job_id': job_id, 'version': version, 'status': 'RUNNING',
+                                      'rows_written': 0, 'total_rows': 0, 'error': None}
+    if os.path.exists(excel_export_path(job_id, version)):
+        export['status'] = 'COMPLETED'
+        logger.info(f"Using cached Excel export of job {job_id} (version {version})")
+        return export
+    asyncio.create_task(run_excel_export(job_id, export))
+    logger.info(f"Started Excel export of job {job_id} (version {version})")
+    return export
+
+@app.get("/jobs/{job_id}/excel")
+async def get_excel_export(job_id: str):
+    """Return the status and progress of the job's latest Excel export."""
+    check_job_exists(job_id)
+    if job_id not in excel_exports:
+        raise HTTPException(status_code=404, detail="No Excel export started for this job")
+    return excel_exports[job_id]
+
+@app.get("/jobs/{job_id}/excel/download")
+async def download_excel_export(job_id: str):
+    """Send the job's latest completed Excel export."""
+    check_job_exists(job_id)
+    export = excel_exports.get(job_id)
+    if not export or export['status'] != 'COMPLETED':
+        raise HTTPException(status_code=404, detail="No completed Excel export for this job")
+    output_file = excel_export_path(job_id, export['version'])
+    if not os.path.exists(output_file):
+        # Pruned or removed since it completed; the next POST /jobs/{job_id}/excel writes it again
+        excel_exports.pop(job_id, None)
+        logger.error(f"Excel export file of job {job_id} (version {export['version']}) is missing")
+        raise HTTPException(status_code=404, detail="Excel export file not found; export the job again")
+    file_name = re.sub(r'[^A-Za-z0-9._-]+', '_', f"analysis_results_{job_id}") + ".xlsx"
+    return FileResponse(
+        output_file,
+        media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        filename=file_name
+    )
+
 @app.post("/jobs/{job_id}/delete")
 async def delete_job(job_id: str):
-    """Delete a job and all its associated data from the database."""
+    """Delete a job from the catalog and remove its database file."""
     if job_id not in job_states:
         logger.error(f"Job not found: {job_id}")
         raise HTTPException(status_code=404, detail="Job not found")
     
     try:
-        conn = sqlite3.connect('data/logs.db', timeout=60)
+        conn = connect_catalog(timeout=60)
         conn.execute('PRAGMA journal_mode=WAL')
-        cursor = conn.cursor()
-        
-        # Begin transaction
-        cursor.execute('BEGIN TRANSACTION')
-        
-        # Delete from all relevant tables
-        cursor.execute('DELETE FROM jobs WHERE job_id = ?', (job_id,))
-        cursor.execute('DELETE FROM logs WHERE job_id = ?', (job_id,))
-        cursor.execute('DELETE FROM job_metadata WHERE job_id = ?', (job_id,))
-        cursor.execute('DELETE FROM class_level_counts WHERE job_id = ?', (job_id,))
-        cursor.execute('DELETE FROM service_level_counts WHERE job_id = ?', (job_id,))
-        cursor.execute('DELETE FROM timeline_counts WHERE job_id = ?', (job_id,))
-        cursor.execute('DELETE FROM class_service_counts WHERE job_id = ?', (job_id,))
-        
-        # Commit transaction
+        conn.execute('DELETE FROM jobs WHERE job_id = ?', (job_id,))
         conn.commit()
+        conn.close()
         
-        # Remove from job_states
+        # All of the job's logs, metadata and summaries go with its file
+        read_pool.close_database(job_db_path(job_id))
+        delete_job_db(job_id)
+        delete_excel_exports(job_id)
+        excel_exports.pop(job_id, None)
+        
+        # Remove from job_states; progress subscribers see the job gone and end their streams
         del job_states[job_id]
+        notify_progress(job_id)
+        job_progress.pop(job_id, None)
         
-        conn.close()
         logger.info(f"Deleted job {job_id} and all associated data")
         return {"status": "Job deleted successfully"}
     except Exception as e:
-        # Rollback transaction on error
-        conn.rollback()
-        conn.close()
         logger.error(f"Error deleting job {job_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error deleting job: {str(e)}")
 
@@ -36,10 +36,35 @@ import dask.dataframe as dd
 import numpy as np
 from tqdm import tqdm
 
+from analyzer.log_processor import LogProcessor
+
 # Suppress specific warnings
 warnings.filterwarnings('ignore', category=pd.errors.PerformanceWarning)
 warnings.filterwarnings('ignore', category=FutureWarning)
 
+# Fields read from each log line beyond logtime/level/class/log, as key paths into the JSON entry
+LOG_ENTRY_FIELDS = {
+    'thread': ('thread',),
+    'container': ('kubernetes', 'container_name'),
+    'namespace': ('kubernetes', 'namespace_name'),
+    'pod': ('kubernetes', 'pod_name'),
+    'host': ('kubernetes', 'host')
+}
+
+# Columns written for the analyses, in order, and the LogBatch column each one is read from
+# (hours are derived from parsed timestamps later)
+OUTPUT_COLUMNS = {
+    'timestamp': 'logtime',
+    'thread': 'thread',
+    'level': 'level',
+    'class': 'class',
+    'message': 'log',
+    'container': 'container',
+    'namespace': 'namespace',
+    'pod': 'pod',
+    'host': 'host'
+}
+
 class LogAnalysisError(Exception):
     """Custom exception for log analysis errors."""
     pass
@@ -127,31 +152,6 @@ class LogAnalyzer:
             print(f"Warning: Error calculating chunk size: {str(e)}")
             return 10000  # Default fallback
 
-    def _parse_log_entry(self, log_data):
-        """
-        Parse a single log entry from JSON data.
-        
-        Args:
-            log_data (dict): Raw JSON log data
-            
-        Returns:
-            dict: Parsed log entry or None if invalid
-        """
-        try:
-            return {
-                'timestamp': log_data.get('logtime'),
-                'thread': log_data.get('thread'),
-                'level': log_data.get('level'),
-                'class': log_data.get('class'),
-                'message': log_data.get('log'),
-                'container': log_data.get('kubernetes', {}).get('container_name'),
-                'namespace': log_data.get('kubernetes', {}).get('namespace_name'),
-                'pod': log_data.get('kubernetes', {}).get('pod_name'),
-                'host': log_data.get('kubernetes', {}).get('host')
-            }
-        except Exception:
-            return None
-
     def process_file_streaming(self, file_path):
         """
         Process a single log file using streaming to minimize memory usage.
@@ -163,29 +163,31 @@ class LogAnalyzer:
             tuple: (Path to temp file, lines processed, error count)
         """
         temp_file = self.temp_dir / f"temp_{file_path.stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet"
-        current_chunk = []
+        processor = LogProcessor(split_class=False, extra_fields=LOG_ENTRY_FIELDS, keep_missing=True)
+        current_chunk = {name: [] for name in OUTPUT_COLUMNS}
+        chunk_rows = 0
         lines_processed = 0
         errors = 0
 
         try:
-            with gzip.open(file_path, 'rt', encoding='utf-8') as f:
-                for line in f:
-                    lines_processed += 1
-                    try:
-                        log_data = json.loads(line.strip())
-                        entry = self._parse_log_entry(log_data)
-                        if entry:
-                            current_chunk.append(entry)
-                            
-                            # Write chunk to parquet when it reaches chunk size
-                            if len(current_chunk) >= self.chunk_size:
-                                self._save_chunk_to_parquet(current_chunk, temp_file)
-                                current_chunk = []
-                    except Exception:
-                        errors += 1
+            with gzip.open(file_path, 'rb') as f:
+                for block in processor.iter_blocks(f):
+                    batch, stats = processor.parse_block(block, lines_processed)
+                    lines_processed += stats['lines']
+                    errors += stats['invalid_json']
+                    columns = batch.columns()
+                    for name, source in OUTPUT_COLUMNS.items():
+                        current_chunk[name].extend(columns[source])
+                    chunk_rows += len(batch)
+                    
+                    # Write chunk to parquet when it reaches chunk size
+                    if chunk_rows >= self.chunk_size:
+                        self._save_chunk_to_parquet(current_chunk, temp_file)
+                        current_chunk = {name: [] for name in OUTPUT_COLUMNS}
+                        chunk_rows = 0
 
                 # Save any remaining records
-                if current_chunk:
+                if chunk_rows:
                     self._save_chunk_to_parquet(current_chunk, temp_file)
 
             return temp_file, lines_processed, errors
@@ -199,7 +201,7 @@ class LogAnalyzer:
         Save a chunk of data to parquet format.
         
         Args:
-            chunk (list): List of log entries
+            chunk (dict): Column name to list of values
             file_path (Path): Output file path
             append (bool): Whether to append to existing file
         """
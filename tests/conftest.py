@@ -0,0 +1,138 @@
+import asyncio
+import gzip
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.data_manager import connect_job_db, init_db, init_job_db, job_segments_dir
+from analyzer.dimensions import Dimensions
+from analyzer.ingest_pipeline import IngestPipeline
+from analyzer.log_processor import LogProcessor
+from analyzer.log_store import ParquetLogStore, SQLiteLogStore
+from analyzer.message_codec import register_message_functions
+from analyzer.regex_search import register_regexp
+from analyzer.summary_accumulator import SummaryAccumulator, load_file_checkpoints
+
+LEVELS = ['DEBUG', 'ERROR', 'INFO', 'WARN']
+CLASSES = ['ecm.ImportService', 'ecm.Provisioning_Job', 'sav.user_sync', 'sav.Rules%Engine']
+MESSAGES = [
+    'Imported user_id=42 from AD',
+    'Provisioning task 50% complete',
+    'userXid lookup failed: timeout after 30s',
+    'Rule %s evaluated for account_name=jdoe',
+    'Connection reset by peer (code 104)',
+    'retrying request 7 of 10',
+    'path C:\\saviynt\\temp_files cleaned',
+    'ab'
+]
+
+def log_lines(count: int, start_minute: int = 0, seed: int = 0) -> list:
+    """Return count log entries cycling through CLASSES, LEVELS and MESSAGES, one second apart."""
+    lines = []
+    for index in range(count):
+        seconds = start_minute * 60 + index + seed
+        lines.append({
+            'logtime': f'2024-03-05 {seconds // 3600 % 24:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}',
+            'level': LEVELS[(index + seed) % len(LEVELS)],
+            'class': CLASSES[(index * 7 + seed) % len(CLASSES)],
+            'log': f'{MESSAGES[(index * 3 + seed) % len(MESSAGES)]} #{index}'
+        })
+    return lines
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty directory: the catalog and job databases are kept under ./data."""
+    monkeypatch.chdir(tmp_path)
+    init_db()
+    return tmp_path
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    """Read log files in small blocks, so a test file spans many batches and flushes."""
+    iter_blocks = LogProcessor.iter_blocks
+    monkeypatch.setattr(LogProcessor, 'iter_blocks',
+                        staticmethod(lambda stream, block_size=2048: iter_blocks(stream, block_size)))
+
+@pytest.fixture
+def write_log_file(workdir):
+    """Return a function writing log entries to a gzip file under ./logs and returning its path."""
+    def write(name: str, lines: list) -> str:
+        os.makedirs('logs', exist_ok=True)
+        path = os.path.join('logs', name)
+        with gzip.open(path, 'wb') as file:
+            for line in lines:
+                file.write(json.dumps(line).encode('utf-8') + b'\n')
+        return path
+    return write
+
+def open_store(conn, job_id: str, storage: str):
+    """Return the log store a job is written to, recording it as the job's log_storage."""
+    conn.execute('INSERT OR IGNORE INTO job_metadata (job_id, type, value) VALUES (?, ?, ?)',
+                 (job_id, 'log_storage', storage))
+    conn.commit()
+    if storage == 'parquet':
+        return ParquetLogStore(job_id, job_segments_dir(job_id), row_group_rows=64)
+    return SQLiteLogStore(job_id)
+
+@pytest.fixture
+def ingest(workdir):
+    """Return a function running the ingest pipeline over files for a job, as process_job does.
+
+    pause_after stops the pipeline after that many written batches. With crash, the
+    accumulator is not flushed afterwards, as if the process died: rows written since the
+    last flush are left uncounted for the next run to discard.
+    """
+    def run(job_id: str, files: list, storage: str = 'sqlite', pause_after: int = None,
+            crash: bool = False, flush_rows: int = 100, workers: int = 1) -> bool:
+        init_job_db(job_id)
+        conn = connect_job_db(job_id, check_same_thread=False)
+        try:
+            store = open_store(conn, job_id, storage)
+            accumulator = SummaryAccumulator(job_id, Dimensions(conn), flush_rows=flush_rows,
+                                             flush_seconds=3600, log_store=store)
+            accumulator.load_seen_metadata(conn)
+            store.discard_uncommitted(conn)
+            checkpoints = load_file_checkpoints(conn, job_id)
+            processed = {row[0] for row in conn.execute(
+                "SELECT value FROM job_metadata WHERE job_id = ? AND type = 'processed_file'", (job_id,)
+            )}
+            batches = []
+
+            def file_done(file_path: str):
+                accumulator.mark_file_processed(file_path)
+                conn.commit()
+
+            pipeline = IngestPipeline(
+                job_id, conn, accumulator, store,
+                open_source=lambda file_path: file_path,
+                on_file_done=file_done,
+                is_paused=lambda: pause_after is not None and len(batches) >= pause_after,
+                valid_levels=LEVELS,
+                workers=workers,
+                checkpoints=checkpoints,
+                on_batch_written=lambda lines, byte_count: batches.append(lines)
+            )
+            paused = asyncio.run(pipeline.run([path for path in files if path not in processed]))
+            if not crash:
+                accumulator.flush(conn)
+            return paused
+        finally:
+            conn.close()
+    return run
+
+@pytest.fixture
+def read_job(workdir):
+    """Return a function opening a job database for reading, as the backend's read pool does."""
+    connections = []
+
+    def connect(job_id: str):
+        conn = register_regexp(register_message_functions(connect_job_db(job_id)))
+        connections.append(conn)
+        return conn
+    yield connect
+    for conn in connections:
+        conn.close()
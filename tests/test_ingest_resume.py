@@ -0,0 +1,61 @@
+from collections import Counter
+
+import pytest
+
+from analyzer.log_store import open_log_store, summary_count
+from analyzer.data_manager import job_segments_dir
+from conftest import log_lines
+
+JOB_ID = 'Local Job 2024-03-05 10:00:00'
+
+def expected_class_counts(lines: list) -> Counter:
+    """Count lines by class name (the part of `class` after the service)."""
+    return Counter(line['class'].split('.', 1)[1] for line in lines)
+
+def stored_messages(conn, store, class_name: str) -> list:
+    """Return every message the store lists for a class, in order."""
+    return [row[1] for rows in store.iter_logs(conn, 'class', class_name, 'ALL', chunk_rows=50) for row in rows]
+
+def assert_counted_once(conn, lines: list, storage: str):
+    """Check summaries, timeline rollups and stored rows each cover every line exactly once."""
+    store = open_log_store(conn, JOB_ID, job_segments_dir(JOB_ID))
+    assert store.name == storage
+    assert conn.execute('SELECT SUM(count) FROM class_level_counts').fetchone()[0] == len(lines)
+    assert conn.execute('SELECT SUM(count) FROM timeline_rollups WHERE resolution_ms = 60000').fetchone()[0] == len(lines)
+    for class_name, count in expected_class_counts(lines).items():
+        assert summary_count(conn, JOB_ID, 'class', class_name, 'ALL') == count
+        messages = stored_messages(conn, store, class_name)
+        assert sorted(messages) == sorted(line['log'] for line in lines if line['class'].endswith('.' + class_name))
+
+@pytest.mark.parametrize('storage', ['sqlite', 'parquet'])
+def test_resume_after_crash_does_not_double_count(storage, ingest, write_log_file, read_job, small_blocks):
+    first, second = log_lines(300), log_lines(300, start_minute=10, seed=1)
+    files = [write_log_file('a.log.gz', first), write_log_file('b.log.gz', second)]
+
+    # Dies mid-file with rows written after the last flush
+    assert ingest(JOB_ID, files, storage, pause_after=9, crash=True)
+    conn = read_job(JOB_ID)
+    assert conn.execute("SELECT COUNT(*) FROM file_checkpoints").fetchone()[0] == 1
+    if storage == 'sqlite':
+        uncounted = conn.execute('''
+            SELECT COUNT(*) FROM logs WHERE id > (
+                SELECT CAST(value AS INTEGER) FROM job_metadata WHERE type = 'committed_log_id'
+            )
+        ''').fetchone()[0]
+        assert uncounted > 0
+    conn.close()
+
+    assert not ingest(JOB_ID, files, storage)
+    assert_counted_once(read_job(JOB_ID), first + second, storage)
+
+@pytest.mark.parametrize('workers', [1, 2])
+@pytest.mark.parametrize('storage', ['sqlite', 'parquet'])
+def test_resume_after_pause_across_files(storage, workers, ingest, write_log_file, read_job, small_blocks):
+    first, second = log_lines(200), log_lines(250, start_minute=30, seed=2)
+    files = [write_log_file('a.log.gz', first), write_log_file('b.log.gz', second)]
+
+    # Paused twice: in the first file, then in the second
+    assert ingest(JOB_ID, files, storage, pause_after=3, workers=workers)
+    assert ingest(JOB_ID, files, storage, pause_after=12, workers=workers)
+    assert not ingest(JOB_ID, files, storage, workers=workers)
+    assert_counted_once(read_job(JOB_ID), first + second, storage)
@@ -0,0 +1,49 @@
+import pytest
+
+from analyzer.data_manager import job_segments_dir
+from analyzer.log_store import open_log_store, summary_count
+from conftest import LEVELS, log_lines
+
+JOB_ID = 'Local Job 2024-03-05 10:00:00'
+
+def tied_lines(count: int, seed: int = 0) -> list:
+    """Return log entries sharing each timestamp with four others, so pages split within a tie."""
+    lines = log_lines(count, seed=seed)
+    for index, line in enumerate(lines):
+        line['logtime'] = lines[index - index % 5]['logtime']
+    return lines
+
+def read_pages(conn, store, dimension: str, name: str, level: str, limit: int) -> list:
+    """Page through query_logs by cursor, returning each page."""
+    pages, after = [], None
+    while True:
+        page = store.query_logs(conn, dimension, name, level, limit, after=after)
+        pages.append(page)
+        if page.next_cursor is None:
+            return pages
+        after = page.next_cursor
+
+@pytest.mark.parametrize('storage', ['sqlite', 'parquet'])
+def test_paging_totals_match_summary_counts(storage, ingest, write_log_file, read_job, small_blocks):
+    lines = tied_lines(400) + tied_lines(200, seed=1)
+    ingest(JOB_ID, [write_log_file('a.log.gz', lines[:400]), write_log_file('b.log.gz', lines[400:])], storage)
+    conn = read_job(JOB_ID)
+    store = open_log_store(conn, JOB_ID, job_segments_dir(JOB_ID))
+
+    filters = {('class', line['class'].split('.', 1)[1]) for line in lines}
+    filters |= {('service', line['class'].split('.', 1)[0]) for line in lines}
+    for dimension, name in sorted(filters):
+        for level in ['ALL'] + LEVELS:
+            expected = summary_count(conn, JOB_ID, dimension, name, level)
+            pages = read_pages(conn, store, dimension, name, level, limit=7)
+            rows = [row for page in pages for row in page.rows]
+            assert all(page.total == expected for page in pages)
+            assert len(rows) == expected
+            assert store.count_logs(conn, dimension, name, level) == expected
+
+            # Every line is listed once, in time order, across page boundaries inside ties
+            wanted = [line for line in lines
+                      if line['class'].split('.', 1)[dimension == 'class'] == name
+                      and level in ('ALL', line['level'])]
+            assert sorted(row[1] for row in rows) == sorted(line['log'] for line in wanted)
+            assert [row[0] for row in rows] == sorted(row[0] for row in rows)
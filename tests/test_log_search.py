@@ -0,0 +1,44 @@
+import pytest
+
+from analyzer.data_manager import job_segments_dir
+from analyzer.log_store import SQLiteLogStore, open_log_store
+from conftest import CLASSES, log_lines
+
+JOB_ID = 'Local Job 2024-03-05 10:00:00'
+
+# Terms with LIKE wildcards, a backslash, other letter case, and one too short for the trigram index
+SEARCHES = ['user_id', '50%', '%', '_', 'C:\\saviynt', 'TIMEOUT after', 'ab', 'account_name=jdoe #1']
+
+def matching(lines: list, class_name: str, search: str) -> list:
+    """Return the messages of a class containing search, ignoring case as every store does."""
+    return sorted(line['log'] for line in lines
+                  if line['class'].endswith('.' + class_name) and search.lower() in line['log'].lower())
+
+@pytest.mark.parametrize('storage', ['sqlite', 'parquet'])
+@pytest.mark.parametrize('search', SEARCHES)
+def test_search_matches_same_rows_both_sides_of_index_marker(search, storage, ingest, write_log_file, read_job):
+    indexed, unindexed = log_lines(300), log_lines(200, start_minute=20, seed=1)
+    ingest(JOB_ID, [write_log_file('a.log.gz', indexed)], storage)
+    conn = read_job(JOB_ID)
+    store = open_log_store(conn, JOB_ID, job_segments_dir(JOB_ID))
+    store.build_search_index(conn)
+    conn.close()
+
+    # Rows of a second run land above fts_indexed_log_id and are searched by scanning
+    ingest(JOB_ID, [write_log_file('b.log.gz', unindexed)], storage)
+    conn = read_job(JOB_ID)
+    if isinstance(store, SQLiteLogStore):
+        indexed_log_id = store._indexed_log_id(conn)
+        assert 0 < indexed_log_id < conn.execute('SELECT MAX(id) FROM logs').fetchone()[0]
+
+    for class_name in (name.split('.', 1)[1] for name in CLASSES):
+        expected = matching(indexed + unindexed, class_name, search)
+        page = store.query_logs(conn, 'class', class_name, 'ALL', limit=1000, search_query=search)
+        assert sorted(row[1] for row in page.rows) == expected
+        assert store.count_logs(conn, 'class', class_name, 'ALL', search_query=search) == len(expected)
+        chunks = store.iter_logs(conn, 'class', class_name, 'ALL', search_query=search, chunk_rows=50)
+        assert sorted(row[1] for rows in chunks for row in rows) == expected
+
+    # Both the indexed and the scanned rows hold matches, so each path is checked
+    for lines in (indexed, unindexed):
+        assert any(search.lower() in line['log'].lower() for line in lines)
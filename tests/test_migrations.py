@@ -0,0 +1,159 @@
+import os
+import sqlite3
+
+from analyzer.data_manager import (CATALOG_DB, JOB_SCHEMA_VERSION, _upgrade_job_db, init_db, job_db_path,
+                                   query_analysis_rows)
+from analyzer.log_store import SQLiteLogStore
+from analyzer.timestamp_parser import TimestampParser
+from conftest import log_lines
+
+JOB_IDS = ['Local Job 2024-03-05 10:00:00', 'Local Job 2024-03-06 09:30:00']
+
+def create_baseline_database(jobs: dict):
+    """Write data/logs.db as the first release did: every job in shared tables of TEXT columns."""
+    os.makedirs('data', exist_ok=True)
+    conn = sqlite3.connect(CATALOG_DB)
+    conn.executescript('''
+        CREATE TABLE jobs (
+            job_id TEXT PRIMARY KEY, folder_path TEXT, status TEXT, files_processed INTEGER,
+            total_files INTEGER, start_time TEXT, last_updated TEXT, current_file TEXT
+        );
+        CREATE TABLE logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT, timestamp TEXT, level TEXT, class TEXT,
+            service TEXT, log_message TEXT, folder TEXT, file_name TEXT, line_idx INTEGER
+        );
+        CREATE TABLE job_metadata (job_id TEXT, type TEXT, value TEXT UNIQUE);
+        CREATE TABLE class_level_counts (job_id TEXT, class TEXT, level TEXT, count INTEGER);
+        CREATE TABLE service_level_counts (job_id TEXT, service TEXT, level TEXT, count INTEGER);
+        CREATE TABLE timeline_counts (job_id TEXT, hour TEXT, level TEXT, count INTEGER);
+        CREATE TABLE class_service_counts (job_id TEXT, class TEXT, service TEXT, count INTEGER);
+    ''')
+    for job_id, lines in jobs.items():
+        conn.execute("INSERT INTO jobs VALUES (?, '/logs', 'completed', 1, 1, ?, ?, NULL)",
+                     (job_id, job_id[10:], job_id[10:]))
+        for index, line in enumerate(lines):
+            service, class_name = line['class'].split('.', 1)
+            conn.execute('''
+                INSERT INTO logs (job_id, timestamp, level, class, service, log_message, folder, file_name, line_idx)
+                VALUES (?, ?, ?, ?, ?, ?, '20240305-10', 'cluster-log-0.gz', ?)
+            ''', (job_id, line['logtime'], line['level'], class_name, service, line['log'], index))
+            for table, columns in (('class_level_counts', (class_name, line['level'])),
+                                   ('service_level_counts', (service, line['level'])),
+                                   ('timeline_counts', (line['logtime'][:13] + ':00:00', line['level'])),
+                                   ('class_service_counts', (class_name, service))):
+                updated = conn.execute(f'''
+                    UPDATE {table} SET count = count + 1
+                    WHERE job_id = ? AND {' AND '.join(f'{column} = ?' for column in table_columns(table))}
+                ''', (job_id,) + columns).rowcount
+                if not updated:
+                    conn.execute(f'INSERT INTO {table} VALUES (?, ?, ?, 1)', (job_id,) + columns)
+        conn.execute("INSERT INTO job_metadata VALUES (?, 'processed_file', ?)",
+                     (job_id, f'/logs/{job_id}/cluster-log-0.gz'))
+    conn.commit()
+    conn.close()
+
+def table_columns(table: str) -> tuple:
+    """Return the two TEXT columns a baseline summary table counts by."""
+    return {
+        'class_level_counts': ('class', 'level'),
+        'service_level_counts': ('service', 'level'),
+        'timeline_counts': ('hour', 'level'),
+        'class_service_counts': ('class', 'service')
+    }[table]
+
+def minute_counts(lines: list) -> dict:
+    """Count lines by UTC minute bucket (epoch ms) and level."""
+    parser, counts = TimestampParser(), {}
+    for line in lines:
+        ts = parser.epoch_ms(line['logtime'])
+        key = (ts - ts % 60000, line['level'])
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+def stored_minute_counts(conn) -> dict:
+    """Return a job database's minute timeline_rollups as {(bucket_ms, level): count}."""
+    return {
+        (bucket_ms, level): count for bucket_ms, level, count in conn.execute('''
+            SELECT t.bucket_ms, lv.name, t.count FROM timeline_rollups t
+            JOIN levels lv ON lv.id = t.level_id WHERE t.resolution_ms = 60000
+        ''')
+    }
+
+def test_split_shared_database_moves_each_job(workdir, read_job):
+    jobs = {JOB_IDS[0]: log_lines(150), JOB_IDS[1]: log_lines(90, start_minute=600, seed=3)}
+    os.remove(CATALOG_DB)
+    create_baseline_database(jobs)
+    init_db()
+
+    catalog = sqlite3.connect(CATALOG_DB)
+    tables = {row[0] for row in catalog.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert 'logs' not in tables and 'job_metadata' not in tables and 'class_level_counts' not in tables
+    assert sorted(row[0] for row in catalog.execute('SELECT job_id FROM jobs')) == sorted(jobs)
+    catalog.close()
+
+    first_id = 1
+    for job_id, lines in jobs.items():
+        assert os.path.exists(job_db_path(job_id))
+        conn = read_job(job_id)
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == JOB_SCHEMA_VERSION
+
+        # Ids are kept from the shared table, so both jobs' rows keep their original ids
+        ids = [row[0] for row in conn.execute('SELECT id FROM logs ORDER BY id')]
+        assert ids == list(range(first_id, first_id + len(lines)))
+        first_id += len(lines)
+        assert conn.execute('SELECT COUNT(*) FROM logs WHERE ts IS NULL OR ts = 0').fetchone()[0] == 0
+
+        store = SQLiteLogStore(job_id)
+        for class_name in {line['class'].split('.', 1)[1] for line in lines}:
+            rows = store.query_logs(conn, 'class', class_name, 'ALL', limit=len(lines)).rows
+            assert sorted(row[1] for row in rows) == \
+                sorted(line['log'] for line in lines if line['class'].endswith('.' + class_name))
+        class_counts = {(c, lv): n for c, lv, n in query_analysis_rows(conn, job_id, 'class')[1]}
+        assert sum(class_counts.values()) == len(lines)
+        assert stored_minute_counts(conn) == minute_counts(lines)
+        assert conn.execute("SELECT COUNT(*) FROM job_metadata WHERE type = 'processed_file'").fetchone()[0] == 1
+
+def test_upgrade_job_db_fills_ts_and_committed_rollups(workdir):
+    lines = log_lines(120)
+    conn = sqlite3.connect(os.path.join('data', 'version0.db'))
+    conn.executescript('''
+        CREATE TABLE job_keys (job_key INTEGER PRIMARY KEY, job_id TEXT UNIQUE);
+        CREATE TABLE levels (id INTEGER PRIMARY KEY, name TEXT UNIQUE);
+        CREATE TABLE job_metadata (job_id TEXT, type TEXT, value TEXT, UNIQUE (job_id, type, value));
+        CREATE TABLE logs (
+            id INTEGER PRIMARY KEY, job_key INTEGER, timestamp TEXT, level_id INTEGER, class_id INTEGER,
+            service_id INTEGER, log_message TEXT, file_id INTEGER, line_idx INTEGER
+        );
+        CREATE INDEX idx_logs_job_class_timestamp ON logs (job_key, class_id, timestamp);
+        CREATE TABLE timeline_rollups (
+            job_key INTEGER, resolution_ms INTEGER, bucket_ms INTEGER, level_id INTEGER, count INTEGER,
+            PRIMARY KEY (job_key, resolution_ms, bucket_ms, level_id)
+        );
+        INSERT INTO job_keys VALUES (1, 'job');
+    ''')
+    conn.executemany('INSERT OR IGNORE INTO levels (name) VALUES (?)', [(line['level'],) for line in lines])
+    conn.executemany('''
+        INSERT INTO logs (id, job_key, timestamp, level_id, log_message)
+        VALUES (?, 1, ?, (SELECT id FROM levels WHERE name = ?), ?)
+    ''', [(index + 1, line['logtime'], line['level'], line['log']) for index, line in enumerate(lines)])
+    # The last 20 rows were written after the last flush and are not counted yet
+    conn.execute("INSERT INTO job_metadata VALUES ('job', 'committed_log_id', '100')")
+    conn.commit()
+
+    _upgrade_job_db(conn)
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == JOB_SCHEMA_VERSION
+    parser = TimestampParser()
+    assert [row[0] for row in conn.execute('SELECT ts FROM logs ORDER BY id')] == \
+        [parser.epoch_ms(line['logtime']) for line in lines]
+    assert not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'idx_logs_job_class_timestamp'"
+    ).fetchone()
+    assert stored_minute_counts(conn) == minute_counts(lines[:100])
+    hour_total = conn.execute('SELECT SUM(count) FROM timeline_rollups WHERE resolution_ms = 3600000').fetchone()[0]
+    assert hour_total == 100
+
+    # Already upgraded: running again changes nothing
+    _upgrade_job_db(conn)
+    assert conn.execute('SELECT SUM(count) FROM timeline_rollups').fetchone()[0] == \
+        100 * len({row[0] for row in conn.execute('SELECT DISTINCT resolution_ms FROM timeline_rollups')})
+    conn.close()
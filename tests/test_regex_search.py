@@ -0,0 +1,68 @@
+import re
+
+import pytest
+
+from analyzer.data_manager import job_segments_dir
+from analyzer.log_store import ParquetLogStore, SQLiteLogStore, open_log_store
+from conftest import CLASSES, log_lines
+
+SQLITE_JOB_ID = 'Local Job 2024-03-05 10:00:00'
+PARQUET_JOB_ID = 'Local Job 2024-03-05 11:00:00'
+
+# Patterns in the syntax Python re and RE2 share; '.' and '\d' have no literal text to prefilter on
+PATTERNS = [r'timeout after \d+s', r'user_?id', r'^ab #\d$', r'\(code \d{3}\)', r'[A-Z]{2}\b',
+            r'(?i)IMPORTED', r'50% complete #1\d', r'C:\\saviynt', r'.', r'\d']
+
+@pytest.fixture
+def both_stores(ingest, write_log_file, read_job, small_blocks):
+    """Ingest the same files into a SQLite and a Parquet job; return {storage: (conn, store)}."""
+    lines = log_lines(300) + log_lines(200, start_minute=20, seed=1)
+    files = [write_log_file('a.log.gz', lines[:300]), write_log_file('b.log.gz', lines[300:])]
+    stores = {}
+    for job_id, storage in ((SQLITE_JOB_ID, 'sqlite'), (PARQUET_JOB_ID, 'parquet')):
+        ingest(job_id, files, storage)
+        conn = read_job(job_id)
+        stores[storage] = (conn, open_log_store(conn, job_id, job_segments_dir(job_id)))
+    return lines, stores
+
+@pytest.mark.parametrize('scan_workers', [1, 2])
+def test_sqlite_and_parquet_return_same_regex_matches(scan_workers, both_stores):
+    lines, stores = both_stores
+    assert isinstance(stores['parquet'][1], ParquetLogStore)
+    conn = stores['sqlite'][0]
+    stores['sqlite'] = (conn, SQLiteLogStore(SQLITE_JOB_ID, scan_workers=scan_workers, scan_chunk_rows=50))
+
+    for pattern in PATTERNS:
+        for class_name in (name.split('.', 1)[1] for name in CLASSES):
+            expected = sorted(line['log'] for line in lines
+                              if line['class'].endswith('.' + class_name) and re.search(pattern, line['log']))
+            results = {}
+            for storage, (conn, store) in stores.items():
+                page = store.query_logs(conn, 'class', class_name, 'ALL', limit=1000,
+                                        search_query=pattern, use_regex=True)
+                chunks = store.iter_logs(conn, 'class', class_name, 'ALL', search_query=pattern,
+                                         use_regex=True, chunk_rows=40)
+                results[storage] = (
+                    [row[:2] for row in page.rows],
+                    store.count_logs(conn, 'class', class_name, 'ALL', search_query=pattern, use_regex=True),
+                    [row[:2] for rows in chunks for row in rows]
+                )
+                assert sorted(row[1] for row in page.rows) == expected, (storage, pattern)
+                assert results[storage][1] == len(expected)
+            # Each line has its own second, so both stores list the same rows in the same order
+            assert results['sqlite'] == results['parquet']
+
+@pytest.mark.parametrize('pattern', [r'(user)_\1', r'user(?=_id)', r'(?<=#)1\d'])
+def test_parquet_rejects_patterns_re2_cannot_run(pattern, both_stores):
+    _, stores = both_stores
+    conn, store = stores['sqlite']
+    store.check_search(pattern, True)
+    store.count_logs(conn, 'class', 'ImportService', 'ALL', search_query=pattern, use_regex=True)
+
+    conn, store = stores['parquet']
+    with pytest.raises(ValueError, match='RE2'):
+        store.check_search(pattern, True)
+    with pytest.raises(ValueError):
+        store.query_logs(conn, 'class', 'ImportService', 'ALL', limit=10, search_query=pattern, use_regex=True)
+    with pytest.raises(ValueError):
+        store.count_logs(conn, 'class', 'ImportService', 'ALL', search_query=pattern, use_regex=True)
@@ -0,0 +1,99 @@
+import asyncio
+import os
+
+import pytest
+from botocore.exceptions import ClientError
+
+import backend
+from analyzer.data_manager import connect_catalog, connect_job_db, init_job_db
+from conftest import LEVELS, log_lines
+
+JOB_ID = 'acme_2024-03-05 10:00:00'
+PREFIXES = ['acme/20240305-10/', 'acme/20240305-11/']
+
+@pytest.fixture
+def s3_job(workdir, write_log_file, monkeypatch):
+    """Set up an S3 job over one local log file per hourly prefix.
+
+    Returns the list of prefixes listed so far and the set of prefixes whose listing fails.
+    Objects are read from the local files instead of being downloaded.
+    """
+    files = {f"s3://k8-customer-logs/{prefix}app.log.gz": write_log_file(f'{index}.log.gz', log_lines(100, seed=index))
+             for index, prefix in enumerate(PREFIXES)}
+    listed, failing = [], set()
+
+    def list_s3_files(bucket_name: str, prefix: str) -> list:
+        listed.append(prefix)
+        if prefix in failing:
+            raise ClientError({'Error': {'Code': 'SlowDown', 'Message': 'Please reduce your request rate'}},
+                              'ListObjectsV2')
+        return [{'key': f'{prefix}app.log.gz', 'size': os.path.getsize(files[f's3://{bucket_name}/{prefix}app.log.gz']),
+                 'etag': f'"{prefix}"'}]
+
+    monkeypatch.setenv('AWS_EC2_METADATA_DISABLED', 'true')
+    monkeypatch.setattr(backend, 'list_s3_files', list_s3_files)
+    monkeypatch.setattr(backend, 'validate_customer_folder', lambda customer_folder: True)
+    monkeypatch.setattr(backend, 'open_log_source', lambda file_path, fetcher=None: open(files[file_path], 'rb'))
+    monkeypatch.setattr(backend, 'job_states', {})
+    monkeypatch.setattr(backend, 'job_progress', {})
+    monkeypatch.setitem(backend.config, 'app', dict(backend.config['app'], log_levels=LEVELS, ingest_workers=1,
+                                                    s3_cache_max_mb=0, log_storage='sqlite'))
+    init_job_db(JOB_ID)
+    catalog = connect_catalog()
+    catalog.execute('''
+        INSERT INTO jobs (job_id, folder_path, status, files_processed, total_files, start_time, last_updated)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (JOB_ID, 's3://k8-customer-logs/acme', 'RUNNING', 0, 0, '2024-03-05 10:00:00', '2024-03-05 10:00:00'))
+    catalog.commit()
+    catalog.close()
+    return listed, failing
+
+def run_job():
+    """Run process_job for the S3 job, as starting or resuming it does."""
+    # Each run has its own event loop, as a restarted backend would
+    backend.job_progress.clear()
+    backend.job_states[JOB_ID] = {'job_id': JOB_ID, 'folder_path': 's3://k8-customer-logs/acme', 'status': 'RUNNING',
+                                  'files_processed': 0, 'total_files': 0, 'current_file': '',
+                                  'start_time': '2024-03-05 10:00:00', 'last_updated': '2024-03-05 10:00:00',
+                                  'indexes_building': False}
+    asyncio.run(backend.process_job(JOB_ID, None, 'acme', '20240305-10', '20240305-11'))
+    return backend.job_states[JOB_ID]
+
+def test_failed_prefix_does_not_save_manifest(s3_job):
+    listed, failing = s3_job
+    failing.add(PREFIXES[1])
+    state = run_job()
+    assert state['status'] == 'COMPLETED' and state['total_files'] == 1
+    conn = connect_job_db(JOB_ID)
+    assert backend.load_job_manifest(conn, JOB_ID) is None
+    conn.close()
+
+    # The next run lists every prefix again and picks up the hour that failed
+    failing.clear()
+    listed.clear()
+    state = run_job()
+    assert sorted(listed) == PREFIXES
+    assert state['files_processed'] == state['total_files'] == 2
+    conn = connect_job_db(JOB_ID)
+    assert len(backend.load_job_manifest(conn, JOB_ID)) == 2
+    assert conn.execute('SELECT SUM(count) FROM class_level_counts').fetchone()[0] == 200
+    conn.close()
+
+def test_resumed_job_uses_stored_manifest(s3_job):
+    listed, failing = s3_job
+    run_job()
+    conn = connect_job_db(JOB_ID)
+    manifest = backend.load_job_manifest(conn, JOB_ID)
+    assert [entry['file_path'] for entry in manifest] == [f"s3://k8-customer-logs/{prefix}app.log.gz"
+                                                          for prefix in PREFIXES]
+    conn.close()
+
+    # Listing would now fail, but a rerun reads the stored manifest instead
+    listed.clear()
+    failing.update(PREFIXES)
+    state = run_job()
+    assert listed == []
+    assert state['status'] == 'COMPLETED' and state['files_processed'] == 2
+    conn = connect_job_db(JOB_ID)
+    assert conn.execute('SELECT SUM(count) FROM class_level_counts').fetchone()[0] == 200
+    conn.close()